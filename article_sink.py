@@ -0,0 +1,188 @@
+"""
+Потоковая запись статей в JSONL по мере извлечения.
+
+Статьи копятся в небольшом буфере и сбрасываются на диск пачками с fsync,
+поэтому при сбое теряется не больше одной пачки, а память не зависит от
+объема корпуса. Файлы ротируются по размеру и при необходимости
+сжимаются gzip или zstd (каждая пачка - отдельный блок сжатия, так что
+оборванный хвост файла не портит уже записанные статьи)
+"""
+import glob
+import gzip
+import io
+import json
+import os
+import threading
+import logging
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+COMPRESSION_SUFFIXES = {None: '', 'gzip': '.gz', 'zstd': '.zst'}
+
+
+class ArticleSink:
+    """
+    Запись статей в JSONL с пакетным сбросом на диск
+
+    Файлы открываются на дозапись: повторный запуск продолжает последний файл.
+
+    Args:
+        path: Путь к файлу (kommersant_articles.jsonl); суффикс сжатия добавляется сам
+        batch_size: Количество статей в одной пачке
+        max_bytes: Размер файла, после которого начинается следующий
+            (None - без ротации). При ротации файлы нумеруются:
+            kommersant_articles-00000.jsonl, kommersant_articles-00001.jsonl, ...
+        compression: None, 'gzip' или 'zstd'
+        compresslevel: Уровень сжатия (по умолчанию - стандартный для алгоритма)
+    """
+
+    def __init__(self, path: str = "kommersant_articles.jsonl", batch_size: int = 100,
+                 max_bytes: Optional[int] = None, compression: Optional[str] = None,
+                 compresslevel: Optional[int] = None):
+        if compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"Неизвестный тип сжатия: {compression}. Доступны: gzip, zstd")
+        if compression == 'zstd' and not ZSTD_AVAILABLE:
+            raise ImportError("zstandard не установлен. Установите: pip install zstandard")
+
+        suffix = COMPRESSION_SUFFIXES[compression]
+        if suffix and path.endswith(suffix):
+            path = path[:-len(suffix)]
+        self.stem, self.extension = os.path.splitext(path)
+        self.extension += suffix
+
+        self.batch_size = batch_size
+        self.max_bytes = max_bytes
+        self.compression = compression
+        if compression == 'zstd':
+            self._compressor = zstandard.ZstdCompressor(level=compresslevel or 3)
+        self.compresslevel = compresslevel or 6
+
+        self.articles_written = 0
+        self.batches_written = 0
+        self.bytes_written = 0
+        self.files: List[str] = []
+
+        self._lock = threading.Lock()
+        self._buffer: List[str] = []
+        self._index = self._last_index() if max_bytes else 0
+        self._file = None
+        self._open_file()
+
+    def _file_path(self, index: int) -> str:
+        if self.max_bytes is None:
+            return self.stem + self.extension
+        return f"{self.stem}-{index:05d}{self.extension}"
+
+    def _last_index(self) -> int:
+        """Номер последнего существующего файла (для продолжения после перезапуска)"""
+        index = 0
+        while os.path.exists(self._file_path(index + 1)):
+            index += 1
+        return index
+
+    def _open_file(self):
+        path = self._file_path(self._index)
+        self._file = open(path, 'ab')
+        self.files.append(path)
+
+    def write(self, article: Dict):
+        """Добавление статьи (на диск попадает при заполнении пачки)"""
+        line = json.dumps(article, ensure_ascii=False) + '\n'
+        with self._lock:
+            self._buffer.append(line)
+            if len(self._buffer) >= self.batch_size:
+                self._flush_locked()
+
+    @property
+    def buffered(self) -> int:
+        """Количество статей, еще не сброшенных на диск"""
+        with self._lock:
+            return len(self._buffer)
+
+    def flush(self):
+        """Принудительный сброс буфера на диск"""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        data = ''.join(self._buffer).encode('utf-8')
+        if self.compression == 'gzip':
+            data = gzip.compress(data, compresslevel=self.compresslevel)
+        elif self.compression == 'zstd':
+            data = self._compressor.compress(data)
+
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+        self.articles_written += len(self._buffer)
+        self.batches_written += 1
+        self.bytes_written += len(data)
+        self._buffer = []
+
+        if self.max_bytes is not None and self._file.tell() >= self.max_bytes:
+            self._file.close()
+            self._index += 1
+            self._open_file()
+
+    def close(self):
+        """Сброс оставшихся статей и закрытие файла"""
+        with self._lock:
+            self._flush_locked()
+            self._file.close()
+        logger.info(f"Записано {self.articles_written} статей в {len(self.files)} файл(ов): "
+                    f"{', '.join(self.files)}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _open_text(path: str):
+    """Открытие файла статей на чтение с учетом сжатия"""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    if path.endswith('.zst'):
+        if not ZSTD_AVAILABLE:
+            raise ImportError("zstandard не установлен. Установите: pip install zstandard")
+        stream = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), read_across_frames=True,
+                                                            closefd=True)
+        return io.TextIOWrapper(stream, encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def iter_articles(pattern: str) -> Iterator[Dict]:
+    """
+    Чтение статей из файла или набора ротированных файлов (шаблон glob)
+
+    Оборванная при сбое последняя запись пропускается с предупреждением.
+    """
+    paths = sorted(glob.glob(pattern)) or [pattern]
+    for path in paths:
+        try:
+            with _open_text(path) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.warning(f"Оборванная запись в {path} пропущена")
+        except (EOFError, gzip.BadGzipFile) as e:
+            logger.warning(f"Файл {path} оборван, чтение остановлено: {e}")
+        except Exception as e:
+            if ZSTD_AVAILABLE and isinstance(e, zstandard.ZstdError):
+                logger.warning(f"Файл {path} оборван, чтение остановлено: {e}")
+            else:
+                raise
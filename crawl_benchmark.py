@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк скорости обхода на локальном тестовом сервере
+
+Каждый вариант обхода (режимы KommersantParser и UniversalNewsParser)
+запускается в отдельном процессе против нового экземпляра сервера, чтобы
+время CPU и пиковая память относились только к этому варианту, а сервер
+(работающий в основном процессе) в замер не попадал
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
+from kommersant_parser import KommersantParser
+from universal_news_parser import UniversalNewsParser
+from retry_policy import RetryPolicy
+from mock_news_server import MockNewsServer, load_articles
+
+# Варианты обхода: (парсер, режим)
+RUNS = [('kommersant', 'sync'), ('kommersant', 'async'), ('kommersant', 'pipelined'),
+        ('kommersant', 'print'), ('kommersant', 'api'), ('universal', 'listing')]
+
+# Облегченные варианты страниц тестового сервера (режимы print и api - последовательный
+# обход, в котором вариант пробуется раньше полной страницы)
+PAGE_VARIANTS = {
+    'print': [{'name': 'print', 'url': '{url}?print=true'}],
+    'api': [{'name': 'api', 'url': '{base_url}/api/doc/{id}', 'kind': 'json'}]
+}
+
+
+def measure_throughput(parser: KommersantParser, start_id: int, end_id: int,
+                       mode: str = 'sync', **kwargs) -> Dict:
+    """
+    Замер скорости обхода диапазона ID
+
+    Args:
+        parser: Парсер, настроенный на тестовый сервер
+        start_id: Первый ID диапазона
+        end_id: Последний ID диапазона
+        mode: 'sync' - parse_article_range, 'async' - parse_article_range_async,
+            'pipelined' - parse_article_range_pipelined
+        **kwargs: Дополнительные параметры метода обхода
+
+    Returns:
+        Словарь с числом страниц, статей, временем и страницами в секунду
+    """
+    started = time.perf_counter()
+    if mode == 'async':
+        articles = parser.parse_article_range_async(start_id, end_id, **kwargs)
+    elif mode == 'pipelined':
+        articles = parser.parse_article_range_pipelined(start_id, end_id, **kwargs)
+    else:
+        articles = parser.parse_article_range(start_id, end_id, **kwargs)
+    elapsed = time.perf_counter() - started
+
+    pages = end_id - start_id + 1
+    return {
+        'mode': mode,
+        'pages': pages,
+        'articles': len(articles),
+        'seconds': elapsed,
+        'pages_per_sec': pages / elapsed if elapsed > 0 else 0.0,
+        'result': articles
+    }
+
+
+def _cpu_seconds() -> float:
+    """Время CPU процесса и его завершившихся дочерних процессов"""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def _peak_rss_kib() -> Optional[int]:
+    """Пиковый RSS процесса и его дочерних процессов в КиБ (ru_maxrss в Linux - КиБ)"""
+    if not RESOURCE_AVAILABLE:
+        return None
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+
+
+def run_crawl(parser_name: str, mode: str, base_url: str, start_id: int, end_id: int,
+              options: Dict) -> Dict:
+    """Один вариант обхода (выполняется в отдельном процессе)"""
+    logging.basicConfig(level=logging.ERROR)
+    logging.getLogger().setLevel(logging.ERROR)
+    # Короткие паузы между повторами: ошибки сервера не должны превращать замер в ожидание
+    retry_policy = RetryPolicy(backoff_base=options['backoff'], backoff_max=options['backoff'] * 4, seed=0)
+
+    cpu_before = _cpu_seconds()
+    started = time.perf_counter()
+    if parser_name == 'kommersant':
+        parser = KommersantParser(base_url=base_url, delay=0, retry_policy=retry_policy,
+                                  page_variants=PAGE_VARIANTS.get(mode))
+        kwargs = {}
+        if mode == 'async':
+            kwargs = {'concurrency': options['concurrency']}
+        elif mode == 'pipelined':
+            kwargs = {'io_workers': options['concurrency']}
+        articles = measure_throughput(parser, start_id, end_id, mode='sync' if mode in PAGE_VARIANTS else mode,
+                                      **kwargs)['result']
+    else:
+        parser = UniversalNewsParser(delay=0, retry_policy=retry_policy, feed_state_path=None)
+        config = dict(parser.site_configs['kommersant.ru'], base_url=base_url)
+        parser.site_configs = {'mock': config}
+        articles = parser.parse_site('mock', max_articles_per_category=options['per_category'],
+                                     concurrency=options['concurrency'])
+    seconds = time.perf_counter() - started
+
+    return {'parser': parser_name, 'mode': mode, 'articles': len(articles), 'seconds': seconds,
+            'cpu_seconds': _cpu_seconds() - cpu_before, 'peak_rss_kib': _peak_rss_kib(),
+            'variants': parser.variant_stats.stats() if parser_name == 'kommersant' else {},
+            'result': articles}
+
+
+def _run_crawl_child(connection, *args):
+    connection.send(run_crawl(*args))
+    connection.close()
+
+
+def run_benchmark(articles: List[Dict], runs=RUNS, latency: float = 0.05, error_rate: float = 0.0,
+                  not_found_density: float = 0.0, padding: int = 0, concurrency: int = 20,
+                  backoff: float = 0.05) -> List[Dict]:
+    """
+    Замер всех вариантов обхода
+
+    Returns:
+        Для каждого варианта: запросы к серверу, статьи, время, стр/с,
+        статей/с, мс CPU на запрос, пиковый RSS, байты на статью и время
+        разбора по вариантам страниц (variants) и список статей (result)
+    """
+    options = {'concurrency': concurrency, 'backoff': backoff}
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for parser_name, mode in runs:
+        # Новый сервер на каждый вариант: ошибки первого запроса срабатывают заново
+        with MockNewsServer(articles, latency=latency, error_rate=error_rate,
+                            not_found_density=not_found_density, padding=padding) as server:
+            options['per_category'] = -(-len(articles) // len(server.category_ids))
+            # Обычный (не демонический) процесс: конвейерному режиму нужен свой пул процессов
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=_run_crawl_child,
+                                      args=(sender, parser_name, mode, server.base_url,
+                                            server.start_id, server.end_id, options))
+            process.start()
+            sender.close()
+            try:
+                stats = receiver.recv()
+            except EOFError:
+                raise RuntimeError(f"Процесс варианта {parser_name}:{mode} завершился с ошибкой")
+            finally:
+                process.join()
+            stats['requests'] = server.requests_served
+            stats['errors'] = server.errors_served
+        seconds = stats['seconds'] or 1e-9
+        stats['pages_per_sec'] = stats['requests'] / seconds
+        stats['articles_per_sec'] = stats['articles'] / seconds
+        stats['cpu_ms_per_page'] = stats['cpu_seconds'] * 1000 / max(stats['requests'], 1)
+        results.append(stats)
+    return results
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Бенчмарк скорости обхода статей")
+    arg_parser.add_argument('--pages', type=int, default=200, help="Количество статей на сервере")
+    arg_parser.add_argument('--latency', type=float, default=0.05, help="Задержка ответа сервера, с")
+    arg_parser.add_argument('--error-rate', type=float, default=0.0,
+                            help="Доля статей, первый запрос к которым получает 503")
+    arg_parser.add_argument('--not-found-density', type=float, default=0.0,
+                            help="Доля ID диапазона без статьи (404)")
+    arg_parser.add_argument('--padding', type=int, default=0, help="Служебная разметка страницы, байт")
+    arg_parser.add_argument('--concurrency', type=int, default=20, help="Одновременных запросов")
+    arg_parser.add_argument('--runs', nargs='+', default=[f"{p}:{m}" for p, m in RUNS],
+                            help="Варианты обхода (парсер:режим), по умолчанию все")
+    arg_parser.add_argument('--output', help="Сохранить результаты в JSON (для сравнения между версиями)")
+    arg_parser.add_argument('--min-pages-per-sec', type=float, default=None,
+                            help="Минимально допустимая скорость async режима (для регрессионных проверок)")
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    runs = [tuple(run.split(':', 1)) for run in args.runs]
+    unknown = [run for run in runs if run not in RUNS]
+    if unknown:
+        arg_parser.error(f"Неизвестные варианты: {unknown}. Доступны: {', '.join(f'{p}:{m}' for p, m in RUNS)}")
+
+    results = run_benchmark(load_articles()[:args.pages], runs, latency=args.latency,
+                            error_rate=args.error_rate, not_found_density=args.not_found_density,
+                            padding=args.padding, concurrency=args.concurrency)
+
+    print(f"{'Вариант':<22} {'Запросов':>9} {'Статей':>7} {'Время, с':>9} {'Стр/с':>8} "
+          f"{'Статей/с':>9} {'CPU мс/стр':>11} {'Пик RSS, МиБ':>13}")
+    for stats in results:
+        rss = f"{stats['peak_rss_kib'] / 1024:.0f}" if stats['peak_rss_kib'] is not None else 'н/д'
+        print(f"{stats['parser'] + ':' + stats['mode']:<22} {stats['requests']:>9} {stats['articles']:>7} "
+              f"{stats['seconds']:>9.2f} {stats['pages_per_sec']:>8.1f} {stats['articles_per_sec']:>9.1f} "
+              f"{stats['cpu_ms_per_page']:>11.2f} {rss:>13}")
+
+    print(f"\n{'Вариант страницы':<22} {'Запросов':>9} {'Статей':>7} {'Байт/статью':>12} {'Разбор, мс/стр':>15}")
+    for stats in results:
+        for name, variant in stats['variants'].items():
+            size = variant['bytes_per_article'] if variant['bytes_per_article'] is not None else 'н/д'
+            print(f"{stats['mode'] + ':' + name:<22} {variant['requests']:>9} {variant['articles']:>7} "
+                  f"{size:>12} {variant['parse_ms_per_page']:>15.3f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump([{k: v for k, v in stats.items() if k != 'result'} for stats in results], f,
+                      ensure_ascii=False, indent=2)
+
+    # Конкурентные режимы обязаны давать те же статьи, что и последовательный
+    # (у каждого варианта свой сервер, поэтому URL сравниваются без хоста).
+    # Облегченные варианты страниц дают те же статьи, но текст может отличаться
+    # (например, articleBody из JSON сохраняет короткие абзацы), поэтому для
+    # режимов print и api сравниваются только заголовки и URL
+    strip = lambda items: [dict({k: v for k, v in a.items() if k != 'parsed_at'}, url=urlparse(a['url']).path)
+                           for a in items]
+    identity = lambda items: [(a['title'], urlparse(a['url']).path) for a in items]
+    by_mode = {stats['mode']: stats for stats in results if stats['parser'] == 'kommersant'}
+    failed = False
+    if 'sync' in by_mode:
+        for stats in by_mode.values():
+            key = identity if stats['mode'] in PAGE_VARIANTS else strip
+            if key(by_mode['sync']['result']) != key(stats['result']):
+                print(f"❌ Результаты sync и {stats['mode']} режимов различаются")
+                failed = True
+
+    async_stats = by_mode.get('async')
+    if (args.min_pages_per_sec is not None and async_stats is not None
+            and async_stats['pages_per_sec'] < args.min_pages_per_sec):
+        print(f"❌ Скорость {async_stats['pages_per_sec']:.1f} стр/с ниже порога {args.min_pages_per_sec}")
+        failed = True
+
+    if failed:
+        sys.exit(1)
+    if 'sync' in by_mode and async_stats is not None:
+        print(f"✅ Ускорение async режима: {by_mode['sync']['seconds'] / async_stats['seconds']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
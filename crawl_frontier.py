@@ -0,0 +1,133 @@
+"""
+Персистентная граница обхода (frontier) для перебора ID документов.
+Хранит исход обработки каждого ID в SQLite, чтобы прерванный обход
+можно было продолжить без повторной загрузки готовых страниц
+"""
+import sqlite3
+import threading
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Исходы обработки ID
+STATUS_OK = 'ok'
+STATUS_NOT_FOUND = 'not_found'
+STATUS_TOO_SHORT = 'too_short'
+STATUS_NO_TITLE = 'no_title'
+STATUS_ERROR = 'error'
+STATUS_NOT_MODIFIED = 'not_modified'
+# Статья извлечена, но еще не записана на диск: при возобновлении ID
+# обрабатывается заново, окончательным (ok) он становится после confirm
+STATUS_EXTRACTED = 'extracted'
+
+# Окончательные исходы - такие ID при возобновлении пропускаются
+FINAL_STATUSES = (STATUS_OK, STATUS_NOT_FOUND, STATUS_TOO_SHORT, STATUS_NO_TITLE, STATUS_NOT_MODIFIED)
+
+
+class CrawlFrontier:
+    """
+    SQLite-хранилище исходов обработки ID
+
+    Args:
+        db_path: Путь к файлу базы данных
+        max_attempts: Сколько раз повторять ID с временной ошибкой
+    """
+
+    def __init__(self, db_path: str = "crawl_frontier.db", max_attempts: int = 3):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS outcomes (
+                doc_id INTEGER PRIMARY KEY,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 1,
+                updated_at TEXT NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def record(self, doc_id: int, status: str):
+        """Запись исхода обработки ID"""
+        with self._lock:
+            self._conn.execute("""
+                INSERT INTO outcomes (doc_id, status, attempts, updated_at)
+                VALUES (?, ?, 1, ?)
+                ON CONFLICT(doc_id) DO UPDATE SET
+                    status = excluded.status,
+                    attempts = outcomes.attempts + 1,
+                    updated_at = excluded.updated_at
+            """, (doc_id, status, datetime.now().isoformat()))
+            self._conn.commit()
+
+    def confirm(self, doc_ids: Iterable[int]):
+        """Перевод извлеченных ID в ok после записи их статей на диск"""
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE outcomes SET status = ?, updated_at = ? WHERE doc_id = ? AND status = ?",
+                [(STATUS_OK, datetime.now().isoformat(), doc_id, STATUS_EXTRACTED) for doc_id in doc_ids]
+            )
+            self._conn.commit()
+
+    def confirm_range(self, start_id: int, end_id: int):
+        """confirm для всех извлеченных ID диапазона (после сохранения результатов обхода)"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outcomes SET status = ?, updated_at = ? WHERE doc_id BETWEEN ? AND ? AND status = ?",
+                (STATUS_OK, datetime.now().isoformat(), start_id, end_id, STATUS_EXTRACTED)
+            )
+            self._conn.commit()
+
+    def get_status(self, doc_id: int) -> Optional[str]:
+        """Последний исход обработки ID (None - ID еще не обрабатывался)"""
+        with self._lock:
+            row = self._conn.execute('SELECT status FROM outcomes WHERE doc_id = ?', (doc_id,)).fetchone()
+        return row[0] if row else None
+
+    def _skipped_ids(self, start_id: int, end_id: int) -> set:
+        """ID диапазона, которые не нужно обрабатывать повторно"""
+        placeholders = ','.join('?' * len(FINAL_STATUSES))
+        with self._lock:
+            rows = self._conn.execute(f"""
+                SELECT doc_id FROM outcomes
+                WHERE doc_id BETWEEN ? AND ?
+                  AND (status IN ({placeholders}) OR attempts >= ?)
+            """, (start_id, end_id, *FINAL_STATUSES, self.max_attempts)).fetchall()
+        return {row[0] for row in rows}
+
+    def pending_ids(self, start_id: int, end_id: int) -> Iterator[int]:
+        """
+        ID диапазона, которые осталось обработать: новые и ID с временной
+        ошибкой, у которых не исчерпаны попытки
+        """
+        skipped = self._skipped_ids(start_id, end_id)
+        if skipped:
+            logger.info(f"Frontier: пропускаем {len(skipped)} уже обработанных ID из диапазона {start_id}-{end_id}")
+        return (doc_id for doc_id in range(start_id, end_id + 1) if doc_id not in skipped)
+
+    def summary(self, start_id: Optional[int] = None, end_id: Optional[int] = None) -> Dict[str, int]:
+        """Количество ID по исходам (во всем хранилище или в диапазоне)"""
+        query = 'SELECT status, COUNT(*) FROM outcomes'
+        params = ()
+        if start_id is not None and end_id is not None:
+            query += ' WHERE doc_id BETWEEN ? AND ?'
+            params = (start_id, end_id)
+        with self._lock:
+            rows = self._conn.execute(query + ' GROUP BY status', params).fetchall()
+        return dict(rows)
+
+    def close(self):
+        """Закрытие базы данных"""
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
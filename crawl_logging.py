@@ -0,0 +1,173 @@
+"""
+Логирование с малыми накладными расходами для обхода и пакетной обработки.
+
+setup_logging заменяет обработчики корневого логгера одним QueueHandler:
+вызывающий поток только кладет запись в очередь, а форматирование и запись
+в консоль и файл выполняет фоновый поток QueueListener. Записи с одного
+места вызова ограничиваются RateLimitFilter (повторы при массовых 404 или
+повторах запросов не забивают лог), а вместо строки на каждую статью
+ProgressLogger периодически выводит сводку хода обработки. Построчный
+лог статей доступен на уровне DEBUG
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Подписи счетчиков ProgressLogger
+COUNTER_LABELS = {
+    'pages': 'страниц',
+    'articles': 'статей',
+    'errors': 'ошибок'
+}
+
+_listener: Optional[QueueListener] = None
+_listener_lock = threading.Lock()
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Не больше limit записей за interval секунд с одного места вызова
+
+    Записи уровня ERROR и выше проходят всегда. Число подавленных записей
+    добавляется к первой записи с того же места в следующем интервале.
+    """
+
+    def __init__(self, limit: int = 20, interval: float = 10.0):
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        self._lock = threading.Lock()
+        # (файл, строка) -> [начало интервала, пропущено записей, подавлено записей]
+        self._windows: Dict[Tuple[str, int], list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window is not None else 0
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.msg = f"{record.getMessage()} (похожих сообщений подавлено: {suppressed})"
+                    record.args = None
+                return True
+            if window[1] < self.limit:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+
+def setup_logging(level: int = logging.INFO, log_file: Optional[str] = None, fmt: str = LOG_FORMAT,
+                  rate_limit: Optional[int] = 20, rate_interval: float = 10.0) -> QueueListener:
+    """
+    Асинхронное логирование: консоль и (если задан log_file) файл в фоновом потоке
+
+    Повторный вызов заменяет предыдущую настройку. Оставшиеся в очереди
+    записи выводятся при stop_logging (вызывается и при выходе из программы).
+
+    Args:
+        level: Уровень корневого логгера (logging.DEBUG - с построчным логом статей)
+        log_file: Файл лога (UTF-8, дописывается)
+        fmt: Формат записей
+        rate_limit: Записей с одного места вызова за rate_interval секунд (None - без ограничения)
+        rate_interval: Интервал ограничения, секунды
+    """
+    global _listener
+    formatter = logging.Formatter(fmt)
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file, encoding='utf-8'))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    records = queue.SimpleQueue()
+    queue_handler = QueueHandler(records)
+    if rate_limit is not None:
+        queue_handler.addFilter(RateLimitFilter(rate_limit, rate_interval))
+
+    with _listener_lock:
+        stop_logging()
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+            handler.close()
+        root.addHandler(queue_handler)
+        root.setLevel(level)
+        _listener = QueueListener(records, *handlers, respect_handler_level=True)
+        _listener.start()
+    return _listener
+
+
+def stop_logging():
+    """Остановка фонового потока с выводом оставшихся записей"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(stop_logging)
+
+
+class ProgressLogger:
+    """
+    Периодическая сводка хода обработки вместо строки на каждый элемент
+
+    update копит счетчики (pages=1, articles=1, ...) и не чаще раза в
+    interval секунд выводит их с темпом в секунду:
+        Парсинг: страниц 1200 (118.3/с), статей 1013 (99.9/с)
+
+    Args:
+        logger: Логгер для сводок
+        label: Начало строки сводки
+        interval: Минимальный интервал между сводками, секунды
+        total: Ожидаемое значение первого счетчика (выводится как 120/1000)
+    """
+
+    def __init__(self, logger: logging.Logger, label: str = 'Прогресс', interval: float = 10.0,
+                 total: Optional[int] = None):
+        self.logger = logger
+        self.label = label
+        self.interval = interval
+        self.total = total
+        self.counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._last = self._started
+
+    def update(self, **counts: int):
+        """Добавление к счетчикам; сводка - если с прошлой прошло interval секунд"""
+        now = time.perf_counter()
+        with self._lock:
+            for name, count in counts.items():
+                self.counts[name] = self.counts.get(name, 0) + count
+            if now - self._last < self.interval:
+                return
+            self._last = now
+            message = self._format(now)
+        self.logger.info(f"{self.label}: {message}")
+
+    def _format(self, now: float) -> str:
+        elapsed = max(now - self._started, 1e-9)
+        parts = []
+        for i, (name, count) in enumerate(self.counts.items()):
+            value = f"{count}/{self.total}" if i == 0 and self.total is not None else str(count)
+            parts.append(f"{COUNTER_LABELS.get(name, name)} {value} ({count / elapsed:.1f}/с)")
+        return ', '.join(parts)
+
+    def summary(self) -> str:
+        """Счетчики с темпом без подписи (для итоговой записи в конце обработки)"""
+        with self._lock:
+            return self._format(time.perf_counter())
@@ -0,0 +1,245 @@
+"""
+Метрики обхода: время по фазам обработки страницы, объем загруженных
+данных, распределение HTTP статусов и исходов извлечения.
+
+Фазы:
+    wait     - ожидание ограничителя темпа, выключателя и пауз между повторами
+    connect  - от отправки запроса до получения заголовков ответа (соединение + TTFB)
+    download - загрузка тела ответа
+    parse    - построение DOM
+    extract  - извлечение полей (включая поиск JSON-LD)
+
+Метрики периодически (не чаще раза в flush_interval секунд) и в конце
+обхода записываются в файл: JSON или, если имя файла оканчивается на
+.prom, текстовый формат Prometheus (для node_exporter textfile collector)
+"""
+import json
+import os
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+PHASES = ('wait', 'connect', 'download', 'parse', 'extract')
+
+# Границы корзин гистограммы времени фаз, секунды
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Статус ответа при сетевой ошибке
+STATUS_NETWORK_ERROR = 'error'
+
+# Исход страницы, статья которой отброшена как почти дубликат
+STATUS_NEAR_DUPLICATE = 'near_duplicate'
+
+
+class _PhaseTiming:
+    """Накопленное время одной фазы"""
+
+    __slots__ = ('count', 'total', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(BUCKETS)
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+
+    def merge(self, data: Dict):
+        self.count += data['count']
+        self.total += data['total']
+        self.max = max(self.max, data['max'])
+        self.buckets = [a + b for a, b in zip(self.buckets, data['buckets'])]
+
+    def to_dict(self) -> Dict:
+        return {'count': self.count, 'total': self.total, 'max': self.max, 'buckets': list(self.buckets)}
+
+
+class CrawlMetrics:
+    """
+    Счетчики обхода, общие для всех потоков
+
+    Args:
+        path: Файл для выгрузки (None - только сводка в лог)
+        flush_interval: Минимальный интервал между выгрузками в секундах
+    """
+
+    def __init__(self, path: Optional[str] = "crawl_metrics.json", flush_interval: float = 10.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._last_flush = self._started
+        self._reset()
+
+    def _reset(self):
+        self.phases = {phase: _PhaseTiming() for phase in PHASES}
+        self.statuses: Dict[str, int] = {}
+        self.outcomes: Dict[str, int] = {}
+        self.bytes = 0
+        self.requests = 0
+
+    def observe(self, phase: str, seconds: float):
+        """Учет времени фазы"""
+        with self._lock:
+            self.phases[phase].observe(seconds)
+        self._maybe_flush()
+
+    @contextmanager
+    def timer(self, phase: str):
+        """Замер времени блока кода как фазы phase"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(phase, time.perf_counter() - started)
+
+    def response(self, status, size: int = 0):
+        """Учет ответа: статус (или STATUS_NETWORK_ERROR) и размер тела в байтах"""
+        key = str(status)
+        with self._lock:
+            self.requests += 1
+            self.bytes += size
+            self.statuses[key] = self.statuses.get(key, 0) + 1
+        self._maybe_flush()
+
+    def outcome(self, status: str):
+        """Учет исхода обработки страницы (ok или причина отказа: no_title, too_short, ...)"""
+        with self._lock:
+            self.outcomes[status] = self.outcomes.get(status, 0) + 1
+        self._maybe_flush()
+
+    def reclassify(self, old: str, new: str):
+        """Перенос одного исхода (статья извлечена, но отброшена на следующем шаге)"""
+        with self._lock:
+            if self.outcomes.get(old):
+                self.outcomes[old] -= 1
+            self.outcomes[new] = self.outcomes.get(new, 0) + 1
+
+    def drain(self) -> Dict:
+        """Накопленные значения со сбросом (для передачи из процесса-обработчика)"""
+        with self._lock:
+            data = {
+                'phases': {phase: timing.to_dict() for phase, timing in self.phases.items() if timing.count},
+                'statuses': self.statuses,
+                'outcomes': self.outcomes,
+                'bytes': self.bytes,
+                'requests': self.requests
+            }
+            self._reset()
+        return data
+
+    def merge(self, data: Dict):
+        """Добавление значений, полученных через drain другого экземпляра"""
+        with self._lock:
+            for phase, timing in data['phases'].items():
+                self.phases[phase].merge(timing)
+            for target, source in ((self.statuses, data['statuses']), (self.outcomes, data['outcomes'])):
+                for key, count in source.items():
+                    target[key] = target.get(key, 0) + count
+            self.bytes += data['bytes']
+            self.requests += data['requests']
+        self._maybe_flush()
+
+    def snapshot(self) -> Dict:
+        """Текущие значения с производными показателями"""
+        with self._lock:
+            elapsed = time.perf_counter() - self._started
+            articles = self.outcomes.get('ok', 0)
+            return {
+                'elapsed': round(elapsed, 3),
+                'requests': self.requests,
+                'bytes': self.bytes,
+                'articles': articles,
+                'articles_per_sec': round(articles / elapsed, 3) if elapsed > 0 else 0.0,
+                'pages_per_sec': round(self.requests / elapsed, 3) if elapsed > 0 else 0.0,
+                'statuses': dict(self.statuses),
+                'outcomes': dict(self.outcomes),
+                'phases': {
+                    phase: {
+                        'count': timing.count,
+                        'total': round(timing.total, 6),
+                        'mean': round(timing.total / timing.count, 6) if timing.count else 0.0,
+                        'max': round(timing.max, 6),
+                        'buckets': dict(zip([str(bound) for bound in BUCKETS], timing.buckets))
+                    }
+                    for phase, timing in self.phases.items()
+                }
+            }
+
+    def to_prometheus(self) -> str:
+        """Метрики в текстовом формате Prometheus"""
+        snapshot = self.snapshot()
+        lines = ['# HELP crawl_phase_seconds Время фаз обработки страницы',
+                 '# TYPE crawl_phase_seconds histogram']
+        for phase, timing in snapshot['phases'].items():
+            cumulative = 0
+            for bound, count in timing['buckets'].items():
+                cumulative += count
+                lines.append(f'crawl_phase_seconds_bucket{{phase="{phase}",le="{bound}"}} {cumulative}')
+            lines.append(f'crawl_phase_seconds_bucket{{phase="{phase}",le="+Inf"}} {timing["count"]}')
+            lines.append(f'crawl_phase_seconds_sum{{phase="{phase}"}} {timing["total"]}')
+            lines.append(f'crawl_phase_seconds_count{{phase="{phase}"}} {timing["count"]}')
+        lines += ['# HELP crawl_responses_total Ответы по HTTP статусам',
+                  '# TYPE crawl_responses_total counter']
+        lines += [f'crawl_responses_total{{status="{status}"}} {count}'
+                  for status, count in sorted(snapshot['statuses'].items())]
+        lines += ['# HELP crawl_outcomes_total Исходы обработки страниц',
+                  '# TYPE crawl_outcomes_total counter']
+        lines += [f'crawl_outcomes_total{{outcome="{outcome}"}} {count}'
+                  for outcome, count in sorted(snapshot['outcomes'].items())]
+        lines += ['# TYPE crawl_bytes_total counter', f"crawl_bytes_total {snapshot['bytes']}",
+                  '# TYPE crawl_articles_per_second gauge',
+                  f"crawl_articles_per_second {snapshot['articles_per_sec']}",
+                  '# TYPE crawl_elapsed_seconds gauge', f"crawl_elapsed_seconds {snapshot['elapsed']}"]
+        return '\n'.join(lines) + '\n'
+
+    def _maybe_flush(self):
+        if self.path and time.perf_counter() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Запись метрик в файл (через временный файл)"""
+        if not self.path:
+            return
+        self._last_flush = time.perf_counter()
+        if self.path.endswith('.prom'):
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+        tmp_path = f"{self.path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Не удалось записать метрики в {self.path}: {e}")
+
+    def summary(self) -> str:
+        """Сводка для лога в конце обхода"""
+        snapshot = self.snapshot()
+        lines = [f"Метрики обхода за {snapshot['elapsed']:.1f} с: запросов {snapshot['requests']}, "
+                 f"{snapshot['bytes'] / 1024 / 1024:.1f} МБ, статей {snapshot['articles']} "
+                 f"({snapshot['articles_per_sec']:.1f} в секунду)"]
+        phase_total = sum(timing['total'] for timing in snapshot['phases'].values()) or 1.0
+        for phase, timing in snapshot['phases'].items():
+            if timing['count']:
+                lines.append(f"  {phase:<9} {timing['total']:>9.2f} с ({timing['total'] / phase_total:>5.1%}), "
+                             f"в среднем {timing['mean'] * 1000:.1f} мс, максимум {timing['max'] * 1000:.1f} мс")
+        if snapshot['statuses']:
+            lines.append("  Статусы: " + ', '.join(f"{status}: {count}"
+                                                  for status, count in sorted(snapshot['statuses'].items())))
+        if snapshot['outcomes']:
+            lines.append("  Исходы: " + ', '.join(f"{outcome}: {count}"
+                                                 for outcome, count in sorted(snapshot['outcomes'].items())))
+        return '\n'.join(lines)
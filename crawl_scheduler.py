@@ -0,0 +1,143 @@
+"""
+Общий планировщик загрузок для одновременного обхода нескольких сайтов.
+
+Все сайты используют один пул из max_workers потоков, но у каждого сайта
+своя очередь задач и свой предел одновременных задач (concurrency).
+Освободившийся поток берет задачу у следующего по кругу сайта, у которого
+есть задачи и свободные слоты, поэтому сайты получают потоки поровну, а
+медленный сайт занимает не больше своего concurrency и не задерживает
+остальные. Темп запросов к каждому сайту ограничивает его собственный
+ограничитель (см. UniversalNewsParser.fetcher_for)
+"""
+import threading
+import logging
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SiteQueue:
+    """
+    Очередь задач одного сайта в CrawlScheduler
+
+    Совместима с ThreadPoolExecutor в той части, которая нужна обходу:
+    submit возвращает concurrent.futures.Future, выход из with ждет
+    завершения всех задач сайта.
+    """
+
+    def __init__(self, scheduler: 'CrawlScheduler', name: str, concurrency: int):
+        self.scheduler = scheduler
+        self.name = name
+        self.concurrency = concurrency
+        self.pending: Deque[Tuple[Future, Callable, tuple, dict]] = deque()
+        self.active = 0
+        self.completed = 0
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Постановка задачи в очередь сайта"""
+        future = Future()
+        with self.scheduler._condition:
+            if self.scheduler._shutdown:
+                raise RuntimeError("Планировщик остановлен")
+            self.pending.append((future, fn, args, kwargs))
+            self.scheduler._condition.notify()
+        return future
+
+    def shutdown(self, wait: bool = True):
+        """Ожидание завершения всех задач сайта"""
+        if not wait:
+            return
+        with self.scheduler._condition:
+            self.scheduler._condition.wait_for(lambda: not self.pending and not self.active)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+
+
+class CrawlScheduler:
+    """
+    Пул потоков с поочередной выдачей задач сайтам
+
+    Args:
+        max_workers: Общее число потоков (одновременных запросов по всем сайтам)
+    """
+
+    def __init__(self, max_workers: int = 16):
+        self.max_workers = max_workers
+        self._condition = threading.Condition()
+        self._sites: Dict[str, SiteQueue] = {}
+        self._order: List[SiteQueue] = []
+        self._next = 0
+        self._shutdown = False
+        self._threads = [threading.Thread(target=self._worker, name=f"crawl-{i}", daemon=True)
+                         for i in range(max_workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def site(self, name: str, concurrency: int) -> SiteQueue:
+        """Очередь сайта (создается при первом обращении)"""
+        with self._condition:
+            queue = self._sites.get(name)
+            if queue is None:
+                queue = SiteQueue(self, name, max(1, concurrency))
+                self._sites[name] = queue
+                self._order.append(queue)
+            return queue
+
+    def _take(self) -> Optional[Tuple[SiteQueue, Tuple[Future, Callable, tuple, dict]]]:
+        """Следующая задача по кругу сайтов (вызывается под блокировкой)"""
+        for offset in range(len(self._order)):
+            queue = self._order[(self._next + offset) % len(self._order)]
+            if queue.pending and queue.active < queue.concurrency:
+                self._next = (self._next + offset + 1) % len(self._order)
+                queue.active += 1
+                return queue, queue.pending.popleft()
+        return None
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                while True:
+                    taken = self._take()
+                    if taken is not None or self._shutdown:
+                        break
+                    self._condition.wait()
+                if taken is None:
+                    return
+            queue, (future, fn, args, kwargs) = taken
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                except BaseException as e:
+                    future.set_exception(e)
+            with self._condition:
+                queue.active -= 1
+                queue.completed += 1
+                # Освободился слот сайта: задачу может взять любой ожидающий поток
+                self._condition.notify_all()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Выполненные, выполняемые и ожидающие задачи по сайтам"""
+        with self._condition:
+            return {queue.name: {'completed': queue.completed, 'active': queue.active,
+                                 'pending': len(queue.pending)} for queue in self._order}
+
+    def shutdown(self, wait: bool = True):
+        """Остановка потоков после выполнения поставленных задач"""
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
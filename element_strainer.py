@@ -0,0 +1,137 @@
+"""
+Отбор элементов для частичного разбора HTML по селекторам сайта.
+
+Для каждого CSS-селектора берется первое составное условие (до первого
+пробела или '>'): элементы, подходящие под него, сохраняются вместе со всем
+поддеревом, остальная разметка (скрипты, меню, подвал и т.д.) в дерево не
+попадает. Селекторы с потомками (".tags a", ".doc_text > p") при этом
+находят те же элементы, что и в полном дереве.
+
+Поддерживаются условия вида tag#id.class[attr], [attr=value] и операторы
+~= |= ^= $= *=. Для селекторов с псевдоклассами и соседними комбинаторами
+(+, ~) частичный разбор невозможен - такой сайт разбирается полностью
+"""
+import re
+import logging
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+COMPOUND_RE = re.compile(r'''
+    (?P<tag>[A-Za-z][\w-]*|\*)?
+    (?P<parts>(?:\#[\w-]+|\.[\w-]+|\[[^\]]*\])*)
+''', re.VERBOSE)
+PART_RE = re.compile(r'#([\w-]+)|\.([\w-]+)|\[([^\]]*)\]')
+ATTR_RE = re.compile(r'''^\s*([\w:-]+)\s*(?:([~|^$*]?=)\s*(?:"([^"]*)"|'([^']*)'|([^\s"']+)))?\s*$''')
+
+
+class _Compound(NamedTuple):
+    tag: Optional[str]
+    attrs: Tuple[Tuple[str, Optional[str], Optional[str]], ...]  # (атрибут, оператор, значение)
+
+
+def _attr_value_matches(actual: str, op: Optional[str], value: Optional[str]) -> bool:
+    if op is None:
+        return True
+    if op == '=':
+        return actual == value
+    if op == '~=':
+        return value in actual.split()
+    if op == '|=':
+        return actual == value or actual.startswith(value + '-')
+    if not value:
+        return False  # ^= $= *= с пустым значением не совпадают ни с чем (CSS)
+    if op == '^=':
+        return actual.startswith(value)
+    if op == '$=':
+        return actual.endswith(value)
+    return value in actual
+
+
+def parse_compound(selector: str) -> Optional[_Compound]:
+    """Первое составное условие селектора или None, если оно не поддерживается"""
+    selector = selector.strip()
+    match = COMPOUND_RE.match(selector)
+    rest = selector[match.end():]
+    if not match.group(0) or (rest and rest[0] not in ' \t\n>'):
+        return None
+    if re.search(r'[+~]|:', re.sub(r'\[[^\]]*\]', '', rest)):
+        return None  # псевдоклассы и соседние элементы вне поддерева
+
+    attrs = []
+    for id_, class_, attr in PART_RE.findall(match.group('parts')):
+        if id_:
+            attrs.append(('id', '=', id_))
+        elif class_:
+            attrs.append(('class', '~=', class_))
+        else:
+            parsed = ATTR_RE.match(attr)
+            if not parsed:
+                return None
+            name, op, double, single, bare = parsed.groups()
+            attrs.append((name.lower(), op, double if double is not None else
+                          single if single is not None else bare))
+    tag = match.group('tag')
+    return _Compound(tag.lower() if tag and tag != '*' else None, tuple(attrs))
+
+
+class ElementStrainer:
+    """
+    Условие сохранения элемента при частичном разборе
+
+    Используйте for_selectors: он возвращает None, если какой-то селектор
+    не поддерживается и страницы нужно разбирать полностью.
+    """
+
+    def __init__(self, compounds: List[_Compound]):
+        self.compounds = compounds
+        # Индексы для быстрого отказа: большинство элементов страницы (ссылки
+        # меню, пункты списков) не подходят ни под один селектор
+        self._by_tag: Dict[str, List[_Compound]] = {}
+        self._by_class: Dict[str, List[_Compound]] = {}
+        self._by_attr: Dict[str, List[_Compound]] = {}
+        for compound in compounds:
+            if compound.tag is not None:
+                self._by_tag.setdefault(compound.tag, []).append(compound)
+            elif compound.attrs and compound.attrs[0][:2] == ('class', '~='):
+                self._by_class.setdefault(compound.attrs[0][2], []).append(compound)
+            elif compound.attrs:
+                self._by_attr.setdefault(compound.attrs[0][0], []).append(compound)
+            else:
+                self._by_tag.setdefault('*', []).append(compound)
+
+    @classmethod
+    def for_selectors(cls, selectors: Iterable[str]) -> Optional['ElementStrainer']:
+        compounds = []
+        for selector in selectors:
+            compound = parse_compound(selector)
+            if compound is None:
+                logger.info(f"Селектор {selector!r} не поддерживает частичный разбор, "
+                            f"страницы будут разбираться полностью")
+                return None
+            if compound not in compounds:
+                compounds.append(compound)
+        return cls(compounds)
+
+    @staticmethod
+    def _compound_matches(compound: _Compound, attrs) -> bool:
+        for attr, op, value in compound.attrs:
+            actual = attrs.get(attr) if attrs else None
+            if isinstance(actual, list):
+                actual = ' '.join(actual)
+            if actual is None or not _attr_value_matches(actual, op, value):
+                return False
+        return True
+
+    def matches(self, name: str, attrs) -> bool:
+        """Сохранять ли элемент с именем name и атрибутами attrs (со всем поддеревом)"""
+        candidates = self._by_tag.get(name.lower(), []) + self._by_tag.get('*', [])
+        if attrs:
+            classes = attrs.get('class')
+            if classes and self._by_class:
+                for class_name in (classes.split() if isinstance(classes, str) else classes):
+                    candidates += self._by_class.get(class_name, [])
+            for attr in self._by_attr:
+                if attr in attrs:
+                    candidates += self._by_attr[attr]
+        return any(self._compound_matches(compound, attrs) for compound in candidates)
@@ -0,0 +1,251 @@
+"""
+Двухстадийный конвейер обхода: потоки ввода-вывода загружают страницы
+и через ограниченную очередь передают сырые байты в пул процессов,
+где выполняется разбор HTML и извлечение полей статьи
+"""
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from requests.adapters import HTTPAdapter
+
+from http_fetcher import FetchResult
+from crawl_frontier import CrawlFrontier, STATUS_OK, STATUS_ERROR, STATUS_EXTRACTED
+from crawl_metrics import CrawlMetrics
+from crawl_logging import ProgressLogger
+from page_variants import FULL_PAGE
+
+logger = logging.getLogger(__name__)
+
+# Парсер, созданный в процессе-обработчике (по одному на процесс)
+_worker_parser = None
+
+# Маркер окончания очереди
+_DONE = object()
+
+
+def _init_worker(parser_class, parser_config: Dict):
+    """Инициализация процесса-обработчика"""
+    global _worker_parser
+    _worker_parser = parser_class(**parser_config)
+    # Метрики процесса передаются в основной процесс вместе с каждым результатом
+    _worker_parser.metrics = CrawlMetrics(path=None)
+
+
+def _extract_in_worker(content: bytes, url: str) -> Tuple[Optional[Dict], str, Dict]:
+    """Извлечение статьи в процессе-обработчике (статья, исход, метрики извлечения)"""
+    try:
+        article, status = _worker_parser._extract_article_with_status(content, url)
+    except Exception as e:
+        logger.error(f"Ошибка при парсинге статьи {url}: {e}")
+        article, status = None, STATUS_ERROR
+        _worker_parser.metrics.outcome(STATUS_ERROR)
+    return article, status, _worker_parser.metrics.drain()
+
+
+def _extract_batch_in_worker(batch: List[Tuple[bytes, str]]) -> List[Optional[Dict]]:
+    """Извлечение пачки статей в процессе-обработчике (повторное извлечение из архива)"""
+    articles = []
+    for content, url in batch:
+        try:
+            articles.append(_worker_parser.extract_article(content, url))
+        except Exception as e:
+            logger.error(f"Ошибка при парсинге статьи {url}: {e}")
+            articles.append(None)
+    return articles
+
+
+class ExtractionPipeline:
+    """
+    Конвейер «загрузка -> извлечение» для парсера Коммерсанта
+
+    Загруженные страницы попадают в очередь размером queue_size. Если
+    процессы-обработчики не успевают, очередь заполняется и потоки загрузки
+    блокируются, поэтому потребление памяти ограничено независимо от длины обхода.
+
+    Args:
+        parser: Экземпляр KommersantParser (сетевые настройки и конфигурация извлечения)
+        io_workers: Количество потоков загрузки
+        extract_workers: Количество процессов извлечения (по умолчанию - число CPU)
+        queue_size: Емкость очереди загруженных страниц
+    """
+
+    def __init__(self, parser, io_workers: int = 8, extract_workers: Optional[int] = None,
+                 queue_size: int = 64):
+        self.parser = parser
+        self.io_workers = io_workers
+        self.extract_workers = extract_workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._results: Dict[int, Dict] = {}
+        self._collected = 0
+        # ID статей, переданных в sink, но еще не сброшенных на диск
+        self._unconfirmed: List[int] = []
+        self.pages_fetched = 0
+        self._progress = ProgressLogger(logger, "Конвейер")
+
+    def _io_worker(self, ids, pages: queue.Queue):
+        """Поток загрузки: берет ID и кладет загруженные страницы в очередь"""
+        # Общий загрузчик парсера: пул соединений requests.Session потокобезопасен
+        fetcher = self.parser.fetcher
+        while not self._stop.is_set():
+            with self._lock:
+                article_id = next(ids, None)
+            if article_id is None:
+                break
+
+            url = self.parser.article_url(article_id)
+            try:
+                # Статья из облегченного варианта страницы извлекается здесь же:
+                # в очередь попадает готовый исход (статья, код)
+                variant = self.parser._fetch_variant(url)
+                result = variant if variant is not None else fetcher.fetch(url)
+            except Exception as e:
+                result = FetchResult(url=url, status=0, error=f"{type(e).__name__}: {e}")
+            with self._lock:
+                self.pages_fetched += 1
+
+            # put блокируется при заполненной очереди - это и есть обратное давление.
+            # Темп запросов ограничивает общий для всех потоков rate_limiter загрузчика
+            pages.put((article_id, result))
+        pages.put(_DONE)
+
+    def run(self, ids: Iterable[int], max_articles: Optional[int] = None,
+            frontier: Optional[CrawlFrontier] = None) -> List[Dict]:
+        """
+        Обход ID через конвейер
+
+        Returns:
+            Статьи в порядке возрастания ID (как у parse_article_range);
+            при заданном parser.sink - пустой список, статьи записаны в sink
+        """
+        ids = iter(ids)
+        self._results = {}
+        self._collected = 0
+        self._unconfirmed = []
+        self._stop.clear()
+        self.pages_fetched = 0
+        self._progress = ProgressLogger(logger, "Конвейер")
+        pages = queue.Queue(maxsize=self.queue_size)
+        # Ограничение числа задач, переданных в пул, но еще не завершенных
+        in_flight = threading.BoundedSemaphore(self.extract_workers * 2)
+
+        def on_done(article_id: int, size: int, future: Future):
+            in_flight.release()
+            try:
+                article, status, metrics = future.result()
+            except Exception as e:
+                logger.error(f"Ошибка процесса извлечения для ID {article_id}: {e}")
+                article, status, metrics = None, STATUS_ERROR, None
+            seconds = sum(metrics['phases'][phase]['total'] for phase in ('parse', 'extract')
+                          if phase in metrics['phases']) if metrics is not None else 0.0
+            self.parser.variant_stats.record(FULL_PAGE, size, seconds, article is not None)
+            if self.parser.metrics is not None:
+                if metrics is not None:
+                    self.parser.metrics.merge(metrics)
+                else:
+                    self.parser.metrics.outcome(STATUS_ERROR)
+            self._record(article_id, article, status, frontier, max_articles)
+
+        # Пул соединений сессии должен вмещать все потоки загрузки; прежние адаптеры
+        # сессии вызывающего кода восстанавливаются после обхода
+        original_adapters = self.parser.session.adapters.copy()
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=max(10, self.io_workers))
+        self.parser.session.mount('http://', adapter)
+        self.parser.session.mount('https://', adapter)
+        started = time.perf_counter()
+        try:
+            # Процессы-обработчики запускаются через spawn: fork процесса с работающими
+            # потоками (загрузки, логирования) может унаследовать захваченную блокировку
+            # и зависнуть
+            with ProcessPoolExecutor(
+                max_workers=self.extract_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(type(self.parser), self.parser.extraction_config())
+            ) as pool:
+                io_threads = [
+                    threading.Thread(target=self._io_worker, args=(ids, pages), daemon=True)
+                    for _ in range(self.io_workers)
+                ]
+                for thread in io_threads:
+                    thread.start()
+
+                finished_workers = 0
+                while finished_workers < len(io_threads):
+                    item = pages.get()
+                    if item is _DONE:
+                        finished_workers += 1
+                        continue
+
+                    article_id, result = item
+                    if isinstance(result, tuple):
+                        article, status = self.parser._variant_outcome(result)
+                        self._record(article_id, article, status, frontier, max_articles)
+                        continue
+                    if not result.ok or result.unchanged:
+                        # Ошибки загрузки, 404 и неизменившиеся страницы не требуют разбора HTML
+                        article, status = self.parser._article_from_result(result)
+                        self._record(article_id, article, status, frontier, max_articles)
+                        continue
+
+                    in_flight.acquire()
+                    future = pool.submit(_extract_in_worker, result.content, result.url)
+                    future.add_done_callback(lambda f, article_id=article_id, size=len(result.content):
+                                             on_done(article_id, size, f))
+
+            for thread in io_threads:
+                thread.join()
+        finally:
+            self.parser.session.adapters = original_adapters
+            adapter.close()
+
+        # Почти дубликаты отбираются в порядке ID, чтобы результат не зависел от порядка ответов
+        articles = [article for article in (self.parser._unique(self._results[article_id])
+                                            for article_id in sorted(self._results))
+                    if article is not None]
+        if max_articles is not None:
+            articles = articles[:max_articles]
+
+        elapsed = time.perf_counter() - started
+        logger.info(f"Конвейер завершен: {self.pages_fetched} страниц, {self._collected} статей "
+                    f"за {elapsed:.1f} с")
+        self.parser._finish_run()
+        self.parser._confirm_written(frontier, self._unconfirmed)
+        return articles
+
+    def _record(self, article_id: int, article: Optional[Dict], status: str,
+                frontier: Optional[CrawlFrontier], max_articles: Optional[int]):
+        """Сохранение исхода обработки ID"""
+        self._progress.update(pages=1, articles=int(status == STATUS_OK and bool(article)))
+        if status != STATUS_OK or not article:
+            self.parser._record_miss(frontier, article_id, status)
+            logger.debug(f"Статья с ID {article_id} не найдена или не удалось спарсить")
+            return
+        with self._lock:
+            if self.parser.sink is not None:
+                # Потоковая запись: статьи не накапливаются в памяти конвейера,
+                # лишние сверх max_articles не пишутся (их ID обрабатываются при возобновлении)
+                if max_articles is not None and self._collected >= max_articles:
+                    if frontier is not None:
+                        frontier.record(article_id, STATUS_EXTRACTED)
+                    return
+                article = self.parser._unique(article)
+                if article is not None:
+                    self.parser.sink.write(article)
+                self.parser._record_article(frontier, article_id, article is not None, self._unconfirmed)
+                if article is None:
+                    return
+            else:
+                self._results[article_id] = article
+                self.parser._record_article(frontier, article_id, True, self._unconfirmed)
+            self._collected += 1
+            if max_articles is not None and self._collected >= max_articles:
+                self._stop.set()
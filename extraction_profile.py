@@ -0,0 +1,196 @@
+"""
+Профили извлечения: списки селекторов по полям статьи с учетом
+статистики срабатываний.
+
+Для каждого поля селекторы пробуются по очереди до первого уверенного
+результата (его определяет функция проверки поля). С adaptive=True после
+периода разогрева селекторы, которые пробовались на каждой странице и ни
+разу не сработали, уходят за сработавшим, поэтому обычно хватает одного
+select_one на поле. Отчет показывает селекторы, которые ни разу не сработали,
+чтобы их можно было убрать из конфигурации.
+
+Общий запасной селектор (h1, [class*="doc_text"]) пробуется только после
+промахов более точных, и его доля срабатываний условная - почти всегда 100%.
+Поэтому вперед не переносятся селекторы, пропущенные хотя бы на одной
+странице: иначе менялся бы не только темп, но и извлекаемый элемент
+"""
+import threading
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def collect_tags(selector: str, soup) -> List[str]:
+    """Теги по одному селектору: список из meta keywords или тексты элементов"""
+    if selector.startswith('meta'):
+        elem = soup.select_one(selector)
+        content = elem.get('content', '') if elem is not None else ''
+        return [tag.strip() for tag in content.split(',')] if content else []
+    return [tag for tag in (elem.get_text().strip() for elem in soup.select(selector)) if tag]
+
+
+class FieldSelectors:
+    """
+    Селекторы одного поля со статистикой
+
+    Args:
+        name: Название поля
+        selectors: Селекторы в заданном порядке (он же используется при равенстве долей)
+        adaptive: Переупорядочивать селекторы по доле срабатываний
+        warmup: Сколько страниц использовать исходный порядок
+        reorder_every: Как часто (в страницах) пересчитывать порядок
+    """
+
+    def __init__(self, name: str, selectors: List[str], adaptive: bool = True,
+                 warmup: int = 20, reorder_every: int = 50):
+        self.name = name
+        self.selectors = list(selectors)
+        self.adaptive = adaptive
+        self.warmup = warmup
+        self.reorder_every = reorder_every
+        self.attempts = {selector: 0 for selector in self.selectors}
+        self.hits = {selector: 0 for selector in self.selectors}
+        self.pages = 0
+        self._order = list(self.selectors)
+        self._lock = threading.Lock()
+
+    def hit_rate(self, selector: str) -> float:
+        attempts = self.attempts[selector]
+        return self.hits[selector] / attempts if attempts else 0.0
+
+    def _reorder(self):
+        # Доли сравнимы только у селекторов, опробованных на всех страницах
+        # (начало текущего порядка); остальные сохраняют свои места после них
+        rank = {selector: index for index, selector in enumerate(self.selectors)}
+        tried_always = [selector for selector in self._order if self.attempts[selector] == self.pages]
+        rest = [selector for selector in self._order if self.attempts[selector] != self.pages]
+        self._order = sorted(tried_always, key=lambda s: (-self.hit_rate(s), rank[s])) + rest
+
+    def order(self) -> List[str]:
+        """Текущий порядок перебора селекторов"""
+        return self._order
+
+    def _record(self, tried: List[str], hit: Optional[str]):
+        """Учет попыток одной страницы (одна блокировка на поле)"""
+        with self._lock:
+            self.pages += 1
+            for selector in tried:
+                self.attempts[selector] += 1
+            if hit is not None:
+                self.hits[hit] += 1
+            since_warmup = self.pages - self.warmup
+            if self.adaptive and since_warmup >= 0 and since_warmup % self.reorder_every == 0:
+                self._reorder()
+
+    def first(self, soup, accept: Callable[[Any], Optional[Any]]) -> Optional[Any]:
+        """
+        Значение поля по первому селектору, давшему уверенный результат
+
+        Args:
+            soup: Разобранная страница (BeautifulSoup или адаптер lxml)
+            accept: Проверка найденного элемента: значение поля или None
+        """
+        order = self._order
+        for position, selector in enumerate(order):
+            elem = soup.select_one(selector)
+            value = accept(elem) if elem is not None else None
+            if value is not None:
+                self._record(order[:position + 1], selector)
+                return value
+        self._record(order, None)
+        return None
+
+    def each(self, soup, collect: Callable[[str, Any], List[Any]]) -> List[Any]:
+        """Значения по всем селекторам (для полей-списков, например тегов)"""
+        values = []
+        fired = []
+        for selector in self.selectors:
+            found = collect(selector, soup)
+            if found:
+                fired.append(selector)
+                values.extend(found)
+        with self._lock:
+            self.pages += 1
+            for selector in self.selectors:
+                self.attempts[selector] += 1
+            for selector in fired:
+                self.hits[selector] += 1
+        return values
+
+
+class ExtractionProfile:
+    """
+    Набор селекторов сайта по полям
+
+    Args:
+        fields: Поле -> список селекторов
+        adaptive: Переупорядочивать селекторы по доле срабатываний
+        warmup: Сколько страниц использовать исходный порядок
+    """
+
+    def __init__(self, fields: Dict[str, List[str]], adaptive: bool = True, warmup: int = 20):
+        self.fields = {name: FieldSelectors(name, selectors, adaptive, warmup)
+                       for name, selectors in fields.items()}
+
+    @classmethod
+    def from_site_config(cls, config: Dict, defaults: Optional[Dict[str, List[str]]] = None,
+                         warmup: int = 20) -> 'ExtractionProfile':
+        """
+        Профиль из конфигурации сайта (ключи вида 'title_selectors')
+
+        defaults - селекторы полей, не заданных в конфигурации
+        """
+        fields = dict(defaults or {})
+        for key, selectors in config.items():
+            if key.endswith('_selectors'):
+                fields[key[:-len('_selectors')]] = selectors
+        return cls(fields, adaptive=config.get('adaptive_selectors', False), warmup=warmup)
+
+    def __getitem__(self, name: str) -> FieldSelectors:
+        return self.fields[name]
+
+    def first(self, name: str, soup, accept: Callable[[Any], Optional[Any]]) -> Optional[Any]:
+        return self.fields[name].first(soup, accept)
+
+    def selectors(self) -> List[str]:
+        """Все селекторы профиля (для частичного разбора страниц)"""
+        return [selector for field in self.fields.values() for selector in field.selectors]
+
+    def report(self) -> List[Dict]:
+        """Статистика по каждому селектору"""
+        rows = []
+        for field in self.fields.values():
+            for position, selector in enumerate(field.order()):
+                rows.append({
+                    'field': field.name,
+                    'selector': selector,
+                    'position': position,
+                    'attempts': field.attempts[selector],
+                    'hits': field.hits[selector],
+                    'hit_rate': round(field.hit_rate(selector), 3)
+                })
+        return rows
+
+    def never_fired(self) -> Dict[str, List[str]]:
+        """Селекторы, ни разу не давшие результата (кандидаты на удаление)"""
+        unused = {}
+        for field in self.fields.values():
+            if field.pages:
+                selectors = [selector for selector in field.selectors if not field.hits[selector]]
+                if selectors:
+                    unused[field.name] = selectors
+        return unused
+
+    def format_report(self) -> str:
+        """Текстовый отчет о срабатывании селекторов"""
+        lines = [f"{'Поле':<10} {'Селектор':<40} {'Попыток':>8} {'Попаданий':>10} {'Доля':>6}"]
+        for row in self.report():
+            lines.append(f"{row['field']:<10} {row['selector']:<40} {row['attempts']:>8} "
+                         f"{row['hits']:>10} {row['hit_rate']:>6.2f}")
+        unused = self.never_fired()
+        if unused:
+            lines.append("Ни разу не сработали:")
+            for field, selectors in unused.items():
+                lines.append(f"  {field}: {', '.join(selectors)}")
+        return '\n'.join(lines)
@@ -0,0 +1,212 @@
+"""
+Поиск ссылок на статьи по sitemap.xml (включая индексы sitemap) и RSS/Atom лентам.
+
+Вместо загрузки и полного разбора HTML страниц категорий адреса статей
+берутся из машиночитаемых файлов, объявленных в site_configs:
+
+    'sitemaps': ['/sitemap.xml'],
+    'feeds': ['/RSS/news.xml'],
+
+Файлы разбираются потоково (xml.etree.ElementTree.iterparse, обработанные
+элементы сразу удаляются), а записи и вложенные sitemap с lastmod раньше
+прошлого запуска пропускаются
+"""
+import gzip
+import io
+import json
+import os
+import threading
+import logging
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterator, List, NamedTuple, Optional
+from urllib.parse import urljoin
+
+logger = logging.getLogger(__name__)
+
+
+class FeedEntry(NamedTuple):
+    """Ссылка на статью из sitemap или ленты"""
+    url: str
+    lastmod: Optional[datetime] = None
+    category: Optional[str] = None
+
+
+def parse_feed_date(value: Optional[str]) -> Optional[datetime]:
+    """Дата из sitemap (W3C/ISO 8601) или RSS (RFC 822), приведенная к UTC"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        try:
+            moment = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+
+def _local_name(tag: str) -> str:
+    """Имя тега без пространства имен ({http://...}loc -> loc)"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _child_text(elem, name: str) -> Optional[str]:
+    for child in elem:
+        if _local_name(child.tag) == name:
+            return (child.text or '').strip() or None
+    return None
+
+
+def iter_xml_entries(stream) -> Iterator[tuple]:
+    """
+    Потоковый разбор sitemap, индекса sitemap, RSS или Atom
+
+    Yields:
+        ('url', FeedEntry) - ссылка на страницу
+        ('sitemap', FeedEntry) - вложенный sitemap из индекса
+    """
+    root = None
+    for event, elem in ET.iterparse(stream, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = elem
+            continue
+
+        name = _local_name(elem.tag)
+        if name in ('url', 'sitemap'):
+            loc = _child_text(elem, 'loc')
+            if loc:
+                kind = 'url' if name == 'url' else 'sitemap'
+                yield kind, FeedEntry(loc, parse_feed_date(_child_text(elem, 'lastmod')))
+        elif name == 'item':
+            link = _child_text(elem, 'link')
+            if link:
+                yield 'url', FeedEntry(link, parse_feed_date(_child_text(elem, 'pubDate')),
+                                       _child_text(elem, 'category'))
+        elif name == 'entry':
+            link = next((child.get('href') for child in elem
+                         if _local_name(child.tag) == 'link' and child.get('rel', 'alternate') == 'alternate'),
+                        None)
+            if link:
+                updated = _child_text(elem, 'updated') or _child_text(elem, 'published')
+                yield 'url', FeedEntry(link, parse_feed_date(updated))
+        else:
+            continue
+
+        # Обработанные записи удаляются из дерева - память не растет с размером файла
+        elem.clear()
+        if root is not None:
+            root.clear()
+
+
+class FeedDiscovery:
+    """
+    Обнаружение статей сайта по sitemap и лентам
+
+    Время последнего запуска по каждому сайту хранится в state_path; при
+    следующем запуске пропускаются записи с lastmod раньше этого времени.
+
+    Args:
+        fetcher: HttpFetcher для загрузки файлов
+        state_path: JSON файл с временем прошлых запусков (None - не сохранять)
+        max_sitemaps: Ограничение числа загружаемых sitemap за проход (защита от циклов)
+    """
+
+    def __init__(self, fetcher, state_path: Optional[str] = "feed_state.json", max_sitemaps: int = 1000):
+        self.fetcher = fetcher
+        self.state_path = state_path
+        self.max_sitemaps = max_sitemaps
+        self.state: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        if state_path and os.path.exists(state_path):
+            with open(state_path, 'r', encoding='utf-8') as f:
+                self.state = json.load(f)
+        self.files_fetched = 0
+        self.entries_skipped = 0
+
+    def last_run(self, site_name: str) -> Optional[datetime]:
+        """Время прошлого запуска для сайта"""
+        return parse_feed_date(self.state.get(site_name))
+
+    def mark_run(self, site_name: str, started_at: datetime):
+        """
+        Запоминание времени запуска
+
+        Вызывается только после полного прохода без ошибок загрузки файлов:
+        записи, найденные, но не обработанные, иначе отсекались бы по lastmod
+        при следующем запуске
+        """
+        with self._lock:
+            self.state[site_name] = started_at.astimezone(timezone.utc).isoformat()
+            if self.state_path:
+                tmp_path = self.state_path + '.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.state, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, self.state_path)
+
+    def _open(self, url: str):
+        """Загрузка XML файла; поток для iterparse или None при ошибке"""
+        try:
+            result = self.fetcher.fetch(url, use_cache=False)
+            result.raise_for_status()
+        except Exception as e:
+            logger.error(f"Не удалось загрузить {url}: {e}")
+            return None
+        self.files_fetched += 1
+        stream = io.BytesIO(result.content)
+        if url.endswith('.gz') or result.content[:2] == b'\x1f\x8b':
+            stream = gzip.GzipFile(fileobj=stream)
+        return stream
+
+    def discover(self, config: Dict, since: Optional[datetime] = None,
+                 failures: Optional[List[str]] = None) -> Iterator[FeedEntry]:
+        """
+        Ссылки на статьи из sitemap и лент сайта (без повторов внутри прохода)
+
+        Args:
+            config: Конфигурация сайта из site_configs (ключи 'sitemaps' и 'feeds')
+            since: Пропускать записи с lastmod раньше этого времени (None - брать все)
+            failures: Список, в который добавляются URL файлов, не загруженных или
+                не разобранных до конца (в том числе сверх max_sitemaps)
+        """
+        pending: List[str] = [urljoin(config['base_url'], path)
+                              for path in config.get('feeds', []) + config.get('sitemaps', [])]
+        visited = set()
+        emitted = set()
+
+        while pending and len(visited) < self.max_sitemaps:
+            url = pending.pop(0)
+            if url in visited:
+                continue
+            visited.add(url)
+            stream = self._open(url)
+            if stream is None:
+                if failures is not None:
+                    failures.append(url)
+                continue
+
+            try:
+                for kind, entry in iter_xml_entries(stream):
+                    if since is not None and entry.lastmod is not None and entry.lastmod < since:
+                        self.entries_skipped += 1
+                        continue
+                    if kind == 'sitemap':
+                        pending.append(urljoin(url, entry.url))
+                    elif entry.url not in emitted:
+                        emitted.add(entry.url)
+                        yield entry._replace(url=urljoin(config['base_url'], entry.url))
+            except (ET.ParseError, EOFError, OSError) as e:
+                logger.error(f"Ошибка разбора {url}: {e}")
+                if failures is not None:
+                    failures.append(url)
+
+        if failures is not None:
+            failures.extend(url for url in pending if url not in visited)
+
+        logger.info(f"Обнаружение по sitemap/лентам: файлов {self.files_fetched}, ссылок {len(emitted)}, "
+                    f"пропущено по lastmod {self.entries_skipped}")
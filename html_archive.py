@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Сжатый архив загруженных страниц и повторное извлечение статей без сети.
+
+Каждый ответ сервера сохраняется отдельной записью в формате WARC
+(URL, статус, заголовки, тело) и сжимается отдельным gzip-блоком, как в
+файлах .warc.gz. Архив только дописывается; оборванная при сбое последняя
+запись при чтении пропускается
+"""
+import argparse
+import gzip
+import json
+import os
+import threading
+import uuid
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from http_fetcher import FetchResult
+
+logger = logging.getLogger(__name__)
+
+WARC_VERSION = b'WARC/1.0'
+
+
+class HtmlArchive:
+    """
+    Архив ответов сервера, пригодный для записи из нескольких потоков
+
+    Args:
+        path: Путь к файлу архива (.warc.gz)
+        compresslevel: Уровень сжатия gzip (1-9)
+    """
+
+    def __init__(self, path: str = "kommersant_pages.warc.gz", compresslevel: int = 6):
+        self.path = path
+        self.compresslevel = compresslevel
+        self.records_written = 0
+        self._lock = threading.Lock()
+        self._file = open(path, 'ab')
+
+    def write(self, result: FetchResult):
+        """Добавление ответа в архив"""
+        if result.error is not None:
+            return  # ответа сервера не было - сохранять нечего
+
+        status_line = f"HTTP/1.1 {result.status}\r\n".encode('latin-1')
+        header_lines = ''.join(f"{name}: {value}\r\n" for name, value in result.headers.items()
+                               if name.lower() not in ('content-length', 'content-encoding', 'transfer-encoding'))
+        http_block = (status_line + header_lines.encode('utf-8', 'replace')
+                      + f"Content-Length: {len(result.content)}\r\n\r\n".encode('latin-1')
+                      + result.content)
+
+        warc_headers = (
+            f"WARC-Type: response\r\n"
+            f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>\r\n"
+            f"WARC-Date: {datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}\r\n"
+            f"WARC-Target-URI: {result.url}\r\n"
+            f"Content-Type: application/http; msgtype=response\r\n"
+            f"Content-Length: {len(http_block)}\r\n"
+        ).encode('utf-8')
+        record = WARC_VERSION + b'\r\n' + warc_headers + b'\r\n' + http_block + b'\r\n\r\n'
+
+        # Отдельный gzip-блок на запись: архив можно читать и дописывать по записям
+        compressed = gzip.compress(record, compresslevel=self.compresslevel)
+        with self._lock:
+            self._file.write(compressed)
+            self._file.flush()
+            self.records_written += 1
+
+    def close(self):
+        """Закрытие архива"""
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _read_headers(stream) -> Optional[Dict[str, str]]:
+    """Чтение блока заголовков до пустой строки"""
+    headers = {}
+    while True:
+        line = stream.readline()
+        if not line:
+            return None
+        line = line.rstrip(b'\r\n')
+        if not line:
+            return headers
+        name, _, value = line.decode('utf-8', 'replace').partition(':')
+        headers[name.strip()] = value.strip()
+
+
+def iter_records(path: str) -> Iterator[FetchResult]:
+    """Последовательное чтение записей архива"""
+    with gzip.open(path, 'rb') as stream:
+        try:
+            while True:
+                version = stream.readline()
+                if not version:
+                    break
+                if version.strip() != WARC_VERSION:
+                    continue  # пустые строки между записями
+                warc_headers = _read_headers(stream)
+                if warc_headers is None:
+                    break
+                block = stream.read(int(warc_headers.get('Content-Length', 0)))
+
+                head, _, body = block.partition(b'\r\n\r\n')
+                status_line, _, header_lines = head.partition(b'\r\n')
+                status = int(status_line.split()[1])
+                headers = {}
+                for line in header_lines.split(b'\r\n'):
+                    name, _, value = line.decode('utf-8', 'replace').partition(':')
+                    if name:
+                        headers[name.strip()] = value.strip()
+
+                yield FetchResult(
+                    url=warc_headers.get('WARC-Target-URI', ''),
+                    status=status,
+                    content=body,
+                    headers=headers
+                )
+        except (EOFError, gzip.BadGzipFile, ValueError, IndexError) as e:
+            logger.warning(f"Архив {path} оборван или поврежден, чтение остановлено: {e}")
+
+
+def replay_archive(path: str, parser, workers: Optional[int] = None,
+                   batch_size: int = 32) -> Iterator[Dict]:
+    """
+    Повторное извлечение статей из архива без обращения к сети
+
+    Страницы со статусом 200 пачками передаются в пул процессов; в работе
+    одновременно не больше workers * 2 пачек, поэтому память не растет
+    с размером архива. Статьи выдаются в порядке записей архива.
+
+    Args:
+        path: Путь к архиву
+        parser: KommersantParser или UniversalNewsParser с нужными селекторами
+        workers: Количество процессов (по умолчанию - число CPU)
+        batch_size: Количество страниц в одной задаче пула
+    """
+    from extraction_pipeline import _init_worker, _extract_batch_in_worker
+
+    workers = workers or os.cpu_count() or 1
+    pending = deque()
+
+    def batches() -> Iterator[List[Tuple[bytes, str]]]:
+        batch = []
+        for record in iter_records(path):
+            if record.status != 200:
+                continue
+            batch.append((record.content, record.url))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(type(parser), parser.extraction_config())) as pool:
+        for batch in batches():
+            pending.append(pool.submit(_extract_batch_in_worker, batch))
+            if len(pending) >= workers * 2:
+                yield from (article for article in pending.popleft().result() if article)
+        while pending:
+            yield from (article for article in pending.popleft().result() if article)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Повторное извлечение статей из архива страниц")
+    arg_parser.add_argument('archive', help="Путь к архиву .warc.gz")
+    arg_parser.add_argument('--output', default="replayed_articles.jsonl", help="Файл для статей (JSONL)")
+    arg_parser.add_argument('--parser', choices=['kommersant', 'universal'], default='kommersant')
+    arg_parser.add_argument('--workers', type=int, default=None, help="Количество процессов")
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.parser == 'universal':
+        from universal_news_parser import UniversalNewsParser
+        parser = UniversalNewsParser()
+    else:
+        from kommersant_parser import KommersantParser
+        parser = KommersantParser()
+
+    started = datetime.now()
+    count = 0
+    with open(args.output, 'w', encoding='utf-8') as f:
+        for article in replay_archive(args.archive, parser, workers=args.workers):
+            f.write(json.dumps(article, ensure_ascii=False) + '\n')
+            count += 1
+
+    elapsed = (datetime.now() - started).total_seconds()
+    print(f"✅ Извлечено {count} статей за {elapsed:.1f} с, результат в {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Проверка совпадения результатов бэкендов разбора HTML и замер
+задержки извлечения на страницу по папке сохраненных страниц
+"""
+import argparse
+import glob
+import logging
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List, Optional
+
+from html_backends import LXML_AVAILABLE
+from kommersant_parser import KommersantParser
+from universal_news_parser import UniversalNewsParser
+from mock_news_server import load_articles, render_article_page
+
+
+def page_url(path: str) -> str:
+    """URL страницы по имени файла (8059662.html -> https://www.kommersant.ru/doc/8059662)"""
+    return f"https://www.kommersant.ru/doc/{os.path.splitext(os.path.basename(path))[0]}"
+
+
+def generate_pages(pages_dir: str, count: int, start_id: int = 8050000):
+    """Генерация страниц из корпуса, если сохраненных страниц нет"""
+    os.makedirs(pages_dir, exist_ok=True)
+    for i, article in enumerate(load_articles()[:count]):
+        with open(os.path.join(pages_dir, f"{start_id + i}.html"), 'wb') as f:
+            f.write(render_article_page(article))
+
+
+def normalize(article: Optional[Dict]) -> Optional[Dict]:
+    """
+    Подготовка статьи к сравнению: без времени парсинга и с единым видом
+    переводов строк (libxml2, как и браузеры, превращает \r\n в \n)
+    """
+    if not article:
+        return None
+    normalized = {}
+    for key, value in article.items():
+        if key == 'parsed_at':
+            continue
+        if isinstance(value, str):
+            value = value.replace('\r\n', '\n').replace('\r', '\n')
+        elif isinstance(value, list):
+            value = sorted(value)
+        normalized[key] = value
+    return normalized
+
+
+def extract_all(backend_name: str, pages: List[str]) -> Dict:
+    """Извлечение статей всеми парсерами одним бэкендом с замером времени на страницу"""
+    # Быстрый путь по JSON-LD отключен: сравниваются именно бэкенды разбора DOM
+    kommersant = KommersantParser(html_backend=backend_name, structured_data=False)
+    universal = UniversalNewsParser(html_backend=backend_name, structured_data=False)
+    config = universal.site_configs['kommersant.ru']
+
+    results = {}
+    latencies = []
+    for path in pages:
+        with open(path, 'rb') as f:
+            content = f.read()
+        url = page_url(path)
+
+        started = time.perf_counter()
+        article = kommersant.extract_article(content, url)
+        universal_article = universal.extract_article(content, url, config, 'kommersant.ru')
+        latencies.append((time.perf_counter() - started) / 2)
+
+        results[path] = (normalize(article), normalize(universal_article))
+
+    return {'results': results, 'latencies': latencies}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Сравнение бэкендов разбора HTML")
+    arg_parser.add_argument('pages_dir', help="Папка с сохраненными страницами (*.html)")
+    arg_parser.add_argument('--generate', type=int, default=0,
+                            help="Сгенерировать N страниц из корпуса, если папка пуста")
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    logging.getLogger().setLevel(logging.ERROR)
+
+    pages = sorted(glob.glob(os.path.join(args.pages_dir, '*.htm*')))
+    if not pages and args.generate:
+        generate_pages(args.pages_dir, args.generate)
+        pages = sorted(glob.glob(os.path.join(args.pages_dir, '*.htm*')))
+    if not pages:
+        print(f"❌ В папке {args.pages_dir} нет страниц")
+        sys.exit(1)
+    if not LXML_AVAILABLE:
+        print("❌ lxml не установлен. Установите: pip install lxml cssselect")
+        sys.exit(1)
+
+    baseline = extract_all('html.parser', pages)
+    fast = extract_all('lxml', pages)
+
+    print(f"Страниц: {len(pages)}")
+    print(f"{'Бэкенд':<12} {'Среднее, мс':>12} {'Медиана, мс':>12} {'p95, мс':>10}")
+    for name, run in (('html.parser', baseline), ('lxml', fast)):
+        latencies = sorted(run['latencies'])
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"{name:<12} {statistics.mean(latencies) * 1000:>12.2f} "
+              f"{statistics.median(latencies) * 1000:>12.2f} {p95 * 1000:>10.2f}")
+
+    mismatches = [path for path in pages if baseline['results'][path] != fast['results'][path]]
+    for path in mismatches[:10]:
+        print(f"  расхождение: {path}")
+    if mismatches:
+        print(f"❌ Результаты различаются на {len(mismatches)} из {len(pages)} страниц")
+        sys.exit(1)
+
+    speedup = statistics.mean(baseline['latencies']) / statistics.mean(fast['latencies'])
+    print(f"✅ Результаты совпадают, ускорение lxml: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+Бэкенды разбора HTML для извлечения статей.
+
+Функции _extract_* парсеров используют небольшое подмножество API
+BeautifulSoup (select_one, select, find_all, get, get_text, decompose).
+Бэкенд lxml реализует то же подмножество поверх дерева lxml, поэтому
+извлечение работает без изменений, но в несколько раз быстрее.
+
+Известные отличия lxml от html.parser: переводы строк \r\n в тексте
+приводятся к \n, а некорректно вложенные теги (например, <p> без
+закрывающего тега) достраиваются по правилам HTML5
+
+Оба бэкенда поддерживают частичный разбор (parse(content, strainer)):
+в дерево попадают только поддеревья элементов, отобранных strainer
+(см. element_strainer.py). html.parser при этом работает примерно вдвое
+быстрее, lxml строит дерево через Python-обработчик событий и тратит больше
+времени, но в десятки раз меньше памяти на больших страницах
+"""
+import re
+import logging
+from typing import Dict, List, Optional
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    from bs4.filter import ElementFilter  # bs4 >= 4.13
+except ImportError:
+    ElementFilter = None
+
+try:
+    import lxml.html
+    from lxml import etree
+    from lxml.cssselect import CSSSelector
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+CHARSET_RE = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+
+
+class BeautifulSoupBackend:
+    """Разбор через BeautifulSoup (по умолчанию - встроенный html.parser)"""
+
+    def __init__(self, features: str = 'html.parser'):
+        self.name = features
+        self.features = features
+
+    def parse(self, content: bytes, strainer=None) -> BeautifulSoup:
+        if strainer is None:
+            return BeautifulSoup(content, self.features)
+        return BeautifulSoup(content, self.features, parse_only=_soup_filter(strainer))
+
+
+if ElementFilter is not None:
+    class _StrainerFilter(ElementFilter):
+        """Фильтр создания элементов bs4 по ElementStrainer"""
+
+        def __init__(self, strainer):
+            self.strainer = strainer
+
+        def allow_tag_creation(self, nsprefix, name, attrs) -> bool:
+            return self.strainer.matches(name, attrs)
+
+        def allow_string_creation(self, string) -> bool:
+            return False  # текст вне сохраняемых поддеревьев не нужен
+
+
+def _soup_filter(strainer):
+    """Аргумент parse_only для BeautifulSoup"""
+    if ElementFilter is not None:
+        return _StrainerFilter(strainer)
+    # До bs4 4.13 функция в SoupStrainer получает имя и атрибуты тега
+    return SoupStrainer(lambda name, attrs=None: strainer.matches(name, attrs or {}))
+
+
+class LxmlNode:
+    """Элемент дерева lxml с интерфейсом элемента BeautifulSoup"""
+
+    __slots__ = ('element',)
+
+    def __init__(self, element):
+        self.element = element
+
+    def get(self, name: str, default=None):
+        return self.element.get(name, default)
+
+    def get_text(self) -> str:
+        return self.element.text_content()
+
+    @property
+    def name(self) -> str:
+        return self.element.tag
+
+    def _matches(self, selector: str):
+        # cssselect ищет и среди самого элемента, bs4 - только среди потомков
+        return (element for element in _compile_selector(selector)(self.element)
+                if element is not self.element)
+
+    def select_one(self, selector: str) -> Optional['LxmlNode']:
+        for element in self._matches(selector):
+            return LxmlNode(element)
+        return None
+
+    def select(self, selector: str) -> List['LxmlNode']:
+        return [LxmlNode(element) for element in self._matches(selector)]
+
+    def find_all(self, name=None, recursive: bool = True, **attrs) -> List['LxmlNode']:
+        names = [name] if isinstance(name, str) else list(name or [])
+        if recursive:
+            candidates = self.element.iterdescendants(*names)
+        else:
+            candidates = (child for child in self.element.iterchildren(*names))
+        found = []
+        for element in candidates:
+            if not isinstance(element.tag, str):
+                continue  # комментарии и инструкции обработки
+            if all(_attr_matches(element, key, value) for key, value in attrs.items()):
+                found.append(LxmlNode(element))
+        return found
+
+    def __call__(self, name=None, **attrs) -> List['LxmlNode']:
+        return self.find_all(name, **attrs)
+
+    def decompose(self):
+        # drop_tree сохраняет хвостовой текст элемента, как и decompose в bs4
+        self.element.drop_tree()
+
+
+class LxmlDocument(LxmlNode):
+    """Документ lxml с интерфейсом объекта BeautifulSoup"""
+
+    __slots__ = ()
+
+    def _matches(self, selector: str):
+        # В bs4 поиск по документу включает корневой элемент <html>
+        return iter(_compile_selector(selector)(self.element))
+
+    def find_all(self, name=None, recursive: bool = True, **attrs) -> List[LxmlNode]:
+        found = super().find_all(name, recursive, **attrs)
+        names = [name] if isinstance(name, str) else list(name or [])
+        if (not names or self.element.tag in names) and \
+                all(_attr_matches(self.element, key, value) for key, value in attrs.items()):
+            found.insert(0, LxmlNode(self.element))
+        return found
+
+
+class LxmlBackend:
+    """Разбор через lxml.html с CSS-селекторами cssselect"""
+
+    name = 'lxml'
+
+    def __init__(self):
+        if not LXML_AVAILABLE:
+            raise ImportError("lxml не установлен. Установите: pip install lxml cssselect")
+        self._parsers: Dict[str, 'lxml.html.HTMLParser'] = {}
+
+    @staticmethod
+    def _encoding_for(content: bytes) -> str:
+        match = CHARSET_RE.search(content[:2048])
+        return match.group(1).decode('ascii').lower() if match else 'utf-8'
+
+    def _parser_for(self, content: bytes):
+        encoding = self._encoding_for(content)
+        parser = self._parsers.get(encoding)
+        if parser is None:
+            try:
+                parser = lxml.html.HTMLParser(encoding=encoding)
+            except LookupError:
+                parser = lxml.html.HTMLParser(encoding='utf-8')
+            self._parsers[encoding] = parser
+        return parser
+
+    def parse(self, content: bytes, strainer=None) -> LxmlDocument:
+        if not content.strip():
+            content = b'<html></html>'
+        parser = self._parser_for(content)
+        if strainer is None:
+            return LxmlDocument(lxml.html.document_fromstring(content, parser=parser))
+        # Парсер с обработчиком событий создается на каждую страницу (обработчик хранит дерево)
+        target = _SubtreeTarget(strainer, parser)
+        try:
+            partial_parser = etree.HTMLParser(target=target, encoding=self._encoding_for(content))
+        except LookupError:
+            partial_parser = etree.HTMLParser(target=target, encoding='utf-8')
+        return LxmlDocument(etree.fromstring(content, partial_parser))
+
+
+class _SubtreeTarget:
+    """
+    Обработчик событий парсера lxml, строящий только поддеревья отобранных
+    элементов (под искусственным корнем <html>)
+    """
+
+    def __init__(self, strainer, parser):
+        self.strainer = strainer
+        # TreeBuilder с парсером lxml.html создает HtmlElement (text_content, drop_tree)
+        self.builder = etree.TreeBuilder(parser=parser)
+        self.builder.start('html', {})
+        self.depth = 0
+
+    def start(self, tag, attrib):
+        if self.depth or self.strainer.matches(tag, attrib):
+            self.depth += 1
+            self.builder.start(tag, dict(attrib))
+
+    def end(self, tag):
+        if self.depth:
+            self.depth -= 1
+            self.builder.end(tag)
+
+    def data(self, data):
+        if self.depth:
+            self.builder.data(data)
+
+    def close(self):
+        self.builder.end('html')
+        return self.builder.close()
+
+
+_selector_cache: Dict[str, 'CSSSelector'] = {}
+
+
+def _compile_selector(selector: str):
+    """Компиляция CSS-селектора с кэшированием"""
+    compiled = _selector_cache.get(selector)
+    if compiled is None:
+        compiled = CSSSelector(selector, translator='html')
+        _selector_cache[selector] = compiled
+    return compiled
+
+
+def _attr_matches(element, key: str, value) -> bool:
+    """Проверка атрибута в стиле find_all(..., href=True)"""
+    actual = element.get(key)
+    if value is True:
+        return actual is not None
+    if value is False or value is None:
+        return actual is None
+    return actual == value
+
+
+def get_backend(name: str = 'auto'):
+    """
+    Получение бэкенда разбора HTML
+
+    Args:
+        name: 'lxml', 'html.parser' или 'auto' (lxml, если установлен,
+            иначе html.parser)
+    """
+    if name == 'auto':
+        name = 'lxml' if LXML_AVAILABLE else 'html.parser'
+    if name == 'lxml':
+        if LXML_AVAILABLE:
+            return LxmlBackend()
+        logger.warning("lxml не установлен, используется html.parser")
+        name = 'html.parser'
+    return BeautifulSoupBackend(name)
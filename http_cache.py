@@ -0,0 +1,161 @@
+"""
+Персистентный кэш валидаторов HTTP для инкрементального повторного обхода.
+
+Для каждого URL хранятся ETag, Last-Modified и хэш тела последнего ответа.
+Повторные запросы отправляются условными (If-None-Match / If-Modified-Since);
+ответ 304 или тело с прежним хэшем означают, что страница не изменилась
+и извлекать статью заново не нужно.
+
+Валидаторы нового ответа сначала только запоминаются и попадают в базу
+при commit - после того как статья со страницы записана на диск. Иначе
+после сбоя (или обхода, результат которого не сохранили) страница
+считалась бы неизменившейся и больше никогда не извлекалась
+"""
+import hashlib
+import sqlite3
+import threading
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class HttpCache:
+    """
+    SQLite-кэш валидаторов HTTP
+
+    Args:
+        db_path: Путь к файлу базы данных
+    """
+
+    def __init__(self, db_path: str = "http_cache.db"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS validators (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                body_hash TEXT NOT NULL,
+                body_size INTEGER NOT NULL,
+                fetched_at TEXT NOT NULL
+            )
+        """)
+        self._conn.commit()
+        # URL -> валидаторы ответов, еще не подтвержденных commit
+        self._pending: Dict[str, Tuple] = {}
+
+        # Счетчики текущего запуска
+        self.requests = 0
+        self.cacheable = 0  # ответы 200 и 304
+        self.not_modified = 0
+        self.unchanged_body = 0
+        self.bytes_downloaded = 0
+        self.bytes_saved = 0
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Заголовки условного запроса для URL (пусто, если URL еще не загружался)"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT etag, last_modified FROM validators WHERE url = ?', (url,)
+            ).fetchone()
+        if not row:
+            return {}
+        headers = {}
+        if row[0]:
+            headers['If-None-Match'] = row[0]
+        if row[1]:
+            headers['If-Modified-Since'] = row[1]
+        return headers
+
+    def register_response(self, url: str, status: int, headers: Dict[str, str], content: bytes) -> bool:
+        """
+        Учет ответа на (условный) запрос
+
+        Returns:
+            True, если страница не изменилась с прошлой загрузки (304 или тот же хэш тела)
+        """
+        headers = {name.lower(): value for name, value in headers.items()}
+        with self._lock:
+            self.requests += 1
+            self.bytes_downloaded += len(content)
+            row = self._conn.execute(
+                'SELECT body_hash, body_size FROM validators WHERE url = ?', (url,)
+            ).fetchone()
+
+            if status in (200, 304):
+                self.cacheable += 1
+            if status == 304:
+                self.not_modified += 1
+                if row:
+                    self.bytes_saved += row[1]
+                return True
+            if status != 200:
+                return False
+
+            body_hash = hashlib.sha1(content).hexdigest()
+            unchanged = row is not None and row[0] == body_hash
+            validators = (headers.get('etag'), headers.get('last-modified'), body_hash, len(content),
+                          datetime.now().isoformat())
+            if unchanged:
+                # Тело уже подтверждено - обновляются только валидаторы
+                self.unchanged_body += 1
+                self._write([(url, *validators)])
+            else:
+                self._pending[url] = validators
+        return unchanged
+
+    def commit(self, urls: Iterable[str]):
+        """
+        Сохранение валидаторов последних ответов по URL (вызывается, когда
+        результат обработки страниц записан на диск; URL без ответа пропускаются)
+        """
+        with self._lock:
+            rows = [(url, *self._pending.pop(url)) for url in urls if url in self._pending]
+            if rows:
+                self._write(rows)
+
+    def forget(self, url: str):
+        """
+        Удаление валидаторов URL: следующий запрос будет безусловным (например,
+        вариант страницы не дал статью, и его 304 не должен означать, что
+        статья не изменилась)
+        """
+        with self._lock:
+            self._pending.pop(url, None)
+            self._conn.execute('DELETE FROM validators WHERE url = ?', (url,))
+            self._conn.commit()
+
+    def _write(self, rows):
+        self._conn.executemany("""
+            INSERT OR REPLACE INTO validators (url, etag, last_modified, body_hash, body_size, fetched_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, rows)
+        self._conn.commit()
+
+    def stats(self) -> Dict:
+        """Счетчики эффективности кэша за текущий запуск"""
+        hits = self.not_modified + self.unchanged_body
+        return {
+            'requests': self.requests,
+            'not_modified': self.not_modified,
+            'unchanged_body': self.unchanged_body,
+            'hit_ratio': hits / self.cacheable if self.cacheable else 0.0,
+            'bytes_downloaded': self.bytes_downloaded,
+            'bytes_saved': self.bytes_saved
+        }
+
+    def close(self):
+        """Закрытие базы данных"""
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
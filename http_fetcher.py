@@ -0,0 +1,321 @@
+"""
+HTTP-слой краулера: синхронная загрузка через requests.Session
+и асинхронная конкурентная загрузка через aiohttp
+"""
+import asyncio
+import time
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+
+from crawl_metrics import STATUS_NETWORK_ERROR
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Значение FetchResult.error, когда бюджет запросов к хосту исчерпан
+HOST_BUDGET_EXHAUSTED = 'host budget exhausted'
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+
+@dataclass
+class FetchResult:
+    """Результат загрузки одной страницы"""
+    url: str
+    status: int
+    content: bytes = b''
+    headers: Dict[str, str] = field(default_factory=dict)
+    elapsed: float = 0.0
+    error: Optional[str] = None
+    # Страница не изменилась с прошлой загрузки (ответ 304 или тот же хэш тела)
+    unchanged: bool = False
+    # Число выполненных попыток (с учетом повторов по RetryPolicy)
+    attempts: int = 1
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and 200 <= self.status < 400
+
+    def raise_for_status(self):
+        """Аналог requests.Response.raise_for_status"""
+        if self.error is not None:
+            raise requests.exceptions.RequestException(f"{self.error} для {self.url}")
+        if self.status >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status} Error для {self.url}")
+
+
+class HttpFetcher:
+    """Синхронная загрузка страниц через общую requests.Session"""
+
+    def __init__(self, session: requests.Session, timeout: float = 10, archive=None, cache=None,
+                 rate_limiter=None, retry_policy=None, circuit_breaker=None, metrics=None):
+        self.session = session
+        self.timeout = timeout
+        self.archive = archive  # HtmlArchive для сохранения всех ответов
+        self.cache = cache  # HttpCache для условных запросов
+        self.rate_limiter = rate_limiter  # AdaptiveRateLimiter, общий для всех потоков
+        self.retry_policy = retry_policy  # RetryPolicy (None - одна попытка)
+        self.circuit_breaker = circuit_breaker  # CircuitBreaker по хостам
+        self.metrics = metrics  # CrawlMetrics: время фаз, статусы, объем
+
+    def _sleep(self, seconds: float):
+        """Пауза с учетом в метриках как фаза ожидания"""
+        time.sleep(seconds)
+        if self.metrics is not None:
+            self.metrics.observe('wait', seconds)
+
+    def fetch(self, url: str, use_cache: bool = True) -> FetchResult:
+        """
+        Загрузка страницы с повторами временных ошибок; сетевые исключения
+        последней попытки пробрасываются вызывающему коду
+
+        Args:
+            url: Адрес страницы
+            use_cache: Отправлять условный запрос и отмечать неизменившиеся
+                страницы (для страниц-списков не нужно - там важно содержимое)
+        """
+        attempt = 0
+        while True:
+            if self.circuit_breaker is not None:
+                wait = self.circuit_breaker.wait_time(url)
+                while wait > 0:
+                    self._sleep(wait)
+                    wait = self.circuit_breaker.wait_time(url)
+            try:
+                result = self._fetch_once(url, use_cache)
+            except requests.exceptions.RequestException as e:
+                error = f"{type(e).__name__}: {e}"
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.record(url, 0, error)
+                if self.retry_policy is None or not self.retry_policy.should_retry(0, error, attempt):
+                    raise
+                delay = self.retry_policy.backoff(attempt)
+                logger.info(f"Повтор {attempt + 1} для {url} через {delay:.1f} с: {error}")
+                self._sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                # Запрос прерван без ответа - пробный запрос выключателя освобождается
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.abandon_trial(url)
+                raise
+
+            result.attempts = attempt + 1
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.record(url, result.status)
+            if self.retry_policy is None or not self.retry_policy.should_retry(result.status, None, attempt):
+                return result
+            delay = self.retry_policy.backoff(attempt, result.headers)
+            logger.info(f"Повтор {attempt + 1} для {url} через {delay:.1f} с: статус {result.status}")
+            self._sleep(delay)
+            attempt += 1
+
+    def _fetch_once(self, url: str, use_cache: bool) -> FetchResult:
+        """Одна попытка загрузки"""
+        use_cache = use_cache and self.cache is not None
+        headers = self.cache.conditional_headers(url) if use_cache else None
+
+        if self.rate_limiter is not None:
+            waited = time.perf_counter()
+            self.rate_limiter.acquire()
+            if self.metrics is not None:
+                self.metrics.observe('wait', time.perf_counter() - waited)
+        started = time.perf_counter()
+        try:
+            # stream=True: get возвращается после заголовков, тело читается отдельно
+            response = self.session.get(url, timeout=self.timeout, headers=headers, stream=True)
+            headers_received = time.perf_counter()
+            content = response.content
+        except requests.exceptions.RequestException:
+            if self.rate_limiter is not None:
+                self.rate_limiter.observe(0, time.perf_counter() - started)
+            if self.metrics is not None:
+                self.metrics.response(STATUS_NETWORK_ERROR)
+            raise
+        result = FetchResult(
+            url=url,
+            status=response.status_code,
+            content=content,
+            headers=dict(response.headers),
+            elapsed=time.perf_counter() - started
+        )
+        if self.metrics is not None:
+            self.metrics.observe('connect', headers_received - started)
+            self.metrics.observe('download', started + result.elapsed - headers_received)
+            self.metrics.response(result.status, len(content))
+        if self.rate_limiter is not None:
+            self.rate_limiter.observe(result.status, result.elapsed, result.headers)
+        if use_cache:
+            result.unchanged = self.cache.register_response(url, result.status, result.headers, result.content)
+        if self.archive is not None:
+            self.archive.write(result)
+        return result
+
+
+class AsyncHttpFetcher:
+    """
+    Конкурентная загрузка страниц на asyncio/aiohttp
+
+    Args:
+        concurrency: Общее число одновременных запросов (размер пула соединений)
+        per_host_limit: Число одновременных соединений с одним хостом
+        host_request_budget: Максимум запросов к одному хосту за время жизни
+            загрузчика (None - без ограничения)
+        timeout: Таймаут запроса в секундах
+        headers: Заголовки, отправляемые с каждым запросом
+        archive: HtmlArchive для сохранения всех ответов
+        cache: HttpCache для условных запросов
+        rate_limiter: AdaptiveRateLimiter (None - нагрузка ограничивается только concurrency)
+        retry_policy: RetryPolicy (None - одна попытка)
+        circuit_breaker: CircuitBreaker по хостам
+        metrics: CrawlMetrics для учета времени фаз, статусов и объема
+    """
+
+    def __init__(self, concurrency: int = 20, per_host_limit: int = 10,
+                 host_request_budget: Optional[int] = None, timeout: float = 10,
+                 headers: Optional[Dict[str, str]] = None, archive=None, cache=None,
+                 rate_limiter=None, retry_policy=None, circuit_breaker=None, metrics=None):
+        if not AIOHTTP_AVAILABLE:
+            raise ImportError("aiohttp не установлен. Установите: pip install aiohttp")
+
+        self.concurrency = concurrency
+        self.per_host_limit = per_host_limit
+        self.host_request_budget = host_request_budget
+        self.timeout = timeout
+        self.headers = dict(headers or DEFAULT_HEADERS)
+        self.archive = archive
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        self.metrics = metrics
+        self.host_requests: Dict[str, int] = {}
+        self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        # Один коннектор на весь обход: соединения переиспользуются (keep-alive)
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency,
+            limit_per_host=self.per_host_limit,
+            ttl_dns_cache=300
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            headers=self.headers,
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._session.close()
+        self._session = None
+
+    def _take_host_budget(self, url: str) -> bool:
+        """Списание запроса из бюджета хоста"""
+        host = urlparse(url).netloc
+        used = self.host_requests.get(host, 0)
+        if self.host_request_budget is not None and used >= self.host_request_budget:
+            return False
+        self.host_requests[host] = used + 1
+        return True
+
+    async def fetch(self, url: str) -> FetchResult:
+        """Загрузка страницы с повторами временных ошибок; сетевые ошибки возвращаются в поле error"""
+        attempt = 0
+        while True:
+            if self.circuit_breaker is not None:
+                wait = self.circuit_breaker.wait_time(url)
+                while wait > 0:
+                    await self._sleep(wait)
+                    wait = self.circuit_breaker.wait_time(url)
+
+            try:
+                result = await self._fetch_once(url)
+            except BaseException:
+                # Отмена задачи или непредвиденная ошибка: ответа нет, пробный
+                # запрос выключателя освобождается
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.abandon_trial(url)
+                raise
+            if result.error == HOST_BUDGET_EXHAUSTED:
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.abandon_trial(url)
+                return result
+            result.attempts = attempt + 1
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.record(url, result.status, result.error)
+            if self.retry_policy is None or not self.retry_policy.should_retry(result.status, result.error, attempt):
+                return result
+            delay = self.retry_policy.backoff(attempt, result.headers)
+            logger.info(f"Повтор {attempt + 1} для {url} через {delay:.1f} с: "
+                        f"{result.error or f'статус {result.status}'}")
+            await self._sleep(delay)
+            attempt += 1
+
+    async def _sleep(self, seconds: float):
+        """Пауза с учетом в метриках как фаза ожидания"""
+        await asyncio.sleep(seconds)
+        if self.metrics is not None:
+            self.metrics.observe('wait', seconds)
+
+    async def _fetch_once(self, url: str) -> FetchResult:
+        """Одна попытка загрузки"""
+        if not self._take_host_budget(url):
+            return FetchResult(url=url, status=0, error=HOST_BUDGET_EXHAUSTED)
+
+        waited = time.perf_counter()
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire_async()
+        async with self._semaphore:
+            started = time.perf_counter()
+            if self.metrics is not None:
+                # Ожидание ограничителя темпа и свободного слота конкурентности
+                self.metrics.observe('wait', started - waited)
+            try:
+                headers = self.cache.conditional_headers(url) if self.cache is not None else None
+                async with self._session.get(url, headers=headers) as response:
+                    headers_received = time.perf_counter()
+                    content = await response.read()
+                    result = FetchResult(
+                        url=url,
+                        status=response.status,
+                        content=content,
+                        headers=dict(response.headers),
+                        elapsed=time.perf_counter() - started
+                    )
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.observe(0, time.perf_counter() - started)
+                if self.metrics is not None:
+                    self.metrics.response(STATUS_NETWORK_ERROR)
+                return FetchResult(
+                    url=url,
+                    status=0,
+                    elapsed=time.perf_counter() - started,
+                    error=f"{type(e).__name__}: {e}"
+                )
+
+        if self.metrics is not None:
+            self.metrics.observe('connect', headers_received - started)
+            self.metrics.observe('download', started + result.elapsed - headers_received)
+            self.metrics.response(result.status, len(result.content))
+        if self.rate_limiter is not None:
+            self.rate_limiter.observe(result.status, result.elapsed, result.headers)
+        if self.cache is not None:
+            result.unchanged = self.cache.register_response(url, result.status, result.headers, result.content)
+        if self.archive is not None:
+            self.archive.write(result)
+        return result
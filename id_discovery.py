@@ -0,0 +1,141 @@
+"""
+Поиск живых областей пространства ID документов Коммерсанта.
+
+Вместо перебора каждого ID пространство сначала редко опрашивается:
+экспоненциальный и двоичный поиск находят самый новый живой ID, а
+выборочные пробы по корзинам оценивают плотность статей, чтобы полный
+перебор шел только по продуктивным поддиапазонам
+"""
+import json
+import random
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from crawl_frontier import STATUS_NOT_FOUND, STATUS_ERROR
+
+logger = logging.getLogger(__name__)
+
+# ID, заведомо существующий на сайте (точка отсчета для поиска новейшего ID)
+KNOWN_LIVE_ID = 8059662
+
+
+class IdSpaceProbe:
+    """
+    Разреженное зондирование пространства ID
+
+    Загруженные при зондировании статьи не теряются: они сохраняются в
+    self.outcomes и используются при последующем переборе.
+
+    Args:
+        parser: KommersantParser, через который выполняются запросы
+        window: Сколько соседних ID проверяется в одной пробе (ID на сайте
+            идут с пропусками, одиночный 404 не означает конец живой области)
+        seed: Зерно генератора случайных проб
+    """
+
+    def __init__(self, parser, window: int = 8, seed: int = 0):
+        self.parser = parser
+        self.window = window
+        self.random = random.Random(seed)
+        # ID -> (статья или None, исход)
+        self.outcomes: Dict[int, Tuple[Optional[Dict], str]] = {}
+        self.requests = 0
+
+    def probe(self, doc_id: int) -> bool:
+        """Проверка одного ID (результат запоминается)"""
+        if doc_id not in self.outcomes:
+            self.outcomes[doc_id] = self.parser.fetch_article(self.parser.article_url(doc_id))
+            self.requests += 1
+        return self.outcomes[doc_id][1] not in (STATUS_NOT_FOUND, STATUS_ERROR)
+
+    def live_in_window(self, doc_id: int) -> Optional[int]:
+        """Первый живой ID в окне [doc_id, doc_id + window)"""
+        for candidate in range(doc_id, doc_id + self.window):
+            if self.probe(candidate):
+                return candidate
+        return None
+
+    def find_latest_id(self, known_live_id: int = KNOWN_LIVE_ID, initial_step: int = 1024) -> int:
+        """
+        Поиск самого нового живого ID
+
+        От известного живого ID шаг удваивается, пока пробы находят статьи,
+        затем граница уточняется двоичным поиском.
+        """
+        low = self.live_in_window(known_live_id) or known_live_id
+        step = initial_step
+        while self.live_in_window(low + step) is not None:
+            low += step
+            step *= 2
+        high = low + step
+
+        while high - low > self.window:
+            middle = (low + high) // 2
+            if self.live_in_window(middle) is not None:
+                low = middle
+            else:
+                high = middle
+
+        latest = max(doc_id for doc_id in range(low, high + self.window) if self.probe(doc_id))
+        logger.info(f"Самый новый живой ID: {latest} (запросов на поиск: {self.requests})")
+        return latest
+
+    def sample_density(self, start_id: int, end_id: int, bucket_size: int = 1000,
+                       samples_per_bucket: int = 8) -> List[Dict]:
+        """
+        Оценка доли живых ID по корзинам диапазона
+
+        Returns:
+            Список корзин {'start', 'end', 'samples', 'live', 'density'}
+        """
+        buckets = []
+        for bucket_start in range(start_id, end_id + 1, bucket_size):
+            bucket_end = min(bucket_start + bucket_size - 1, end_id)
+            population = range(bucket_start, bucket_end + 1)
+            sample = self.random.sample(population, min(samples_per_bucket, len(population)))
+            live = sum(1 for doc_id in sample if self.probe(doc_id))
+            buckets.append({
+                'start': bucket_start,
+                'end': bucket_end,
+                'samples': len(sample),
+                'live': live,
+                'density': live / len(sample)
+            })
+        return buckets
+
+    def productive_ranges(self, start_id: int, end_id: int, min_density: float = 0.1,
+                          bucket_size: int = 1000, samples_per_bucket: int = 8,
+                          buckets: Optional[List[Dict]] = None) -> List[Tuple[int, int]]:
+        """
+        Поддиапазоны с плотностью статей не ниже min_density
+
+        Соседние продуктивные корзины объединяются в один диапазон. Вместо
+        новых проб можно передать оценку плотности из прошлого запуска (buckets).
+        """
+        if buckets is None:
+            buckets = self.sample_density(start_id, end_id, bucket_size, samples_per_bucket)
+        buckets = [b for b in buckets if b['end'] >= start_id and b['start'] <= end_id]
+        ranges = []
+        for bucket in buckets:
+            if bucket['density'] < min_density:
+                continue
+            if ranges and ranges[-1][1] + 1 == bucket['start']:
+                ranges[-1] = (ranges[-1][0], bucket['end'])
+            else:
+                ranges.append((bucket['start'], bucket['end']))
+
+        covered = sum(end - start + 1 for start, end in ranges)
+        logger.info(f"Продуктивные диапазоны: {ranges} (покрыто {covered} из {end_id - start_id + 1} ID, "
+                    f"запросов на пробы: {self.requests})")
+        return ranges
+
+    def save_density(self, buckets: List[Dict], filename: str = "id_density.json"):
+        """Сохранение оценки плотности для следующих запусков"""
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(buckets, f, ensure_ascii=False, indent=2)
+
+    @staticmethod
+    def load_density(filename: str = "id_density.json") -> List[Dict]:
+        """Загрузка сохраненной оценки плотности"""
+        with open(filename, 'r', encoding='utf-8') as f:
+            return json.load(f)
@@ -9,175 +9,867 @@ import re
 from datetime import datetime, timedelta
 from urllib.parse import urljoin, urlparse
 import logging
-from typing import List, Dict, Optional
+import asyncio
+import heapq
+import multiprocessing
+from typing import List, Dict, Optional, Tuple
 import os
 
+from http_fetcher import HttpFetcher, AsyncHttpFetcher, FetchResult, HOST_BUDGET_EXHAUSTED
+from html_backends import get_backend
+from html_archive import HtmlArchive
+from http_cache import HttpCache
+from article_sink import ArticleSink
+from rate_limiter import AdaptiveRateLimiter
+from retry_policy import RetryPolicy, CircuitBreaker
+from id_discovery import IdSpaceProbe, KNOWN_LIVE_ID
+from extraction_profile import ExtractionProfile, collect_tags
+from structured_data import scan_structured_data, FastPathStats, REQUIRED_FIELDS
+from page_variants import (PageVariant, VariantStats, ID_RE, parse_variants, extract_json_fields,
+                           fetch_variant, fetch_variant_async, VARIANT_JSON, FULL_PAGE)
+from element_strainer import ElementStrainer
+from near_duplicates import NearDuplicateIndex
+from crawl_metrics import CrawlMetrics, STATUS_NEAR_DUPLICATE
+from crawl_logging import ProgressLogger, setup_logging
+from shard_coordinator import ShardCoordinator, check_output_path, merge_shards, shard_output_path
+from text_blocks import collect_text_blocks, TextDedupStats, TEXT_MODES, TEXT_MODE_LEGACY
+from crawl_frontier import (CrawlFrontier, STATUS_OK, STATUS_NOT_FOUND, STATUS_TOO_SHORT,
+                            STATUS_NO_TITLE, STATUS_ERROR, STATUS_NOT_MODIFIED, STATUS_EXTRACTED,
+                            FINAL_STATUSES)
+
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Селекторы полей статьи Коммерсанта (порядок - приоритет до накопления статистики)
+KOMMERSANT_SELECTORS = {
+    'title': [
+        'h1.doc_header_title',
+        'h1.doc_header__title',
+        'h1[class*="title"]',
+        'h1',
+        '.doc_header_title',
+        '.doc_header__title',
+        '.article__title',
+        '.article__header__title'
+    ],
+    'text': [
+        '.doc_text',
+        '.doc_text__content',
+        '.article__text',
+        '.article__body',
+        '.article__content',
+        '.article__text__content',
+        '[class*="doc_text"]',
+        '.article__body__content'
+    ],
+    'date': [
+        'meta[property="article:published_time"]',
+        'meta[name="pubdate"]',
+        'meta[name="date"]',
+        'time[datetime]',
+        '.doc_header_date',
+        '.doc_header__date',
+        '.article__date',
+        '.article__time'
+    ],
+    'category': [
+        'meta[property="article:section"]',
+        'meta[name="category"]',
+        '.doc_header_section',
+        '.doc_header__section',
+        '.breadcrumbs a',
+        '.article__breadcrumbs a',
+        '.article__category'
+    ],
+    'tags': [
+        '.doc_tags a',
+        '.doc_tags__item',
+        '.article__tags a',
+        '.tags a',
+        '.article__keywords a',
+        'meta[name="keywords"]'
+    ],
+    'author': [
+        '.doc_header_author',
+        '.doc_header__author',
+        '.article__author',
+        '.author',
+        'meta[name="author"]',
+        'meta[property="article:author"]'
+    ]
+}
+
 class KommersantParser:
     """Парсер для сайта Коммерсантъ"""
     
-    def __init__(self, base_url="https://www.kommersant.ru", delay=1.0):
+    def __init__(self, base_url="https://www.kommersant.ru", delay=1.0, html_backend: str = 'html.parser',
+                 archive: Optional[HtmlArchive] = None, cache: Optional[HttpCache] = None,
+                 sink: Optional[ArticleSink] = None, rate_limiter: Optional[AdaptiveRateLimiter] = None,
+                 retry_policy: Optional[RetryPolicy] = None, circuit_breaker: Optional[CircuitBreaker] = None,
+                 structured_data: bool = False, text_mode: str = TEXT_MODE_LEGACY,
+                 partial_parse: bool = False, near_duplicates: Optional[NearDuplicateIndex] = None,
+                 metrics: Optional[CrawlMetrics] = None,
+                 page_variants: Optional[List[Dict]] = None, adaptive_selectors: bool = False):
         self.base_url = base_url
         self.delay = delay  # Задержка между запросами
+        # Бэкенд разбора HTML: 'html.parser', 'lxml' или 'auto' (lxml, если установлен).
+        # lxml быстрее, но по-своему достраивает некорректную разметку, поэтому включается явно
+        self.html_backend = get_backend(html_backend)
+        # Селекторы полей со статистикой срабатываний (см. selector_report);
+        # adaptive_selectors - пропускать селекторы, ни разу не сработавшие
+        self.adaptive_selectors = adaptive_selectors
+        self.profile = ExtractionProfile(KOMMERSANT_SELECTORS, adaptive=adaptive_selectors)
+        # Быстрый путь (включается явно): поля из JSON-LD и мета-тегов без построения DOM.
+        # Текст берется из articleBody, а не из блоков страницы, поэтому может отличаться
+        self.structured_data = structured_data
+        self.fast_path_stats = FastPathStats()
+        # Сбор абзацев текста: 'legacy' - все p и div блока (вложенные абзацы
+        # повторяются), 'leaf' - только листовые блоки без повторов
+        if text_mode not in TEXT_MODES:
+            raise ValueError(f"Неизвестный режим сбора текста: {text_mode}")
+        self.text_mode = text_mode
+        self.text_stats = TextDedupStats()
+        # Частичный разбор: в DOM попадают только блоки, на которые указывают селекторы.
+        # Ускоряет html.parser; с lxml примерно в 3 раза медленнее полного (partial_parse_benchmark.py)
+        self.partial_parse = partial_parse
+        self.strainer = ElementStrainer.for_selectors(self.profile.selectors()) if partial_parse else None
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
+        # archive - необязательный архив всех загруженных ответов для повторного извлечения,
+        # cache - кэш валидаторов HTTP: неизменившиеся статьи не загружаются и не разбираются
+        # Темп запросов подстраивается под сервер, начиная с одного запроса в delay секунд
+        # (delay=0 - без ограничения)
+        if rate_limiter is None and delay > 0:
+            rate_limiter = AdaptiveRateLimiter.from_delay(delay)
+        self.rate_limiter = rate_limiter
+        # Временные ошибки (сеть, 429, 5xx) повторяются с задержкой, 404 - нет;
+        # при большой доле ошибок запросы к хосту приостанавливаются.
+        # Отключить повторы: RetryPolicy(max_attempts=1)
+        self.fetcher = HttpFetcher(self.session, timeout=10, archive=archive, cache=cache,
+                                   rate_limiter=rate_limiter,
+                                   retry_policy=retry_policy or RetryPolicy(),
+                                   circuit_breaker=circuit_breaker or CircuitBreaker(),
+                                   metrics=metrics)
+        # metrics - время фаз загрузки и извлечения, HTTP статусы и исходы страниц
+        # (периодически выгружаются в файл, сводка - в лог в конце обхода)
+        self.metrics = metrics
+        # sink - потоковая запись статей: если задан, статьи пишутся на диск сразу
+        # после извлечения и не накапливаются в возвращаемом списке
+        self.sink = sink
+        # near_duplicates - индекс MinHash LSH: почти дубликаты уже собранных статей
+        # отбрасываются (или помечаются полем duplicate_of, см. NearDuplicateIndex)
+        self.near_duplicates = near_duplicates
+        # page_variants - облегченные версии страницы статьи (для печати, AMP, JSON API),
+        # которые загружаются вместо полной страницы, например:
+        #   [{'name': 'print', 'url': '{url}?print=true'}]
+        # Полная страница загружается, только если ни один вариант не дал статью
+        # (см. page_variants.py); байты и время разбора по вариантам - в variant_stats
+        self.page_variants = parse_variants(page_variants)
+        self.variant_stats = VariantStats()
         
+    def extraction_config(self) -> Dict:
+        """Параметры конструктора, влияющие на извлечение (для процессов-обработчиков)"""
+        return {'base_url': self.base_url, 'html_backend': self.html_backend.name,
+                'structured_data': self.structured_data, 'text_mode': self.text_mode,
+                'partial_parse': self.partial_parse, 'adaptive_selectors': self.adaptive_selectors}
+    
+    def article_url(self, article_id: int) -> str:
+        """URL статьи по ID"""
+        return f"{self.base_url}/doc/{article_id}"
+    
     def get_article_by_id(self, article_id: int) -> Optional[Dict]:
         """Получение статьи по ID"""
-        url = f"{self.base_url}/doc/{article_id}"
-        return self.parse_article(url)
+        return self.parse_article(self.article_url(article_id))
     
-    def parse_article_range(self, start_id: int, end_id: int, max_articles: int = None) -> List[Dict]:
-        """Парсинг статей в диапазоне ID"""
-        articles = []
-        current_id = start_id
-        processed_count = 0
+    def _range_ids(self, start_id: int, end_id: int, frontier: Optional[CrawlFrontier]):
+        """ID для обхода: весь диапазон или только необработанные ID из frontier"""
+        if frontier is None:
+            return iter(range(start_id, end_id + 1))
+        return frontier.pending_ids(start_id, end_id)
+    
+    def parse_article_range(self, start_id: int, end_id: int, max_articles: int = None,
+                            frontier: Optional[CrawlFrontier] = None) -> List[Dict]:
+        """
+        Парсинг статей в диапазоне ID
+        
+        Если передан frontier, исход каждого ID сохраняется в нем, а при повторном
+        запуске уже обработанные ID пропускаются (повторяются только ID с временными
+        ошибками). max_articles ограничивает число статей, собранных в этом запуске.
         
+        Если парсер создан с sink, статьи пишутся в него по мере извлечения,
+        а возвращается пустой список. ID статьи становится обработанным во frontier
+        только после записи статьи на диск: сбросом sink или save_articles(..., frontier)
+        """
         logger.info(f"Начинаем парсинг статей с ID {start_id} по {end_id}")
+        return self._parse_ids(self._range_ids(start_id, end_id, frontier), max_articles, frontier)
+    
+    def _parse_ids(self, ids, max_articles: Optional[int] = None,
+                   frontier: Optional[CrawlFrontier] = None,
+                   known_outcomes: Optional[Dict[int, Tuple[Optional[Dict], str]]] = None,
+                   max_misses: Optional[int] = None) -> List[Dict]:
+        """
+        Последовательный парсинг статей по списку ID
+        
+        known_outcomes - уже полученные исходы (например, при зондировании),
+        такие ID повторно не загружаются. max_misses - после стольких ID подряд
+        без статьи перебор прекращается.
+        """
+        articles = []
+        processed_count = 0
+        misses = 0
+        known_outcomes = known_outcomes or {}
+        unconfirmed: List[int] = []
+        progress = ProgressLogger(logger, "Парсинг")
         
-        while current_id <= end_id and (max_articles is None or processed_count < max_articles):
+        for current_id in ids:
+            if max_articles is not None and processed_count >= max_articles:
+                break
+            if max_misses is not None and misses >= max_misses:
+                logger.info(f"{misses} ID подряд без статей, перебор остановлен на ID {current_id}")
+                break
             try:
-                logger.info(f"Парсим статью ID {current_id}")
-                article = self.get_article_by_id(current_id)
+                logger.debug(f"Парсим статью ID {current_id}")
+                if current_id in known_outcomes:
+                    article, status = known_outcomes[current_id]
+                else:
+                    article, status = self.fetch_article(self.article_url(current_id))
                 
                 if article:
-                    articles.append(article)
-                    processed_count += 1
-                    logger.info(f"Успешно спарсена статья {current_id}: {article['title'][:50]}...")
+                    misses = 0
+                    kept = self._emit(article, articles)
+                    if kept:
+                        processed_count += 1
+                    self._record_article(frontier, current_id, kept, unconfirmed)
+                    logger.debug(f"Успешно спарсена статья {current_id}: {article['title'][:50]}...")
                 else:
-                    logger.warning(f"Статья с ID {current_id} не найдена или не удалось спарсить")
-                
-                current_id += 1
-                time.sleep(self.delay)
+                    misses += 1
+                    self._record_miss(frontier, current_id, status)
+                    logger.debug(f"Статья с ID {current_id} не найдена или не удалось спарсить")
+                progress.update(pages=1, articles=int(bool(article)))
                 
             except Exception as e:
                 logger.error(f"Ошибка при парсинге статьи {current_id}: {e}")
-                current_id += 1
                 continue
         
-        logger.info(f"Парсинг завершен. Обработано {processed_count} статей")
+        logger.info(f"Парсинг завершен. Обработано {processed_count} статей; всего {progress.summary()}")
+        self._finish_run()
+        self._confirm_written(frontier, unconfirmed)
         return articles
     
-    def parse_recent_articles(self, max_articles: int = 100) -> List[Dict]:
-        """Парсинг недавних статей (начиная с высоких ID)"""
-        # Начинаем с текущего времени и идем назад
-        current_time = datetime.now()
-        # Примерный ID на основе текущей даты (примерно 8 миллионов)
-        start_id = 8000000
-        end_id = start_id - max_articles
+    def parse_productive_ranges(self, start_id: int, end_id: int, max_articles: int = None,
+                                min_density: float = 0.1, bucket_size: int = 1000,
+                                samples_per_bucket: int = 8,
+                                frontier: Optional[CrawlFrontier] = None) -> List[Dict]:
+        """
+        Парсинг диапазона ID только по продуктивным поддиапазонам
         
-        return self.parse_article_range(end_id, start_id, max_articles)
+        Диапазон разбивается на корзины по bucket_size ID, в каждой проверяется
+        samples_per_bucket случайных ID; полностью перебираются только корзины
+        с долей живых ID не ниже min_density. Статьи, найденные пробами,
+        повторно не загружаются и выдаются вместе с остальными (в порядке ID),
+        в том числе из корзин с низкой плотностью.
+        """
+        probe = IdSpaceProbe(self)
+        ranges = probe.productive_ranges(start_id, end_id, min_density, bucket_size, samples_per_bucket)
+        # Статьи из проб вне продуктивных диапазонов уже загружены - их не отбрасываем
+        probed = sorted(
+            doc_id for doc_id, (article, _) in probe.outcomes.items()
+            if article and start_id <= doc_id <= end_id
+            and not any(range_start <= doc_id <= range_end for range_start, range_end in ranges)
+            and (frontier is None or frontier.get_status(doc_id) not in FINAL_STATUSES)
+        )
+        
+        def ids():
+            scanned = (doc_id for range_start, range_end in ranges
+                       for doc_id in self._range_ids(range_start, range_end, frontier))
+            yield from heapq.merge(scanned, probed)
+        
+        return self._parse_ids(ids(), max_articles, frontier, known_outcomes=probe.outcomes)
+    
+    def _unique(self, article: Dict) -> Optional[Dict]:
+        """Статья после проверки на почти дубликаты (None - дубликат отброшен)"""
+        if self.near_duplicates is None:
+            return article
+        admitted = self.near_duplicates.admit(article)
+        if admitted is None and self.metrics is not None:
+            self.metrics.reclassify(STATUS_OK, STATUS_NEAR_DUPLICATE)
+        return admitted
+    
+    def _emit(self, article: Dict, articles: List[Dict]) -> bool:
+        """Передача статьи в sink или в список результатов (False - статья оказалась дубликатом)"""
+        article = self._unique(article)
+        if article is None:
+            return False
+        if self.sink is not None:
+            self.sink.write(article)
+        else:
+            articles.append(article)
+        return True
+    
+    def _record_article(self, frontier: Optional[CrawlFrontier], doc_id: int, kept: bool,
+                        unconfirmed: List[int]):
+        """
+        Исход ID с извлеченной статьей во frontier
+        
+        Пока статья не записана на диск, ID остается STATUS_EXTRACTED и при
+        возобновлении обрабатывается заново: иначе статьи из памяти или из
+        буфера sink терялись бы при сбое. В ok ID переводят _confirm_written
+        (после сброса sink) и save_articles. Отброшенный почти дубликат
+        сохранять не нужно - он сразу ok. Так же откладывается сохранение
+        валидаторов HTTP кэша (см. HttpCache.commit)
+        """
+        if not kept:
+            if frontier is not None:
+                frontier.record(doc_id, STATUS_OK)
+            self._commit_cache([doc_id])
+            return
+        if frontier is not None:
+            frontier.record(doc_id, STATUS_EXTRACTED)
+        if self.sink is not None:
+            unconfirmed.append(doc_id)
+            self._confirm_written(frontier, unconfirmed)
+    
+    def _record_miss(self, frontier: Optional[CrawlFrontier], doc_id: int, status: str):
+        """Исход ID без статьи; окончательный исход подтверждает и валидаторы кэша"""
+        if frontier is not None:
+            frontier.record(doc_id, status)
+        if status in (STATUS_TOO_SHORT, STATUS_NO_TITLE):
+            self._commit_cache([doc_id])
+    
+    def _confirm_written(self, frontier: Optional[CrawlFrontier], unconfirmed: List[int]):
+        """Перевод в ok ID, статьи которых sink уже сбросил на диск"""
+        if not unconfirmed or self.sink is None or self.sink.buffered:
+            return
+        if frontier is not None:
+            frontier.confirm(unconfirmed)
+        self._commit_cache(unconfirmed)
+        unconfirmed.clear()
+    
+    def _commit_cache(self, doc_ids: List[int]):
+        """Сохранение валидаторов HTTP кэша для страниц ID (полной и вариантов)"""
+        if self.fetcher.cache is None:
+            return
+        urls = []
+        for doc_id in doc_ids:
+            url = self.article_url(doc_id)
+            urls.append(url)
+            urls.extend(variant.url_for(url) for variant in self.page_variants)
+        self.fetcher.cache.commit(urls)
+    
+    def _finish_run(self, rate_limiter: Optional[AdaptiveRateLimiter] = None):
+        """Завершение обхода: сброс sink на диск, статистика кэша и темпа запросов"""
+        if self.sink is not None:
+            self.sink.flush()
+        self._log_cache_stats()
+        if self.fast_path_stats.pages:
+            logger.info(f"Быстрый путь (JSON-LD/мета-теги): {self.fast_path_stats}")
+        if self.text_stats.pages:
+            logger.info(f"Дедупликация абзацев: {self.text_stats}")
+        if self.near_duplicates is not None:
+            self.near_duplicates.save()
+            logger.info(f"Почти дубликаты: {self.near_duplicates.stats()}")
+        rate_limiter = rate_limiter or self.rate_limiter
+        if rate_limiter is not None:
+            logger.info(f"Темп запросов: {rate_limiter.stats()}")
+        if self.page_variants:
+            logger.info(f"Варианты страниц: {self.variant_stats}")
+        if self.metrics is not None:
+            self.metrics.flush()
+            logger.info(self.metrics.summary())
+    
+    def _log_cache_stats(self):
+        """Вывод эффективности HTTP кэша"""
+        if self.fetcher.cache is not None:
+            stats = self.fetcher.cache.stats()
+            logger.info(f"HTTP кэш: попаданий {stats['hit_ratio']:.1%} "
+                        f"(304: {stats['not_modified']}, тот же хэш: {stats['unchanged_body']}), "
+                        f"сэкономлено {stats['bytes_saved']:,} байт")
+    
+    def parse_article_range_pipelined(self, start_id: int, end_id: int, max_articles: int = None,
+                                      io_workers: int = 8, extract_workers: Optional[int] = None,
+                                      queue_size: int = 64,
+                                      frontier: Optional[CrawlFrontier] = None) -> List[Dict]:
+        """
+        Парсинг диапазона ID двухстадийным конвейером: потоки загрузки передают
+        страницы через ограниченную очередь в пул процессов извлечения
+        
+        Результат совпадает с parse_article_range; используется, когда узким
+        местом становится разбор HTML, а не сеть.
+        
+        Args:
+            start_id: Первый ID диапазона
+            end_id: Последний ID диапазона
+            max_articles: Максимальное количество статей
+            io_workers: Количество потоков загрузки
+            extract_workers: Количество процессов извлечения (по умолчанию - число CPU)
+            queue_size: Емкость очереди загруженных, но не разобранных страниц
+            frontier: Хранилище исходов для возобновления обхода
+        """
+        from extraction_pipeline import ExtractionPipeline
+        
+        logger.info(f"Начинаем конвейерный парсинг статей с ID {start_id} по {end_id}")
+        pipeline = ExtractionPipeline(self, io_workers=io_workers,
+                                      extract_workers=extract_workers, queue_size=queue_size)
+        return pipeline.run(self._range_ids(start_id, end_id, frontier), max_articles, frontier)
+    
+    def parse_shards(self, coordinator: ShardCoordinator, output_dir: str = "shards",
+                     max_shards: Optional[int] = None) -> int:
+        """
+        Обработка шардов из координатора, пока все они не будут завершены
+        (в том числе шарды упавших обработчиков после истечения их аренды)
+        
+        Статьи шарда пишутся во временный файл, который после обработки всего
+        шарда переименовывается в shard-<start>-<end>.jsonl. Если аренда
+        потеряна (обработчик завис дольше lease_seconds и шард отдан другому),
+        обработка шарда прекращается, а его результат не публикуется.
+        Почти дубликаты отбираются при объединении шардов (merge_shards):
+        общий файл индекса нельзя дописывать из нескольких процессов.
+        
+        Returns:
+            Количество завершенных этим обработчиком шардов
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        completed = 0
+        progress = ProgressLogger(logger, f"Обработчик {coordinator.worker_id}")
+        while max_shards is None or completed < max_shards:
+            shard = coordinator.next_shard()
+            if shard is None:
+                break
+            logger.info(f"Шард {shard.start_id}-{shard.end_id} (попытка {shard.attempts}): "
+                        f"обработчик {coordinator.worker_id}")
+            output = shard_output_path(output_dir, shard)
+            part_path = f"{output}.{coordinator.worker_id}.part"
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            try:
+                with coordinator.lease(shard) as lease, ArticleSink(part_path) as sink:
+                    for article_id in range(shard.start_id, shard.end_id + 1):
+                        if lease.lost.is_set():
+                            break
+                        article, _ = self.fetch_article(self.article_url(article_id))
+                        if article:
+                            sink.write(article)
+                        progress.update(pages=1, articles=int(bool(article)))
+            except BaseException:
+                coordinator.release(shard)
+                raise
+            
+            if lease.lost.is_set():
+                logger.warning(f"Результат шарда {shard.start_id}-{shard.end_id} отброшен")
+                os.remove(part_path)
+                continue
+            os.replace(part_path, output)
+            if not coordinator.complete(shard, output):
+                logger.warning(f"Шард {shard.start_id}-{shard.end_id} уже передан другому обработчику")
+                continue
+            completed += 1
+            logger.info(f"Шард {shard.start_id}-{shard.end_id} завершен: {sink.articles_written} статей, "
+                        f"состояние шардов: {coordinator.progress()}")
+        self._finish_run()
+        return completed
+    
+    def parse_article_range_sharded(self, start_id: int, end_id: int, workers: int = 4,
+                                    shard_size: int = 10_000, db_path: str = "crawl_shards.db",
+                                    output_dir: str = "shards",
+                                    output_path: str = "kommersant_articles.jsonl",
+                                    lease_seconds: float = 60.0, overwrite: bool = False) -> int:
+        """
+        Парсинг диапазона ID несколькими процессами с объединением результатов
+        
+        Диапазон делится на шарды по shard_size ID (см. ShardCoordinator);
+        процессы берут шарды в аренду, а после обработки всех шардов
+        результаты объединяются в output_path без дубликатов (по URL и, если
+        парсер создан с near_duplicates, почти дубликатов). Прерванный запуск
+        продолжается с незавершенных шардов. Чтобы обрабатывать диапазон на
+        нескольких машинах, запустите parse_shards с общим db_path на каждой.
+        
+        Ограничение темпа запросов (delay) действует в каждом процессе отдельно.
+        Существующий output_path заменяется только при overwrite=True (проверяется
+        до запуска процессов, иначе - FileExistsError).
+        
+        Returns:
+            Количество статей в объединенном корпусе
+        """
+        check_output_path(output_path, overwrite)
+        with ShardCoordinator(db_path, lease_seconds=lease_seconds) as coordinator:
+            shards = coordinator.plan(start_id, end_id, shard_size)
+            logger.info(f"Диапазон {start_id}-{end_id}: {shards} шардов, процессов: {workers}, "
+                        f"состояние: {coordinator.progress()}")
+            
+            context = multiprocessing.get_context('spawn')
+            parser_config = dict(self.extraction_config(), delay=self.delay,
+                                 page_variants=[variant._asdict() for variant in self.page_variants])
+            processes = [
+                context.Process(target=_shard_worker,
+                                args=(parser_config, db_path, lease_seconds, output_dir))
+                for _ in range(workers)
+            ]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+            
+            progress = coordinator.progress()
+            if set(progress) != {'done'}:
+                logger.warning(f"Не все шарды завершены: {progress}")
+            return merge_shards(coordinator, output_path, self.near_duplicates, overwrite=overwrite)
+    
+    def parse_recent_articles(self, max_articles: int = 100, known_live_id: int = KNOWN_LIVE_ID,
+                              min_id: Optional[int] = None, max_misses: int = 1000) -> List[Dict]:
+        """
+        Парсинг недавних статей (начиная с самого нового ID и назад)
+        
+        Самый новый живой ID находится экспоненциальным и двоичным поиском
+        от known_live_id, поэтому не нужно угадывать стартовый ID.
+        
+        Args:
+            max_articles: Максимальное количество статей
+            known_live_id: Заведомо существующий ID (точка отсчета поиска)
+            min_id: Нижняя граница перебора (None - до ID 1)
+            max_misses: Перебор прекращается после стольких ID подряд без статьи
+        """
+        probe = IdSpaceProbe(self)
+        latest_id = probe.find_latest_id(known_live_id)
+        
+        logger.info(f"Начинаем парсинг недавних статей с ID {latest_id} в сторону уменьшения")
+        return self._parse_ids(range(latest_id, (min_id or 1) - 1, -1), max_articles,
+                               known_outcomes=probe.outcomes, max_misses=max_misses)
+    
+    def parse_article_range_async(self, start_id: int, end_id: int, max_articles: int = None,
+                                  concurrency: int = 20, per_host_limit: int = 10,
+                                  host_request_budget: Optional[int] = None,
+                                  frontier: Optional[CrawlFrontier] = None,
+                                  rate_limiter: Optional[AdaptiveRateLimiter] = None) -> List[Dict]:
+        """
+        Конкурентный парсинг статей в диапазоне ID (asyncio + aiohttp)
+        
+        Возвращает те же словари статей и в том же порядке, что и parse_article_range.
+        Вместо фиксированной задержки нагрузка на сайт ограничивается числом
+        одновременных запросов.
+        
+        Args:
+            start_id: Первый ID диапазона
+            end_id: Последний ID диапазона
+            max_articles: Максимальное количество статей
+            concurrency: Общее число одновременных запросов
+            per_host_limit: Число одновременных соединений с одним хостом
+            host_request_budget: Максимум запросов к хосту за обход (None - без ограничения)
+            frontier: Хранилище исходов для возобновления обхода (см. parse_article_range)
+            rate_limiter: Адаптивный ограничитель темпа, общий для всех задач
+                (None - нагрузка ограничивается только concurrency)
+        """
+        return asyncio.run(self._parse_article_range_async(
+            start_id, end_id, max_articles, concurrency, per_host_limit, host_request_budget, frontier,
+            rate_limiter
+        ))
+    
+    async def _parse_article_range_async(self, start_id: int, end_id: int, max_articles: Optional[int],
+                                         concurrency: int, per_host_limit: int,
+                                         host_request_budget: Optional[int],
+                                         frontier: Optional[CrawlFrontier],
+                                         rate_limiter: Optional[AdaptiveRateLimiter] = None) -> List[Dict]:
+        """Асинхронная реализация parse_article_range_async"""
+        logger.info(f"Начинаем конкурентный парсинг статей с ID {start_id} по {end_id} "
+                    f"(одновременных запросов: {concurrency})")
+        
+        found = {}
+        ids = self._range_ids(start_id, end_id, frontier)
+        started = time.perf_counter()
+        pages = 0
+        written = 0
+        unconfirmed: List[int] = []
+        progress = ProgressLogger(logger, "Конкурентный парсинг")
+        
+        def limit_reached() -> bool:
+            return max_articles is not None and len(found) + written >= max_articles
+        
+        async def worker(fetcher: AsyncHttpFetcher):
+            nonlocal pages, written
+            # Новые ID берутся только пока не набрано max_articles; начатые запросы
+            # дорабатывают, чтобы результат совпадал с последовательным обходом
+            for article_id in ids:
+                if limit_reached():
+                    return
+                url = self.article_url(article_id)
+                variant = await fetch_variant_async(fetcher, self.page_variants, url,
+                                                    self._variant_extractor(url), self.variant_stats)
+                if variant is not None:
+                    article, status = self._variant_outcome(variant)
+                else:
+                    result = await fetcher.fetch(url)
+                    if result.error == HOST_BUDGET_EXHAUSTED:
+                        logger.warning(f"Бюджет запросов к хосту исчерпан, остановка на ID {article_id}")
+                        return
+                    article, status = self._article_from_result(result)
+                pages += 1
+                if article:
+                    if self.sink is not None:
+                        # При потоковой записи статьи не копятся; лишние сверх max_articles не пишутся
+                        # (их ID остаются извлеченными и обрабатываются при возобновлении)
+                        if not limit_reached():
+                            article = self._unique(article)
+                            if article is not None:
+                                self.sink.write(article)
+                                written += 1
+                            self._record_article(frontier, article_id, article is not None, unconfirmed)
+                        elif frontier is not None:
+                            frontier.record(article_id, STATUS_EXTRACTED)
+                    else:
+                        found[article_id] = article
+                        self._record_article(frontier, article_id, True, unconfirmed)
+                else:
+                    self._record_miss(frontier, article_id, status)
+                    logger.debug(f"Статья с ID {article_id} не найдена или не удалось спарсить")
+                progress.update(pages=1, articles=int(bool(article)))
+        
+        async with AsyncHttpFetcher(concurrency=concurrency,
+                                    per_host_limit=per_host_limit,
+                                    host_request_budget=host_request_budget,
+                                    headers=dict(self.session.headers),
+                                    archive=self.fetcher.archive,
+                                    cache=self.fetcher.cache,
+                                    rate_limiter=rate_limiter,
+                                    retry_policy=self.fetcher.retry_policy,
+                                    circuit_breaker=self.fetcher.circuit_breaker,
+                                    metrics=self.metrics) as fetcher:
+            await asyncio.gather(*(worker(fetcher) for _ in range(concurrency)))
+        
+        # Почти дубликаты отбираются в порядке ID, чтобы результат не зависел от порядка ответов
+        articles = [article for article in (self._unique(found[article_id]) for article_id in sorted(found))
+                    if article is not None]
+        if max_articles is not None:
+            articles = articles[:max_articles]
+        
+        elapsed = time.perf_counter() - started
+        logger.info(f"Парсинг завершен. Обработано {len(articles) + written} статей, "
+                    f"{pages} страниц за {elapsed:.1f} с ({pages / max(elapsed, 1e-9):.1f} стр/с)")
+        self._finish_run(rate_limiter)
+        self._confirm_written(frontier, unconfirmed)
+        return articles
     
     def parse_article(self, url: str) -> Optional[Dict]:
         """Парсинг отдельной статьи"""
+        article, _ = self.fetch_article(url)
+        return article
+    
+    def fetch_article(self, url: str) -> Tuple[Optional[Dict], str]:
+        """
+        Загрузка и парсинг статьи с кодом исхода
+        
+        Returns:
+            Кортеж (статья или None, исход: STATUS_OK, STATUS_NOT_FOUND,
+            STATUS_TOO_SHORT, STATUS_NO_TITLE или STATUS_ERROR)
+        """
         try:
-            logger.info(f"Парсим статью: {url}")
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
+            logger.debug(f"Парсим статью: {url}")
+            variant = self._fetch_variant(url)
+            if variant is not None:
+                article, status = self._variant_outcome(variant)
+                if article:
+                    logger.debug(f"Успешно спарсена статья: {article['title'][:50]}...")
+                return article, status
+            result = self.fetcher.fetch(url)
+        except Exception as e:
+            logger.error(f"Ошибка при парсинге статьи {url}: {e}")
+            self._record_outcome(STATUS_ERROR)
+            return None, STATUS_ERROR
+        
+        article, status = self._article_from_result(result)
+        if article:
+            logger.debug(f"Успешно спарсена статья: {article['title'][:50]}...")
+        return article, status
+    
+    def _article_from_result(self, result: FetchResult) -> Tuple[Optional[Dict], str]:
+        """Извлечение статьи из загруженной страницы с кодом исхода"""
+        if result.unchanged:
+            logger.debug(f"Страница не изменилась с прошлой загрузки: {result.url}")
+            self._record_outcome(STATUS_NOT_MODIFIED)
+            return None, STATUS_NOT_MODIFIED
+        if result.status in (404, 410):
+            logger.warning(f"Страница не найдена: {result.url}")
+            self._record_outcome(STATUS_NOT_FOUND)
+            return None, STATUS_NOT_FOUND
+        try:
+            result.raise_for_status()
+            started = time.perf_counter()
+            article, status = self._extract_article_with_status(result.content, result.url)
+            self.variant_stats.record(FULL_PAGE, len(result.content), time.perf_counter() - started,
+                                      article is not None)
+            return article, status
+        except Exception as e:
+            logger.error(f"Ошибка при парсинге статьи {result.url}: {e}")
+            self._record_outcome(STATUS_ERROR)
+            return None, STATUS_ERROR
+    
+    def _record_outcome(self, status: str):
+        if self.metrics is not None:
+            self.metrics.outcome(status)
+    
+    def _fetch_variant(self, url: str) -> Optional[Tuple[Optional[Dict], str]]:
+        """Статья из облегченного варианта страницы (None - нужна полная страница)"""
+        if not self.page_variants:
+            return None
+        return fetch_variant(self.fetcher, self.page_variants, url, self._variant_extractor(url),
+                             self.variant_stats)
+    
+    def _variant_outcome(self, variant: Tuple[Optional[Dict], str]) -> Tuple[Optional[Dict], str]:
+        """Исход варианта страницы; неизменившийся вариант учитывается в метриках здесь"""
+        article, status = variant
+        if status == STATUS_NOT_MODIFIED:
+            self._record_outcome(STATUS_NOT_MODIFIED)
+        return article, status
+    
+    def _variant_extractor(self, url: str):
+        """Извлечение статьи url из ответа варианта страницы (для fetch_variant)"""
+        def extract(variant: PageVariant, content: bytes) -> Tuple[Optional[Dict], str]:
+            started = time.perf_counter()
+            if variant.kind == VARIANT_JSON:
+                fields = extract_json_fields(content, variant)
+                fields['tags'] = list(set(fields.get('tags', [])))
+                article, status = self._article_from_fields(fields, url)
+                parse_seconds = 0.0
+            else:
+                article, status, parse_seconds = self._extract_fields(content, url)
+            # Неудачный вариант не учитывается в исходах: их дает полная страница
+            if article is not None:
+                self._observe_extraction(started, parse_seconds, status)
+            return article, status
+        return extract
+    
+    def _observe_extraction(self, started: float, parse_seconds: float, status: str):
+        """Учет времени разбора и извлечения и исхода страницы в метриках"""
+        if self.metrics is not None:
+            if parse_seconds:
+                self.metrics.observe('parse', parse_seconds)
+            self.metrics.observe('extract', time.perf_counter() - started - parse_seconds)
+            self.metrics.outcome(status)
+    
+    def extract_article(self, content: bytes, url: str) -> Optional[Dict]:
+        """Извлечение данных статьи из HTML страницы (без обращения к сети)"""
+        article, _ = self._extract_article_with_status(content, url)
+        return article
+    
+    def _extract_article_with_status(self, content: bytes, url: str) -> Tuple[Optional[Dict], str]:
+        """Извлечение данных статьи из HTML с кодом исхода (с учетом в метриках)"""
+        started = time.perf_counter()
+        article, status, parse_seconds = self._extract_fields(content, url)
+        self._observe_extraction(started, parse_seconds, status)
+        return article, status
+    
+    def _extract_fields(self, content: bytes, url: str) -> Tuple[Optional[Dict], str, float]:
+        """
+        Извлечение данных статьи из HTML: (статья или None, исход, время построения DOM)
+        
+        Сначала поля ищутся в JSON-LD и мета-тегах без построения DOM; если там
+        есть заголовок, текст и дата, страница целиком обрабатывается быстрым
+        путем, иначе DOM строится и селекторы применяются к недостающим полям.
+        """
+        fields = scan_structured_data(content) if self.structured_data else {}
+        fast = all(fields.get(name) for name in REQUIRED_FIELDS)
+        self.fast_path_stats.record(fast)
+        parse_seconds = 0.0
+        
+        if fast:
+            fields['tags'] = list(set(fields.get('tags', [])))
+            article, status = self._article_from_fields(fields, url)
+            return article, status, parse_seconds
+        
+        # При частичном разборе страница разбирается полностью, если
+        # в блоках из селекторов не нашлось заголовка или текста
+        for strainer in ((self.strainer, None) if self.strainer is not None else (None,)):
+            parse_started = time.perf_counter()
+            soup = self.html_backend.parse(content, strainer)
+            parse_seconds += time.perf_counter() - parse_started
             
             # Извлечение заголовка
-            title = self._extract_title(soup)
-            if not title:
-                logger.warning(f"Не удалось извлечь заголовок для {url}")
-                return None
+            title = fields.get('title') or self._extract_title(soup)
             
             # Извлечение текста статьи
-            text = self._extract_text(soup)
-            if not text or len(text.strip()) < 100:
-                logger.warning(f"Недостаточно текста для {url}")
-                return None
-            
-            # Извлечение даты
-            date = self._extract_date(soup, url)
-            
-            # Извлечение категории
-            category = self._extract_category(soup, url)
-            
-            # Извлечение тегов
-            tags = self._extract_tags(soup)
-            
-            # Извлечение автора
-            author = self._extract_author(soup)
-            
-            article_data = {
-                'title': title.strip(),
-                'text': text.strip(),
-                'date': date,
-                'url': url,
-                'category': category,
-                'tags': tags,
-                'author': author,
-                'source': 'kommersant.ru',
-                'parsed_at': datetime.now().isoformat()
-            }
-            
-            logger.info(f"Успешно спарсена статья: {title[:50]}...")
-            return article_data
-            
-        except Exception as e:
-            logger.error(f"Ошибка при парсинге статьи {url}: {e}")
-            return None
+            text = fields.get('text') or (self._extract_text(soup, partial=strainer is not None)
+                                          if title else None)
+            if title and text:
+                break
+        
+        if not title:
+            logger.warning(f"Не удалось извлечь заголовок для {url}")
+            return None, STATUS_NO_TITLE, parse_seconds
+        if not text or len(text.strip()) < 100:
+            logger.warning(f"Недостаточно текста для {url}")
+            return None, STATUS_TOO_SHORT, parse_seconds
+        
+        # Извлечение даты
+        date = fields.get('date') or self._extract_date(soup, url)
+        
+        # Извлечение категории
+        category = fields.get('category') or self._extract_category(soup, url)
+        
+        # Извлечение тегов
+        tags = list(set(fields['tags'])) if fields.get('tags') else self._extract_tags(soup)
+        
+        # Извлечение автора
+        author = fields.get('author') or self._extract_author(soup)
+        
+        article, status = self._article_from_fields({'title': title, 'text': text, 'date': date,
+                                                     'category': category, 'tags': tags,
+                                                     'author': author}, url)
+        return article, status, parse_seconds
+    
+    def _article_from_fields(self, fields: Dict, url: str) -> Tuple[Optional[Dict], str]:
+        """Статья из найденных полей с проверкой заголовка и объема текста"""
+        title, text = fields.get('title'), fields.get('text')
+        if not title:
+            logger.warning(f"Не удалось извлечь заголовок для {url}")
+            return None, STATUS_NO_TITLE
+        if not text or len(text.strip()) < 100:
+            logger.warning(f"Недостаточно текста для {url}")
+            return None, STATUS_TOO_SHORT
+        
+        return {
+            'title': title.strip(),
+            'text': text.strip(),
+            'date': fields.get('date'),
+            'url': url,
+            'category': fields.get('category') or self._category_from_url(url),
+            'tags': fields.get('tags') or [],
+            'author': fields.get('author'),
+            'source': 'kommersant.ru',
+            'parsed_at': datetime.now().isoformat()
+        }, STATUS_OK
     
     def _extract_title(self, soup: BeautifulSoup) -> Optional[str]:
         """Извлечение заголовка статьи"""
-        # Различные селекторы для заголовка Коммерсанта
-        title_selectors = [
-            'h1.doc_header_title',
-            'h1.doc_header__title',
-            'h1[class*="title"]',
-            'h1',
-            '.doc_header_title',
-            '.doc_header__title',
-            '.article__title',
-            '.article__header__title'
-        ]
-        
-        for selector in title_selectors:
-            title_elem = soup.select_one(selector)
-            if title_elem and title_elem.get_text().strip():
-                return title_elem.get_text().strip()
+        def accept(elem):
+            return elem.get_text().strip() or None
         
-        return None
+        return self.profile.first('title', soup, accept)
     
-    def _extract_text(self, soup: BeautifulSoup) -> Optional[str]:
-        """Извлечение основного текста статьи"""
+    def _extract_text(self, soup: BeautifulSoup, partial: bool = False) -> Optional[str]:
+        """
+        Извлечение основного текста статьи
+        
+        partial - страница разобрана частично: поиск абзацев по всему документу
+        не выполняется (он имеет смысл только для полного дерева)
+        """
         # Удаление ненужных элементов
         for element in soup(['script', 'style', 'nav', 'header', 'footer', 'aside', 'advertisement', 'ad']):
             element.decompose()
         
-        # Различные селекторы для текста статьи Коммерсанта
-        text_selectors = [
-            '.doc_text',
-            '.doc_text__content',
-            '.article__text',
-            '.article__body',
-            '.article__content',
-            '.article__text__content',
-            '[class*="doc_text"]',
-            '.article__body__content'
-        ]
+        def accept(text_elem):
+            # Извлечение параграфов (короче 20 символов отбрасываются)
+            text_parts, legacy_bytes = collect_text_blocks(text_elem, self.text_mode)
+            return (text_parts, legacy_bytes) if text_parts else None
         
+        found = self.profile.first('text', soup, accept)
         text_parts = []
+        if found:
+            text_parts, legacy_bytes = found
+            if self.text_mode != TEXT_MODE_LEGACY:
+                self.text_stats.record(legacy_bytes, text_parts)
         
-        for selector in text_selectors:
-            text_elem = soup.select_one(selector)
-            if text_elem:
-                # Извлечение всех параграфов
-                paragraphs = text_elem.find_all(['p', 'div'], recursive=True)
-                for p in paragraphs:
-                    text = p.get_text().strip()
-                    if text and len(text) > 20:  # Фильтрация коротких фрагментов
-                        text_parts.append(text)
-                break
-        
-        if not text_parts:
+        if not text_parts and not partial:
             # Fallback: поиск по всему документу
             paragraphs = soup.find_all('p')
             for p in paragraphs:
@@ -189,29 +881,19 @@ class KommersantParser:
     
     def _extract_date(self, soup: BeautifulSoup, url: str) -> Optional[str]:
         """Извлечение даты публикации"""
-        # Поиск даты в мета-тегах
-        date_selectors = [
-            'meta[property="article:published_time"]',
-            'meta[name="pubdate"]',
-            'meta[name="date"]',
-            'time[datetime]',
-            '.doc_header_date',
-            '.doc_header__date',
-            '.article__date',
-            '.article__time'
-        ]
-        
-        for selector in date_selectors:
-            elem = soup.select_one(selector)
-            if elem:
-                date_str = elem.get('content') or elem.get('datetime') or elem.get_text()
-                if date_str:
-                    try:
-                        # Попытка парсинга даты
-                        parsed_date = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-                        return parsed_date.isoformat()
-                    except:
-                        continue
+        def accept(elem):
+            date_str = elem.get('content') or elem.get('datetime') or elem.get_text()
+            if not date_str:
+                return None
+            try:
+                # Попытка парсинга даты
+                return datetime.fromisoformat(date_str.replace('Z', '+00:00')).isoformat()
+            except ValueError:
+                return None
+        
+        date = self.profile.first('date', soup, accept)
+        if date:
+            return date
         
         # Извлечение даты из URL (если есть)
         date_match = re.search(r'/(\d{8})/', url)
@@ -227,25 +909,18 @@ class KommersantParser:
     
     def _extract_category(self, soup: BeautifulSoup, url: str) -> Optional[str]:
         """Извлечение категории статьи"""
-        # Поиск категории в мета-тегах
-        category_selectors = [
-            'meta[property="article:section"]',
-            'meta[name="category"]',
-            '.doc_header_section',
-            '.doc_header__section',
-            '.breadcrumbs a',
-            '.article__breadcrumbs a',
-            '.article__category'
-        ]
-        
-        for selector in category_selectors:
-            elem = soup.select_one(selector)
-            if elem:
-                category = elem.get('content') or elem.get_text()
-                if category and category.strip():
-                    return category.strip()
-        
-        # Извлечение категории из URL
+        def accept(elem):
+            category = elem.get('content') or elem.get_text()
+            return category.strip() if category and category.strip() else None
+        
+        category = self.profile.first('category', soup, accept)
+        if category:
+            return category
+        
+        return self._category_from_url(url)
+    
+    def _category_from_url(self, url: str) -> Optional[str]:
+        """Извлечение категории из URL"""
         url_parts = urlparse(url).path.split('/')
         for part in url_parts:
             if part in ['politics', 'economy', 'society', 'world', 'sport', 'culture', 'technology', 'news', 'business', 'finance']:
@@ -255,56 +930,30 @@ class KommersantParser:
     
     def _extract_tags(self, soup: BeautifulSoup) -> List[str]:
         """Извлечение тегов статьи"""
-        tags = []
-        
-        # Поиск тегов
-        tag_selectors = [
-            '.doc_tags a',
-            '.doc_tags__item',
-            '.article__tags a',
-            '.tags a',
-            '.article__keywords a',
-            'meta[name="keywords"]'
-        ]
-        
-        for selector in tag_selectors:
-            if selector.startswith('meta'):
-                elem = soup.select_one(selector)
-                if elem:
-                    content = elem.get('content', '')
-                    if content:
-                        tags.extend([tag.strip() for tag in content.split(',')])
-            else:
-                elems = soup.select(selector)
-                for elem in elems:
-                    tag = elem.get_text().strip()
-                    if tag:
-                        tags.append(tag)
-        
+        tags = self.profile['tags'].each(soup, collect_tags)
         return list(set(tags))  # Удаление дубликатов
     
     def _extract_author(self, soup: BeautifulSoup) -> Optional[str]:
         """Извлечение автора статьи"""
-        author_selectors = [
-            '.doc_header_author',
-            '.doc_header__author',
-            '.article__author',
-            '.author',
-            'meta[name="author"]',
-            'meta[property="article:author"]'
-        ]
-        
-        for selector in author_selectors:
-            elem = soup.select_one(selector)
-            if elem:
-                author = elem.get('content') or elem.get_text()
-                if author and author.strip():
-                    return author.strip()
+        def accept(elem):
+            author = elem.get('content') or elem.get_text()
+            return author.strip() if author and author.strip() else None
         
-        return None
+        return self.profile.first('author', soup, accept)
+    
+    def selector_report(self) -> str:
+        """Отчет о срабатывании селекторов (какие можно удалить)"""
+        return self.profile.format_report()
     
-    def save_articles(self, articles: List[Dict], filename: str = "kommersant_articles.jsonl"):
-        """Сохранение статей в JSONL формате"""
+    def save_articles(self, articles: List[Dict], filename: str = "kommersant_articles.jsonl",
+                      frontier: Optional[CrawlFrontier] = None):
+        """
+        Сохранение статей в JSONL формате
+        
+        frontier - frontier обхода, вернувшего статьи: их ID становятся
+        окончательно обработанными (ok) после записи файла. Тогда же
+        сохраняются валидаторы HTTP кэша страниц этих статей
+        """
         # Определяем путь относительно текущего файла
         current_dir = os.path.dirname(os.path.abspath(__file__))
         filepath = os.path.join(current_dir, filename)
@@ -312,6 +961,14 @@ class KommersantParser:
         with open(filepath, 'w', encoding='utf-8') as f:
             for article in articles:
                 f.write(json.dumps(article, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        
+        matches = (ID_RE.search(urlparse(article['url']).path) for article in articles)
+        ids = [int(match.group(1)) for match in matches if match]
+        if frontier is not None:
+            frontier.confirm(ids)
+        self._commit_cache(ids)
         
         logger.info(f"Сохранено {len(articles)} статей в файл {filepath}")
         return filepath
@@ -341,9 +998,17 @@ class KommersantParser:
             'top_authors': dict(sorted(authors.items(), key=lambda x: x[1], reverse=True)[:10])
         }
 
+def _shard_worker(parser_config: Dict, db_path: str, lease_seconds: float, output_dir: str):
+    """Процесс-обработчик шардов (parse_article_range_sharded)"""
+    parser = KommersantParser(**parser_config)
+    with ShardCoordinator(db_path, lease_seconds=lease_seconds) as coordinator:
+        parser.parse_shards(coordinator, output_dir)
+
 def main():
     """Основная функция для запуска парсера"""
-    parser = KommersantParser(delay=1.0)
+    # Запись лога в фоновом потоке; построчный лог статей - setup_logging(logging.DEBUG)
+    setup_logging()
+    parser = KommersantParser(delay=1.0, metrics=CrawlMetrics())
     
     # Парсинг недавних статей
     logger.info("Начинаем парсинг Коммерсанта")
@@ -0,0 +1,426 @@
+"""
+Локальный тестовый сервер, имитирующий страницы статей Коммерсанта.
+Позволяет измерять скорость обхода без обращения к kommersant.ru
+"""
+import argparse
+import hashlib
+import html
+import json
+import random
+import re
+import threading
+import time
+import logging
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DOC_PATH_RE = re.compile(r'^/doc/(\d+)/?$')
+API_PATH_RE = re.compile(r'^/api/doc/(\d+)/?$')
+CATEGORY_PATH_RE = re.compile(r'^/(\w+)/?$')
+
+SITEMAP_PART_RE = re.compile(r'^/sitemaps/sitemap-(\d+)\.xml$')
+
+# Время публикации первой статьи; следующие выходят раз в минуту
+FEED_BASE_TIME = datetime(2025, 9, 20, tzinfo=timezone.utc)
+
+# Категории, как в site_configs универсального парсера
+DEFAULT_CATEGORIES = ('politics', 'economy', 'society', 'world', 'sport', 'culture', 'business', 'finance')
+
+
+def load_articles(filename: str = "kommersant_articles.jsonl") -> List[Dict]:
+    """Загрузка статей из JSONL файла"""
+    articles = []
+    with open(filename, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                articles.append(json.loads(line))
+    return articles
+
+
+def render_boilerplate(size: int) -> Tuple[str, str, str]:
+    """
+    Служебная разметка примерно на size байт: (скрипты, меню, подвал)
+
+    Реальные страницы статей весят сотни килобайт, почти все - скрипты,
+    меню и списки ссылок вокруг текста
+    """
+    if size <= 0:
+        return '', '', ''
+    item = '<li class="menu__item"><a class="menu__link" href="/rubric/{0}">Рубрика {0}</a></li>'
+    items = max(1, size // 2 // 80)
+    menu = '<ul class="menu">' + ''.join(item.format(i) for i in range(items // 2)) + '</ul>'
+    footer = '<ul class="footer__links">' + ''.join(item.format(i) for i in range(items // 2, items)) + '</ul>'
+    script = f'<script>window.__STATE__ = "{"x" * (size // 2)}";</script>'
+    return script, menu, footer
+
+
+def _sentences(article: Dict) -> List[str]:
+    """Текст, разбитый на абзацы по предложениям, как на реальных страницах"""
+    return [s for s in re.split(r'(?<=[.!?])\s+', article.get('text') or '') if s]
+
+
+def article_json_ld(article: Dict) -> Dict:
+    """Объект schema.org NewsArticle статьи (блок JSON-LD страницы и ответ /api/doc/<id>)"""
+    category = article.get('category')
+    author = article.get('author')
+    tags = [tag for tag in article.get('tags') or [] if tag]
+    json_ld = {
+        '@context': 'https://schema.org',
+        '@type': 'NewsArticle',
+        'headline': article.get('title') or '',
+        'datePublished': article.get('date') or '',
+        'articleBody': ' '.join(_sentences(article))
+    }
+    if category:
+        json_ld['articleSection'] = category
+    if author:
+        json_ld['author'] = {'@type': 'Person', 'name': author}
+    if tags:
+        json_ld['keywords'] = tags
+    return json_ld
+
+
+def render_article_page(article: Dict, structured_data: bool = True, padding: int = 0) -> bytes:
+    """
+    Генерация HTML страницы в разметке Коммерсанта
+
+    structured_data - добавить блок JSON-LD NewsArticle и og:title, как на реальных страницах
+    padding - примерный объем служебной разметки в байтах (см. render_boilerplate)
+    """
+    title = html.escape(article.get('title') or '')
+    date = html.escape(article.get('date') or '')
+    category = article.get('category')
+    author = article.get('author')
+    tags = [tag for tag in article.get('tags') or [] if tag]
+
+    paragraphs = '\n'.join(f'<p class="doc__text">{html.escape(s)}</p>' for s in _sentences(article))
+
+    meta = [f'<meta property="article:published_time" content="{date}">']
+    if category:
+        meta.append(f'<meta property="article:section" content="{html.escape(category)}">')
+    if author:
+        meta.append(f'<meta name="author" content="{html.escape(author)}">')
+    if tags:
+        meta.append(f'<meta name="keywords" content="{html.escape(", ".join(tags))}">')
+    if structured_data:
+        meta.append(f'<meta property="og:title" content="{title}">')
+        # "</" внутри <script> закрыл бы блок раньше времени
+        json_ld_text = json.dumps(article_json_ld(article), ensure_ascii=False).replace('</', '<\\/')
+        meta.append(f'<script type="application/ld+json">{json_ld_text}</script>')
+
+    script, menu, footer = render_boilerplate(padding)
+
+    page = f"""<!DOCTYPE html>
+<html lang="ru">
+<head>
+<meta charset="utf-8">
+<title>{title} - Коммерсантъ</title>
+{chr(10).join(meta)}
+<script>window.dataLayer = window.dataLayer || [];</script>{script}
+<style>.doc_text {{ font-size: 16px; }}</style>
+</head>
+<body>
+<header class="main_header"><nav><a href="/politics/">Политика</a> <a href="/economy/">Экономика</a>{menu}</nav></header>
+<main>
+<article class="doc">
+<h1 class="doc_header__title">{title}</h1>
+<time class="doc_header__time" datetime="{date}">{date}</time>
+<div class="doc_text">
+{paragraphs}
+</div>
+</article>
+</main>
+<aside class="rubric_lenta"><p>Читайте также: другие материалы рубрики на сайте.</p></aside>
+<footer class="footer"><p>© АО «Коммерсантъ». Все права защищены.</p>{footer}</footer>
+</body>
+</html>"""
+    return page.encode('utf-8')
+
+
+def render_listing_page(category: str, doc_ids: List[int]) -> bytes:
+    """Генерация страницы категории со ссылками на статьи"""
+    items = '\n'.join(f'<li><a href="/doc/{doc_id}">Материал {doc_id}</a></li>' for doc_id in doc_ids)
+    page = f"""<!DOCTYPE html>
+<html lang="ru">
+<head><meta charset="utf-8"><title>{html.escape(category)} - Коммерсантъ</title></head>
+<body>
+<header class="main_header"><nav><a href="/politics/">Политика</a> <a href="/economy/">Экономика</a></nav></header>
+<ul class="rubric_lenta">
+{items}
+</ul>
+</body>
+</html>"""
+    return page.encode('utf-8')
+
+
+def render_sitemap_index(parts) -> bytes:
+    """Индекс sitemap: [(путь, lastmod)]"""
+    items = '\n'.join(f'<sitemap><loc>{loc}</loc><lastmod>{lastmod.isoformat()}</lastmod></sitemap>'
+                      for loc, lastmod in parts)
+    return (f'<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n{items}\n</sitemapindex>').encode('utf-8')
+
+
+def render_sitemap(entries) -> bytes:
+    """Sitemap со ссылками на статьи: [(путь, lastmod)]"""
+    items = '\n'.join(f'<url><loc>{loc}</loc><lastmod>{lastmod.isoformat()}</lastmod></url>'
+                      for loc, lastmod in entries)
+    return (f'<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n{items}\n</urlset>').encode('utf-8')
+
+
+def render_rss(entries) -> bytes:
+    """RSS лента: [(путь, дата публикации, категория)]"""
+    items = '\n'.join(f'<item><title>Материал</title><link>{loc}</link>'
+                      f'<pubDate>{format_datetime(published)}</pubDate>'
+                      f'<category>{html.escape(category)}</category></item>'
+                      for loc, published, category in entries)
+    return (f'<?xml version="1.0" encoding="UTF-8"?>\n<rss version="2.0"><channel>'
+            f'<title>Коммерсантъ</title>\n{items}\n</channel></rss>').encode('utf-8')
+
+
+class _Server(ThreadingHTTPServer):
+    # Очередь соединений по умолчанию (5) переполняется при конкурентном
+    # обходе, и клиенты ждут повторной отправки SYN по секунде
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class MockNewsServer:
+    """
+    Тестовый HTTP сервер со страницами /doc/<id>
+
+    Статьи из корпуса раздаются под ID начиная с start_id (с пропусками при
+    not_found_density > 0), остальные ID отвечают 404. Статьи по кругу распределены по категориям;
+    страницы /<категория>/?page=N содержат по listing_page_size ссылок, а номер
+    страницы за пределами списка отдает первую страницу (как многие сайты).
+    Для обнаружения по лентам раздаются /sitemap.xml (индекс из частей
+    /sitemaps/sitemap-N.xml по sitemap_page_size ссылок) и /RSS/news.xml
+    (rss_items последних статей); статья с ID start_id + i опубликована
+    в FEED_BASE_TIME + i минут. Облегченные варианты статьи: /doc/<id>?print=true
+    (страница без служебной разметки) и /api/doc/<id> (JSON NewsArticle).
+
+    Args:
+        articles: Статьи для раздачи
+        start_id: ID первой статьи
+        host: Адрес для прослушивания
+        port: Порт (0 - выбрать свободный)
+        latency: Искусственная задержка ответа в секундах
+        categories: Пути категорий
+        listing_page_size: Количество ссылок на странице категории
+        structured_data: Добавлять в страницы статей JSON-LD и og:title
+        error_rate: Доля страниц статей, первый запрос к которым получает 503
+            (следующие - успешны), поэтому обход с повторами собирает те же статьи
+        not_found_density: Доля ID диапазона без статьи (404), как пропуски в нумерации сайта
+            (от 0 включительно до 1)
+        padding: Объем служебной разметки страницы статьи в байтах (см. render_boilerplate)
+        seed: Зерно выбора пропусков и ошибок
+    """
+
+    def __init__(self, articles: List[Dict], start_id: int = 8050000,
+                 host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 categories=DEFAULT_CATEGORIES, listing_page_size: int = 20,
+                 sitemap_page_size: int = 100, rss_items: int = 50, structured_data: bool = True,
+                 error_rate: float = 0.0, not_found_density: float = 0.0, padding: int = 0,
+                 seed: int = 0):
+        if not 0 <= not_found_density < 1:
+            raise ValueError(f"not_found_density должна быть в диапазоне [0, 1): {not_found_density}")
+        if not 0 <= error_rate <= 1:
+            raise ValueError(f"error_rate должна быть в диапазоне [0, 1]: {error_rate}")
+        self.start_id = start_id
+        self.latency = latency
+        rng = random.Random(seed)
+        self.pages = {}
+        self.print_pages = {}
+        self.api_pages = {}
+        doc_id = start_id
+        for article in articles:
+            while rng.random() < not_found_density:
+                doc_id += 1
+            self.pages[doc_id] = render_article_page(article, structured_data, padding)
+            self.print_pages[doc_id] = render_article_page(article, structured_data)
+            self.api_pages[doc_id] = json.dumps(article_json_ld(article), ensure_ascii=False).encode('utf-8')
+            doc_id += 1
+        # Страницы, первый запрос к которым завершится ошибкой сервера
+        self.failing = {doc_id for doc_id in self.pages if rng.random() < error_rate}
+        self.listing_page_size = listing_page_size
+        self.sitemap_page_size = sitemap_page_size
+        self.rss_items = rss_items
+        # Категория -> ID статей, новые сверху
+        self.category_ids = {category: [] for category in categories}
+        self.doc_category = {}
+        for i, doc_id in enumerate(sorted(self.pages, reverse=True)):
+            if categories:
+                category = categories[i % len(categories)]
+                self.category_ids[category].append(doc_id)
+                self.doc_category[doc_id] = category
+        self.requests_served = 0
+        self.errors_served = 0
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), self._make_handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def end_id(self) -> int:
+        return max(self.pages, default=self.start_id - 1)
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # HTTP/1.1 - клиенты могут переиспользовать соединения
+            protocol_version = 'HTTP/1.1'
+            # Заголовки и тело уходят одним пакетом (иначе Nagle + delayed ACK дают +40 мс)
+            wbufsize = 1 << 16
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests_served += 1
+                if server.latency:
+                    time.sleep(server.latency)
+
+                path, _, query = self.path.partition('?')
+                feed = server._feed(path)
+                if feed is not None:
+                    self._respond(200, feed, content_type='application/xml; charset=utf-8')
+                    return
+                category = CATEGORY_PATH_RE.match(path)
+                if category and category.group(1) in server.category_ids:
+                    self._respond(200, server._listing(category.group(1), query))
+                    return
+
+                content_type = 'text/html; charset=utf-8'
+                match = DOC_PATH_RE.match(path)
+                pages = server.print_pages if 'print=true' in query else server.pages
+                if match is None:
+                    match = API_PATH_RE.match(path)
+                    pages, content_type = server.api_pages, 'application/json; charset=utf-8'
+                doc_id = int(match.group(1)) if match else None
+                body = pages.get(doc_id)
+                if body is None:
+                    self._respond(404, b'<html><body><h1>404</h1></body></html>')
+                    return
+                if server._take_failure(doc_id):
+                    self._respond(503, b'<html><body><h1>503</h1></body></html>')
+                    return
+
+                etag = f'"{hashlib.md5(body).hexdigest()}"'
+                if self.headers.get('If-None-Match') == etag:
+                    self._respond(304, b'', etag, content_type)
+                else:
+                    self._respond(200, body, etag, content_type)
+
+            def _respond(self, status: int, body: bytes, etag: Optional[str] = None,
+                         content_type: str = 'text/html; charset=utf-8'):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                if etag:
+                    self.send_header('ETag', etag)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def _take_failure(self, doc_id: int) -> bool:
+        """Должен ли запрос к статье завершиться ошибкой (только первый запрос)"""
+        with self._lock:
+            if doc_id not in self.failing:
+                return False
+            self.failing.discard(doc_id)
+            self.errors_served += 1
+            return True
+
+    def _listing(self, category: str, query: str) -> bytes:
+        """Страница категории по параметру page"""
+        page_match = re.search(r'(?:^|&)page=(\d+)', query)
+        page = int(page_match.group(1)) if page_match else 1
+        doc_ids = self.category_ids[category]
+        size = self.listing_page_size
+        if page < 1 or (page - 1) * size >= len(doc_ids):
+            page = 1
+        return render_listing_page(category, doc_ids[(page - 1) * size:page * size])
+
+    def published_at(self, doc_id: int) -> datetime:
+        """Время публикации статьи (для lastmod и pubDate)"""
+        return FEED_BASE_TIME + timedelta(minutes=doc_id - self.start_id)
+
+    def _feed(self, path: str) -> Optional[bytes]:
+        """Sitemap или RSS по пути (None - путь не относится к лентам)"""
+        doc_ids = sorted(self.pages)
+        size = self.sitemap_page_size
+        if path == '/sitemap.xml':
+            parts = [(f"{self.base_url}/sitemaps/sitemap-{n}.xml",
+                      self.published_at(doc_ids[min(len(doc_ids), (n + 1) * size) - 1]))
+                     for n in range((len(doc_ids) + size - 1) // size)]
+            return render_sitemap_index(parts)
+        part = SITEMAP_PART_RE.match(path)
+        if part:
+            n = int(part.group(1))
+            return render_sitemap([(f"{self.base_url}/doc/{doc_id}", self.published_at(doc_id))
+                                   for doc_id in doc_ids[n * size:(n + 1) * size]])
+        if path == '/RSS/news.xml':
+            latest = doc_ids[::-1][:self.rss_items]
+            return render_rss([(f"{self.base_url}/doc/{doc_id}?from=rss", self.published_at(doc_id),
+                                self.doc_category.get(doc_id, '')) for doc_id in latest])
+        return None
+
+    def start(self) -> 'MockNewsServer':
+        """Запуск сервера в фоновом потоке"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"Тестовый сервер запущен на {self.base_url}")
+        return self
+
+    def stop(self):
+        """Остановка сервера"""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def main():
+    """Запуск тестового сервера из командной строки"""
+    arg_parser = argparse.ArgumentParser(description="Тестовый сервер страниц Коммерсанта")
+    arg_parser.add_argument('--port', type=int, default=8765)
+    arg_parser.add_argument('--latency', type=float, default=0.0, help="Задержка ответа, с")
+    arg_parser.add_argument('--error-rate', type=float, default=0.0,
+                            help="Доля статей, первый запрос к которым получает 503")
+    arg_parser.add_argument('--not-found-density', type=float, default=0.0, help="Доля ID без статьи")
+    arg_parser.add_argument('--padding', type=int, default=0, help="Служебная разметка страницы, байт")
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    articles = load_articles()
+    server = MockNewsServer(articles, port=args.port, latency=args.latency, error_rate=args.error_rate,
+                            not_found_density=args.not_found_density, padding=args.padding)
+    server.start()
+    print(f"Сервер работает на {server.base_url}, статьи /doc/{server.start_id}..{server.end_id}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
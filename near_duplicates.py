@@ -0,0 +1,288 @@
+"""
+Поиск почти дубликатов статей: MinHash по шинглам слов и LSH по полосам сигнатуры.
+
+Перепечатки, обновленные версии одной новости и однотипные судебные
+объявления почти совпадают по тексту и искажают статистику словаря.
+Для каждого текста вычисляется сигнатура MinHash (num_perm минимумов
+хэшей шинглов - последовательностей из shingle_size слов); доля
+совпадающих позиций двух сигнатур оценивает коэффициент Жаккара их
+множеств шинглов. Сигнатура делится на полосы, и кандидатами считаются
+только документы, совпавшие с запросом хотя бы в одной полосе, поэтому
+проверка документа не требует сравнения со всем индексом.
+
+Индекс дописывается в файл (сигнатуры и ключи), при следующем запуске
+загружается. Порог сходства можно менять между запусками - полосы
+пересчитываются при загрузке. С numpy сигнатуры считаются в несколько раз
+быстрее, результат тот же
+"""
+import hashlib
+import os
+import random
+import re
+import struct
+import sys
+import threading
+import logging
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+WORD_RE = re.compile(r'\w+')
+
+MERSENNE_PRIME = (1 << 61) - 1
+MASK_32 = (1 << 32) - 1
+MASK_64 = (1 << 64) - 1
+
+INDEX_MAGIC = b'MHL1'
+INDEX_HEADER = struct.Struct('<III')  # число перестановок, размер шингла, зерно
+KEY_LENGTH = struct.Struct('<H')
+
+
+def shingles(text: str, size: int = 5) -> set:
+    """Шинглы по size слов текста в нижнем регистре (без пунктуации)"""
+    words = WORD_RE.findall(text.lower())
+    if len(words) <= size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _integrate(func, start: float, end: float, steps: int = 100) -> float:
+    width = (end - start) / steps
+    return sum(func(start + (i + 0.5) * width) for i in range(steps)) * width
+
+
+def lsh_params(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    Число полос и строк в полосе, минимизирующие сумму вероятностей
+    ложного совпадения (сходство ниже порога) и пропуска (выше порога)
+    """
+    best = None
+    for bands in range(1, num_perm + 1):
+        for rows in range(1, num_perm // bands + 1):
+            false_positive = _integrate(lambda s: 1 - (1 - s ** rows) ** bands, 0.0, threshold)
+            false_negative = _integrate(lambda s: (1 - s ** rows) ** bands, threshold, 1.0)
+            error = false_positive + false_negative
+            if best is None or error < best[0]:
+                best = (error, bands, rows)
+    return best[1], best[2]
+
+
+class NearDuplicateIndex:
+    """
+    Индекс MinHash LSH для отбора почти дубликатов
+
+    Args:
+        path: Файл индекса (None - только в памяти)
+        threshold: Оценка сходства по Жаккару, начиная с которой документы считаются дубликатами
+        num_perm: Длина сигнатуры (больше - точнее оценка, медленнее и больше памяти)
+        shingle_size: Число слов в шингле
+        seed: Зерно хэш-функций (должно совпадать у всех, кто пишет в один индекс)
+        cluster: False - дубликаты отбрасываются, True - сохраняются с полем
+            duplicate_of (URL первой статьи группы)
+
+    Параметры num_perm, shingle_size и seed существующего файла имеют
+    приоритет над переданными.
+    """
+
+    def __init__(self, path: Optional[str] = "near_duplicates.idx", threshold: float = 0.8,
+                 num_perm: int = 128, shingle_size: int = 5, seed: int = 1, cluster: bool = False):
+        self.path = path
+        self.threshold = threshold
+        self.cluster = cluster
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.seed = seed
+        self._keys: List[str] = []
+        self._signatures: List[array] = []
+        self._saved = 0
+        self._lock = threading.Lock()
+        self.duplicates = 0
+        self.candidates_checked = 0
+        self.queries = 0
+
+        if path and os.path.exists(path):
+            self._load(path)
+        self._init_permutations()
+        self.bands, self.rows = lsh_params(threshold, self.num_perm)
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(self.bands)]
+        for index, signature in enumerate(self._signatures):
+            self._index(index, signature)
+
+    def _init_permutations(self):
+        rng = random.Random(self.seed)
+        self._perm_a = [rng.randint(1, MERSENNE_PRIME - 1) for _ in range(self.num_perm)]
+        self._perm_b = [rng.randint(0, MERSENNE_PRIME - 1) for _ in range(self.num_perm)]
+        if NUMPY_AVAILABLE:
+            self._np_a = np.array(self._perm_a, dtype=np.uint64)
+            self._np_b = np.array(self._perm_b, dtype=np.uint64)
+
+    def signature(self, text: str) -> Optional[array]:
+        """Сигнатура MinHash текста (None для текста без слов)"""
+        hashes = [int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=4).digest(), 'little')
+                  for shingle in shingles(text, self.shingle_size)]
+        if not hashes:
+            return None
+        # (a * h + b) по модулю 2^64 (как в uint64 numpy), затем по модулю простого числа
+        if NUMPY_AVAILABLE:
+            values = np.array(hashes, dtype=np.uint64)[:, None]
+            permuted = ((values * self._np_a + self._np_b) % np.uint64(MERSENNE_PRIME)) & np.uint64(MASK_32)
+            return array('I', permuted.min(axis=0).astype(np.uint32).tobytes())
+        return array('I', (min((((a * h + b) & MASK_64) % MERSENNE_PRIME) & MASK_32 for h in hashes)
+                           for a, b in zip(self._perm_a, self._perm_b)))
+
+    def _band_keys(self, signature: array) -> Iterator[bytes]:
+        for band in range(self.bands):
+            yield signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def _index(self, index: int, signature: array):
+        for bucket, band_key in zip(self._buckets, self._band_keys(signature)):
+            bucket.setdefault(band_key, []).append(index)
+
+    def _similar(self, signature: array) -> List[Tuple[int, float]]:
+        """Документы индекса со сходством не ниже порога (вызывается под блокировкой)"""
+        candidates = set()
+        for bucket, band_key in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(bucket.get(band_key, ()))
+        self.queries += 1
+        self.candidates_checked += len(candidates)
+        found = []
+        for index in sorted(candidates):
+            other = self._signatures[index]
+            similarity = sum(x == y for x, y in zip(signature, other)) / self.num_perm
+            if similarity >= self.threshold:
+                found.append((index, similarity))
+        return found
+
+    def query(self, text: str) -> List[Tuple[str, float]]:
+        """Ключи почти дубликатов текста в индексе с оценкой сходства"""
+        signature = self.signature(text)
+        if signature is None:
+            return []
+        with self._lock:
+            return [(self._keys[index], similarity) for index, similarity in self._similar(signature)]
+
+    def check(self, key: str, text: str) -> Optional[str]:
+        """
+        Проверка документа с добавлением в индекс
+
+        Returns:
+            Ключ ранее добавленного почти дубликата или None (документ новый и добавлен)
+        """
+        signature = self.signature(text)
+        if signature is None:
+            return None
+        with self._lock:
+            similar = self._similar(signature)
+            if similar:
+                self.duplicates += 1
+                # Ключ самого похожего (при равенстве - самого раннего) документа
+                best = max(similar, key=lambda item: (item[1], -item[0]))
+                return self._keys[best[0]]
+            self._keys.append(key)
+            self._signatures.append(signature)
+            self._index(len(self._keys) - 1, signature)
+            return None
+
+    def admit(self, article: Dict) -> Optional[Dict]:
+        """
+        Отбор статьи: None, если это почти дубликат и дубликаты отбрасываются;
+        в режиме cluster дубликат возвращается с полем duplicate_of
+        """
+        original = self.check(article.get('url') or str(len(self._keys)), article.get('text') or '')
+        if original is None:
+            return article
+        if not self.cluster:
+            logger.debug(f"Почти дубликат {article.get('url')} статьи {original} отброшен")
+            return None
+        return dict(article, duplicate_of=original)
+
+    def _load(self, path: str):
+        with open(path, 'rb') as f:
+            if f.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+                raise ValueError(f"{path} не является файлом индекса почти дубликатов")
+            num_perm, shingle_size, seed = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+            if (num_perm, shingle_size, seed) != (self.num_perm, self.shingle_size, self.seed):
+                logger.info(f"Индекс {path}: используются параметры файла (num_perm={num_perm}, "
+                            f"shingle_size={shingle_size}, seed={seed})")
+                self.num_perm, self.shingle_size, self.seed = num_perm, shingle_size, seed
+            record_end = f.tell()
+            signature_size = num_perm * 4
+            while True:
+                length = f.read(KEY_LENGTH.size)
+                if len(length) < KEY_LENGTH.size:
+                    break
+                key = f.read(KEY_LENGTH.unpack(length)[0])
+                raw = f.read(signature_size)
+                if len(raw) < signature_size or len(key) < KEY_LENGTH.unpack(length)[0]:
+                    break
+                signature = array('I', raw)
+                if sys.byteorder == 'big':
+                    signature.byteswap()
+                self._keys.append(key.decode('utf-8'))
+                self._signatures.append(signature)
+                record_end = f.tell()
+        if record_end < os.path.getsize(path):
+            # Недописанная запись после сбоя отбрасывается, чтобы следующие записи легли ровно
+            logger.warning(f"Индекс {path} обрезан после последней полной записи")
+            os.truncate(path, record_end)
+        self._saved = len(self._keys)
+        logger.info(f"Загружен индекс почти дубликатов {path}: {len(self._keys)} документов")
+
+    def save(self):
+        """Дописывание новых документов в файл индекса"""
+        if not self.path:
+            return
+        with self._lock:
+            pending = list(zip(self._keys[self._saved:], self._signatures[self._saved:]))
+            new_file = not os.path.exists(self.path)
+            with open(self.path, 'ab') as f:
+                if new_file:
+                    f.write(INDEX_MAGIC)
+                    f.write(INDEX_HEADER.pack(self.num_perm, self.shingle_size, self.seed))
+                for key, signature in pending:
+                    encoded = key.encode('utf-8')[:0xFFFF]
+                    if sys.byteorder == 'big':
+                        signature = array('I', signature)
+                        signature.byteswap()
+                    f.write(KEY_LENGTH.pack(len(encoded)))
+                    f.write(encoded)
+                    f.write(signature.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            self._saved += len(pending)
+
+    def stats(self) -> dict:
+        return {
+            'documents': len(self._keys),
+            'duplicates': self.duplicates,
+            'avg_candidates': round(self.candidates_checked / self.queries, 2) if self.queries else 0.0,
+            'bands': self.bands,
+            'rows': self.rows
+        }
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def close(self):
+        self.save()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def filter_near_duplicates(articles: Iterable[Dict], index: NearDuplicateIndex) -> Iterator[Dict]:
+    """Статьи корпуса без почти дубликатов (или с отметкой duplicate_of в режиме cluster)"""
+    for article in articles:
+        admitted = index.admit(article)
+        if admitted is not None:
+            yield admitted
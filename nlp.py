@@ -14,20 +14,16 @@ from typing import List, Dict, Any, Optional
 
 # Импорт наших модулей
 from kommersant_parser import KommersantParser
+from crawl_frontier import CrawlFrontier
 from text_cleaner import TextCleaner
 from universal_preprocessor import UniversalPreprocessor, PreprocessingConfig
 from tokenization_analysis import TokenizationAnalyzer
 from subword_models import SubwordModelTrainer
+from crawl_logging import setup_logging
 
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('nlp_analysis.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+# Настройка логирования: консоль и файл пишутся в фоновом потоке
+# (basicConfig здесь не сработал бы - корневой логгер уже настроен при импорте парсера)
+setup_logging(log_file='nlp_analysis.log', fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class NLPAnalysisPipeline:
@@ -49,13 +45,22 @@ class NLPAnalysisPipeline:
         
         logger.info(f"Инициализирован пайплайн анализа для языка: {language}")
     
-    def collect_news_corpus(self, max_articles: int = 100, save_to_file: bool = True, start_id: int = 8050000, end_id: int = 8059999) -> List[Dict[str, Any]]:
-        """Сбор корпуса новостных текстов с Коммерсанта"""
+    def collect_news_corpus(self, max_articles: int = 100, save_to_file: bool = True, start_id: int = 8050000, end_id: int = 8059999,
+                            frontier_path: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Сбор корпуса новостных текстов с Коммерсанта
+        
+        Если указан frontier_path, исходы обработки ID сохраняются в SQLite файл,
+        и повторный запуск продолжает обход с места остановки. Статьи считаются
+        собранными только после сохранения корпуса в файл (save_to_file=True),
+        иначе при повторном запуске их ID обрабатываются заново.
+        """
         logger.info(f"Начинаем сбор корпуса новостей с Коммерсанта (максимум {max_articles} статей)")
         
+        frontier = CrawlFrontier(frontier_path) if frontier_path else None
         try:
             # Используем парсер Коммерсанта
-            self.articles = self.parser.parse_article_range(start_id, end_id, max_articles)
+            self.articles = self.parser.parse_article_range(start_id, end_id, max_articles, frontier=frontier)
             
             if not self.articles:
                 logger.warning("Не удалось собрать статьи")
@@ -64,7 +69,7 @@ class NLPAnalysisPipeline:
             # Сохранение корпуса
             if save_to_file:
                 corpus_file = f"kommersant_corpus_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
-                self.parser.save_articles(self.articles, corpus_file)
+                self.parser.save_articles(self.articles, corpus_file, frontier=frontier)
                 logger.info(f"Корпус сохранен в файл: {corpus_file}")
             
             logger.info(f"Собрано {len(self.articles)} статей")
@@ -73,6 +78,10 @@ class NLPAnalysisPipeline:
         except Exception as e:
             logger.error(f"Ошибка при сборе корпуса: {e}")
             return []
+        finally:
+            if frontier is not None:
+                logger.info(f"Состояние frontier: {frontier.summary(start_id, end_id)}")
+                frontier.close()
     
     def preprocess_corpus(self, config: Optional[PreprocessingConfig] = None) -> List[Dict[str, Any]]:
         """Предобработка корпуса текстов"""
@@ -0,0 +1,236 @@
+"""
+Облегченные варианты страниц статей: версии для печати, AMP, JSON API.
+
+Полная страница статьи - это в основном меню, скрипты и реклама, которые
+загружаются и разбираются только для того, чтобы быть отброшенными. Если
+сайт отдает ту же статью в облегченном виде, варианты из конфигурации
+пробуются по порядку, а полная страница загружается, только если ни один
+вариант не дал статью (нет такой страницы, не хватило полей и т.п.).
+
+Вариант задается словарем:
+    {'name': 'print', 'url': '{url}?print=true'}
+    {'name': 'amp', 'url': '{base_url}/amp/{id}'}
+    {'name': 'api', 'url': '{base_url}/api/doc/{id}', 'kind': 'json',
+     'fields': {'title': 'data.title', 'text': 'data.body', 'date': 'data.published'}}
+
+В шаблоне URL доступны {url} (URL статьи без параметров), {base_url},
+{path} и {id} (последнее число в пути). HTML-варианты разбираются как
+полная страница (структурированные данные, затем селекторы сайта),
+JSON-варианты - по путям fields или, без них, как объект schema.org
+(headline, articleBody, datePublished, ...)
+
+По каждому варианту считаются запросы, статьи, байты на статью и время
+разбора - по ним видно, какой источник дешевле (см. VariantStats)
+"""
+import html
+import json
+import re
+import threading
+import time
+import logging
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlparse
+
+from structured_data import fields_from_json_ld, names, normalize_date
+from crawl_frontier import STATUS_NOT_MODIFIED
+
+logger = logging.getLogger(__name__)
+
+VARIANT_HTML = 'html'
+VARIANT_JSON = 'json'
+
+# Имя полной страницы в статистике
+FULL_PAGE = 'full'
+
+ID_RE = re.compile(r'(\d+)(?!.*\d)')
+TAG_RE = re.compile(r'<[^>]+>')
+
+
+class PageVariant(NamedTuple):
+    name: str
+    url: str  # шаблон URL
+    kind: str = VARIANT_HTML
+    fields: Optional[Dict[str, str]] = None  # поле статьи -> путь в JSON ('data.items.0.title')
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'PageVariant':
+        kind = config.get('kind', VARIANT_HTML)
+        if kind not in (VARIANT_HTML, VARIANT_JSON):
+            raise ValueError(f"Неизвестный тип варианта страницы: {kind}")
+        return cls(config['name'], config['url'], kind, config.get('fields'))
+
+    def url_for(self, article_url: str) -> str:
+        """URL варианта для статьи"""
+        parsed = urlparse(article_url)
+        path = parsed.path.rstrip('/')
+        match = ID_RE.search(path)
+        return self.url.format(url=f"{parsed.scheme}://{parsed.netloc}{path}",
+                               base_url=f"{parsed.scheme}://{parsed.netloc}",
+                               path=path, id=match.group(1) if match else '')
+
+
+def parse_variants(configs: Optional[List[Dict]]) -> List[PageVariant]:
+    """Варианты из конфигурации сайта (список словарей)"""
+    return [PageVariant.from_config(config) for config in configs or []]
+
+
+def _lookup(data, path: str):
+    for key in path.split('.'):
+        if isinstance(data, list) and key.isdigit() and int(key) < len(data):
+            data = data[int(key)]
+        elif isinstance(data, dict) and key in data:
+            data = data[key]
+        else:
+            return None
+    return data
+
+
+def _plain_text(value: str, unescape: bool = True) -> str:
+    """
+    Текст без HTML-разметки (тело статьи в JSON часто хранится с тегами абзацев)
+
+    unescape=False - сущности уже декодированы (fields_from_json_ld)
+    """
+    if '<' not in value:
+        return value.strip()
+    text = TAG_RE.sub(' ', value)
+    return ' '.join((html.unescape(text) if unescape else text).split())
+
+
+def extract_json_fields(content: bytes, variant: PageVariant) -> Dict:
+    """Поля статьи из ответа JSON-варианта (пустой словарь, если ответ не JSON)"""
+    try:
+        data = json.loads(content)
+    except ValueError:
+        return {}
+    if not variant.fields:
+        fields = fields_from_json_ld(data, require_type=False)
+        if fields.get('text'):
+            fields['text'] = _plain_text(fields['text'], unescape=False)
+        return fields
+
+    fields = {}
+    for name, path in variant.fields.items():
+        value = _lookup(data, path)
+        if value is None:
+            continue
+        if name in ('tags', 'author'):
+            if isinstance(value, str) and name == 'tags':
+                value = value.split(',')
+            items = [item.strip() for item in names(value) if item.strip()]
+            if items:
+                fields[name] = items if name == 'tags' else ', '.join(items)
+        elif name == 'date':
+            date = normalize_date(value) if isinstance(value, str) else None
+            if date:
+                fields[name] = date
+        elif isinstance(value, str) and value.strip():
+            fields[name] = _plain_text(value) if name == 'text' else html.unescape(value).strip()
+    return fields
+
+
+def fetch_variant(fetcher, variants: List[PageVariant], url: str,
+                  extract: Callable[[PageVariant, bytes], Tuple[Optional[Dict], str]],
+                  stats: 'VariantStats') -> Optional[Tuple[Optional[Dict], str]]:
+    """
+    Статья из первого подходящего варианта страницы
+
+    extract(variant, content) возвращает (статья или None, исход).
+
+    Returns:
+        (статья, исход); (None, STATUS_NOT_MODIFIED), если вариант не изменился
+        с прошлой загрузки; None, если ни один вариант не подошел и нужна
+        полная страница
+    """
+    for variant in variants:
+        try:
+            result = fetcher.fetch(variant.url_for(url))
+        except Exception as e:
+            logger.debug(f"Вариант {variant.name} недоступен для {url}: {e}")
+            stats.record(variant.name, 0, 0.0, False)
+            continue
+        outcome = _variant_result(fetcher, variant, result, url, extract, stats)
+        if outcome is not None:
+            return outcome
+    return None
+
+
+async def fetch_variant_async(fetcher, variants: List[PageVariant], url: str,
+                              extract: Callable[[PageVariant, bytes], Tuple[Optional[Dict], str]],
+                              stats: 'VariantStats') -> Optional[Tuple[Optional[Dict], str]]:
+    """fetch_variant для AsyncHttpFetcher"""
+    for variant in variants:
+        try:
+            result = await fetcher.fetch(variant.url_for(url))
+        except Exception as e:
+            logger.debug(f"Вариант {variant.name} недоступен для {url}: {e}")
+            stats.record(variant.name, 0, 0.0, False)
+            continue
+        outcome = _variant_result(fetcher, variant, result, url, extract, stats)
+        if outcome is not None:
+            return outcome
+    return None
+
+
+def _variant_result(fetcher, variant: PageVariant, result, url: str, extract, stats: 'VariantStats'):
+    """
+    Статья из ответа варианта (None - вариант не подошел)
+
+    Валидаторы кэша хранятся только для вариантов, которые дали статью:
+    у варианта без статьи они удаляются. Поэтому неизменившийся вариант
+    означает, что не изменилась и статья, а статью, полученную из полной
+    страницы или другого варианта, проверяет ее собственный запрос.
+    """
+    if result.unchanged:
+        stats.record(variant.name, 0, 0.0, False)
+        return None, STATUS_NOT_MODIFIED
+    if not result.ok:
+        stats.record(variant.name, len(result.content or b''), 0.0, False)
+        return None
+    started = time.perf_counter()
+    article, status = extract(variant, result.content)
+    stats.record(variant.name, len(result.content), time.perf_counter() - started, article is not None)
+    if article is None:
+        logger.debug(f"Вариант {variant.name} не дал статью {url} ({status}), пробуем следующий")
+        if fetcher.cache is not None:
+            fetcher.cache.forget(result.url)
+        return None
+    return article, status
+
+
+class VariantStats:
+    """Запросы, статьи, байты и время разбора по вариантам страниц"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.variants: Dict[str, Dict[str, float]] = {}
+
+    def record(self, name: str, size: int, seconds: float, ok: bool):
+        with self._lock:
+            entry = self.variants.setdefault(name, {'requests': 0, 'articles': 0, 'bytes': 0, 'seconds': 0.0})
+            entry['requests'] += 1
+            entry['articles'] += int(ok)
+            entry['bytes'] += size
+            entry['seconds'] += seconds
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """По вариантам: запросы, статьи, байт на статью, мс разбора на страницу"""
+        with self._lock:
+            return {
+                name: {
+                    'requests': entry['requests'],
+                    'articles': entry['articles'],
+                    'bytes_per_article': round(entry['bytes'] / entry['articles']) if entry['articles'] else None,
+                    'parse_ms_per_page': round(entry['seconds'] * 1000 / entry['requests'], 3)
+                }
+                for name, entry in self.variants.items()
+            }
+
+    def __str__(self) -> str:
+        parts = []
+        for name, entry in self.stats().items():
+            size = (f"{entry['bytes_per_article'] / 1024:.1f} КиБ на статью"
+                    if entry['bytes_per_article'] is not None else "статей нет")
+            parts.append(f"{name}: {entry['articles']} из {entry['requests']}, {size}, "
+                         f"разбор {entry['parse_ms_per_page']:.2f} мс")
+        return '; '.join(parts)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Сравнение полного и частичного разбора страниц статей: время извлечения
+и пик памяти Python-объектов на страницу для каждого бэкенда, с проверкой
+совпадения результатов.
+
+Частичный разбор выгоден только для html.parser: с lxml он примерно в 3 раза
+медленнее полного, потому что отбор элементов выполняется в Python, а не
+в libxml2. Память дерева libxml2 tracemalloc не видит, поэтому для lxml
+пик памяти отражает только Python-объекты.
+
+Каждый вариант запускается в отдельном процессе, чтобы освобожденная
+предыдущими вариантами память не искажала замер
+"""
+import argparse
+import gc
+import logging
+import multiprocessing
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Dict, List
+
+from html_backends import LXML_AVAILABLE
+from kommersant_parser import KommersantParser
+from mock_news_server import load_articles, render_article_page
+from html_backend_benchmark import normalize
+
+
+def measure(backend_name: str, partial: bool, pages: List[bytes]) -> Dict:
+    """Замер одного варианта (выполняется в отдельном процессе)"""
+    logging.getLogger().setLevel(logging.ERROR)
+    # Быстрый путь по JSON-LD отключен, чтобы каждая страница разбиралась
+    parser = KommersantParser(delay=0, html_backend=backend_name, structured_data=False,
+                              partial_parse=partial)
+    urls = [f"https://www.kommersant.ru/doc/{8050000 + i}" for i in range(len(pages))]
+
+    latencies = []
+    results = []
+    for content, url in zip(pages, urls):
+        started = time.perf_counter()
+        article = parser.extract_article(content, url)
+        latencies.append(time.perf_counter() - started)
+        results.append(normalize(article))
+
+    # Пик памяти Python-объектов при разборе одной страницы
+    peaks = []
+    for content in pages[:20]:
+        gc.collect()
+        tracemalloc.start()
+        parser.html_backend.parse(content, parser.strainer)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    return {'latencies': latencies, 'results': results, 'peak_kib': statistics.mean(peaks) / 1024}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Сравнение полного и частичного разбора HTML")
+    arg_parser.add_argument('--pages', type=int, default=200, help="Количество страниц")
+    arg_parser.add_argument('--padding', type=int, default=250_000,
+                            help="Объем служебной разметки на странице, байт")
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+
+    pages = [render_article_page(article, structured_data=False, padding=args.padding)
+             for article in load_articles()[:args.pages]]
+    backends = ['lxml', 'html.parser'] if LXML_AVAILABLE else ['html.parser']
+    print(f"Страниц: {len(pages)}, средний размер {statistics.mean(map(len, pages)) / 1024:.0f} КиБ")
+
+    runs = {}
+    context = multiprocessing.get_context('spawn')
+    for backend_name in backends:
+        for partial in (False, True):
+            with context.Pool(1) as pool:
+                runs[backend_name, partial] = pool.apply(measure, (backend_name, partial, pages))
+
+    print(f"{'Бэкенд':<12} {'Разбор':<10} {'Среднее, мс':>12} {'p95, мс':>10} {'Пик Python, КиБ':>16}")
+    failed = False
+    for backend_name in backends:
+        for partial in (False, True):
+            run = runs[backend_name, partial]
+            latencies = sorted(run['latencies'])
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            print(f"{backend_name:<12} {'частичный' if partial else 'полный':<10} "
+                  f"{statistics.mean(latencies) * 1000:>12.2f} {p95 * 1000:>10.2f} "
+                  f"{run['peak_kib']:>16.0f}")
+        full, part = runs[backend_name, False], runs[backend_name, True]
+        mismatches = sum(a != b for a, b in zip(full['results'], part['results']))
+        if mismatches:
+            failed = True
+            print(f"❌ {backend_name}: результаты различаются на {mismatches} из {len(pages)} страниц")
+
+    for backend_name in backends:
+        ratio = (statistics.mean(runs[backend_name, True]['latencies'])
+                 / statistics.mean(runs[backend_name, False]['latencies']))
+        if ratio > 1:
+            print(f"{backend_name}: частичный разбор в {ratio:.1f} раза медленнее полного")
+        else:
+            print(f"{backend_name}: частичный разбор в {1 / ratio:.1f} раза быстрее полного")
+    if 'lxml' in backends:
+        print("Примечание: пик памяти lxml не включает дерево libxml2 (его не видит tracemalloc)")
+
+    if failed:
+        sys.exit(1)
+    print("✅ Результаты полного и частичного разбора совпадают")
+
+
+if __name__ == "__main__":
+    main()
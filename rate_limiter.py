@@ -0,0 +1,164 @@
+"""
+Адаптивное ограничение частоты запросов к сайту.
+
+Корзина токенов пополняется с текущим темпом (запросов в секунду), а сам
+темп подстраивается по схеме AIMD: после каждого успешного быстрого ответа
+он растет на постоянную величину, а при ответах 429/503, сетевых ошибках
+и росте задержки - уменьшается в несколько раз. Заголовок Retry-After
+приостанавливает выдачу токенов на указанное сервером время
+"""
+import asyncio
+import threading
+import time
+import logging
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Ответы, означающие перегрузку сервера
+THROTTLE_STATUSES = (429, 503)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Значение Retry-After в секундах (число секунд или HTTP-дата)"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return max(0.0, (moment - datetime.now(timezone.utc)).total_seconds())
+
+
+class AdaptiveRateLimiter:
+    """
+    Корзина токенов с AIMD-регулировкой темпа
+
+    Один экземпляр можно использовать из нескольких потоков (acquire)
+    и асинхронных задач (acquire_async) одновременно.
+
+    Args:
+        rate: Начальный темп, запросов в секунду
+        min_rate: Нижняя граница темпа
+        max_rate: Верхняя граница темпа
+        burst: Емкость корзины (сколько запросов можно отправить подряд)
+        increase: Прирост темпа после успешного ответа, запросов в секунду
+        decrease: Множитель темпа при перегрузке (0 < decrease < 1)
+        target_latency: Задержка ответа в секундах, выше которой сервер
+            считается перегруженным
+    """
+
+    def __init__(self, rate: float = 1.0, min_rate: float = 0.1, max_rate: float = 10.0,
+                 burst: float = 1.0, increase: float = 0.05, decrease: float = 0.5,
+                 target_latency: float = 2.0):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+        self.target_latency = target_latency
+
+        self._rate = min(max(rate, min_rate), max_rate)
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+        # Метрики
+        self.requests = 0
+        self.decreases = 0
+        self.retry_after_pauses = 0
+        self.total_wait = 0.0
+
+    @classmethod
+    def from_delay(cls, delay: float, **kwargs) -> 'AdaptiveRateLimiter':
+        """Ограничитель, начинающий с темпа «один запрос в delay секунд»"""
+        rate = 1.0 / delay
+        kwargs.setdefault('min_rate', rate / 10)
+        kwargs.setdefault('max_rate', rate * 4)
+        kwargs.setdefault('increase', rate / 20)
+        return cls(rate=rate, **kwargs)
+
+    @property
+    def rate(self) -> float:
+        """Текущий темп, запросов в секунду"""
+        return self._rate
+
+    def _reserve(self) -> float:
+        """Резервирование токена; возвращает, сколько секунд ждать до запроса"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+            # Токен списывается сразу (баланс может уйти в минус) - так ожидающие
+            # потоки выстраиваются в очередь, а не просыпаются все одновременно
+            self._tokens -= 1
+            wait = -self._tokens / self._rate if self._tokens < 0 else 0.0
+            wait = max(wait, self._blocked_until - now)
+            self.requests += 1
+            self.total_wait += wait
+        return wait
+
+    def acquire(self):
+        """Ожидание разрешения на запрос (для потоков)"""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Ожидание разрешения на запрос (для asyncio)"""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def observe(self, status: int, elapsed: float, headers: Optional[Dict[str, str]] = None):
+        """
+        Учет ответа сервера для подстройки темпа
+
+        Args:
+            status: HTTP статус (0 - сетевая ошибка)
+            elapsed: Время ответа в секундах
+            headers: Заголовки ответа (для Retry-After)
+        """
+        retry_after = None
+        if headers:
+            retry_after = parse_retry_after(next(
+                (value for name, value in headers.items() if name.lower() == 'retry-after'), None
+            ))
+
+        overloaded = status == 0 or status in THROTTLE_STATUSES or elapsed > self.target_latency
+        with self._lock:
+            now = time.monotonic()
+            if retry_after is not None and status in THROTTLE_STATUSES:
+                self._blocked_until = max(self._blocked_until, now + retry_after)
+                self.retry_after_pauses += 1
+
+            if overloaded:
+                # Одна перегрузка затрагивает сразу много параллельных запросов -
+                # темп снижается не чаще раза за время ответа
+                if now - self._last_decrease >= max(elapsed, 1.0 / self._rate):
+                    self._rate = max(self.min_rate, self._rate * self.decrease)
+                    self._last_decrease = now
+                    self.decreases += 1
+                    logger.warning(f"Сервер перегружен (статус {status}, {elapsed:.2f} с), "
+                                   f"темп снижен до {self._rate:.2f} запр/с")
+            else:
+                self._rate = min(self.max_rate, self._rate + self.increase)
+
+    def stats(self) -> Dict:
+        """Метрики ограничителя"""
+        return {
+            'rate': round(self._rate, 3),
+            'requests': self.requests,
+            'decreases': self.decreases,
+            'retry_after_pauses': self.retry_after_pauses,
+            'total_wait': round(self.total_wait, 3)
+        }
@@ -0,0 +1,218 @@
+"""
+Повторные попытки загрузки и автоматический выключатель по хостам.
+
+Ответы делятся на классы: сетевые ошибки, 429 и 5xx считаются временными
+и повторяются с экспоненциальной задержкой и случайным разбросом; 404/410
+означают, что страницы нет, и не повторяются. Выключатель (circuit breaker)
+следит за долей временных ошибок по каждому хосту и, если она слишком
+высока, приостанавливает запросы к хосту, чтобы не добивать сайт во время сбоя
+"""
+import random
+import threading
+import time
+import logging
+from collections import deque
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from rate_limiter import parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+# Классы исхода запроса
+OUTCOME_SUCCESS = 'success'
+OUTCOME_NOT_FOUND = 'not_found'
+OUTCOME_CLIENT_ERROR = 'client_error'  # остальные 4xx - повтор не поможет
+OUTCOME_TRANSIENT = 'transient'  # сетевая ошибка, 429, 5xx
+
+# Состояния выключателя
+CIRCUIT_CLOSED = 'closed'
+CIRCUIT_OPEN = 'open'
+CIRCUIT_HALF_OPEN = 'half_open'
+
+
+def classify(status: int, error: Optional[str] = None) -> str:
+    """Класс исхода запроса по статусу (0 или error - сетевая ошибка)"""
+    if error is not None or status == 0:
+        return OUTCOME_TRANSIENT
+    if status in (404, 410):
+        return OUTCOME_NOT_FOUND
+    if status == 429 or status >= 500:
+        return OUTCOME_TRANSIENT
+    if status >= 400:
+        return OUTCOME_CLIENT_ERROR
+    return OUTCOME_SUCCESS
+
+
+class RetryPolicy:
+    """
+    Политика повторных попыток
+
+    Задержка перед попыткой n (с нуля) выбирается случайно из
+    [0, min(backoff_max, backoff_base * 2^n)] (full jitter), чтобы
+    параллельные запросы не повторялись одновременно. Retry-After
+    сервера задает нижнюю границу задержки.
+
+    Args:
+        max_attempts: Максимум попыток на один URL (включая первую)
+        backoff_base: Базовая задержка в секундах
+        backoff_max: Верхняя граница задержки в секундах
+        retry_connection_errors: Повторять сетевые ошибки и таймауты
+        retry_server_errors: Повторять ответы 429 и 5xx
+        retry_not_found: Повторять 404/410 (полезно, если статьи публикуются с задержкой)
+        seed: Зерно генератора разброса (None - случайное)
+    """
+
+    def __init__(self, max_attempts: int = 3, backoff_base: float = 0.5, backoff_max: float = 30.0,
+                 retry_connection_errors: bool = True, retry_server_errors: bool = True,
+                 retry_not_found: bool = False, seed: Optional[int] = None):
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_connection_errors = retry_connection_errors
+        self.retry_server_errors = retry_server_errors
+        self.retry_not_found = retry_not_found
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.retries = 0
+
+    def should_retry(self, status: int, error: Optional[str], attempt: int) -> bool:
+        """Нужна ли еще одна попытка после попытки номер attempt (с нуля)"""
+        if attempt + 1 >= self.max_attempts:
+            return False
+        outcome = classify(status, error)
+        if outcome == OUTCOME_TRANSIENT:
+            if error is not None or status == 0:
+                return self.retry_connection_errors
+            return self.retry_server_errors
+        if outcome == OUTCOME_NOT_FOUND:
+            return self.retry_not_found
+        return False
+
+    def backoff(self, attempt: int, headers: Optional[Dict[str, str]] = None) -> float:
+        """Задержка перед следующей попыткой в секундах"""
+        with self._lock:
+            self.retries += 1
+            delay = self._random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if headers:
+            retry_after = parse_retry_after(next(
+                (value for name, value in headers.items() if name.lower() == 'retry-after'), None
+            ))
+            if retry_after is not None:
+                delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+
+class _HostCircuit:
+    """Состояние выключателя одного хоста"""
+
+    def __init__(self, window: int):
+        self.state = CIRCUIT_CLOSED
+        self.outcomes = deque(maxlen=window)  # True - временная ошибка
+        self.opened_at = 0.0
+        self.cooldown = 0.0
+        self.trial_in_flight = False
+
+
+class CircuitBreaker:
+    """
+    Выключатель запросов по хостам
+
+    Пока доля временных ошибок среди последних window ответов хоста ниже
+    failure_ratio, запросы идут свободно. Иначе выключатель размыкается, и
+    запросы к хосту ждут cooldown секунд; затем пропускается один пробный
+    запрос: при успехе выключатель замыкается, при ошибке снова размыкается
+    с удвоенной паузой (не больше max_cooldown).
+
+    Args:
+        failure_ratio: Доля ошибок, при которой выключатель размыкается
+        window: Число последних ответов, по которым считается доля
+        min_requests: Минимум ответов в окне для принятия решения
+        cooldown: Начальная пауза в секундах
+        max_cooldown: Максимальная пауза в секундах
+    """
+
+    def __init__(self, failure_ratio: float = 0.5, window: int = 20, min_requests: int = 10,
+                 cooldown: float = 30.0, max_cooldown: float = 600.0):
+        self.failure_ratio = failure_ratio
+        self.window = window
+        self.min_requests = min_requests
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._hosts: Dict[str, _HostCircuit] = {}
+        self._lock = threading.Lock()
+        self.opened = 0
+
+    def _host(self, url: str) -> _HostCircuit:
+        host = urlparse(url).netloc
+        if host not in self._hosts:
+            self._hosts[host] = _HostCircuit(self.window)
+        return self._hosts[host]
+
+    def wait_time(self, url: str) -> float:
+        """
+        Сколько секунд ждать перед запросом к хосту URL (0 - можно отправлять)
+
+        Вызывающий код должен подождать и спросить снова.
+        """
+        with self._lock:
+            circuit = self._host(url)
+            if circuit.state == CIRCUIT_CLOSED:
+                return 0.0
+            remaining = circuit.opened_at + circuit.cooldown - time.monotonic()
+            if remaining > 0:
+                return remaining
+            if circuit.trial_in_flight:
+                # Пробный запрос уже отправлен - ждем его результата
+                return min(1.0, circuit.cooldown)
+            circuit.state = CIRCUIT_HALF_OPEN
+            circuit.trial_in_flight = True
+            return 0.0
+
+    def record(self, url: str, status: int, error: Optional[str] = None):
+        """Учет результата запроса"""
+        failed = classify(status, error) == OUTCOME_TRANSIENT
+        host = urlparse(url).netloc
+        with self._lock:
+            circuit = self._host(url)
+            if circuit.state == CIRCUIT_HALF_OPEN:
+                circuit.trial_in_flight = False
+                if failed:
+                    circuit.cooldown = min(self.max_cooldown, circuit.cooldown * 2)
+                    circuit.opened_at = time.monotonic()
+                    circuit.state = CIRCUIT_OPEN
+                    logger.warning(f"Хост {host} по-прежнему недоступен, пауза {circuit.cooldown:.1f} с")
+                else:
+                    circuit.state = CIRCUIT_CLOSED
+                    circuit.outcomes.clear()
+                    logger.info(f"Хост {host} снова отвечает, запросы возобновлены")
+                return
+            if circuit.state == CIRCUIT_OPEN:
+                return  # ответы на запросы, отправленные до размыкания
+
+            circuit.outcomes.append(failed)
+            failures = sum(circuit.outcomes)
+            if (len(circuit.outcomes) >= self.min_requests
+                    and failures / len(circuit.outcomes) >= self.failure_ratio):
+                circuit.state = CIRCUIT_OPEN
+                circuit.opened_at = time.monotonic()
+                circuit.cooldown = self.base_cooldown
+                self.opened += 1
+                logger.warning(f"Доля ошибок хоста {host}: {failures}/{len(circuit.outcomes)}, "
+                               f"запросы приостановлены на {circuit.cooldown:.1f} с")
+
+    def abandon_trial(self, url: str):
+        """
+        Отказ от запроса без результата (отмена, исключение, исчерпанный бюджет):
+        если это был пробный запрос, следующий вызов wait_time пропустит новый
+        пробный запрос, иначе запросы к хосту ждали бы результата вечно
+        """
+        with self._lock:
+            circuit = self._host(url)
+            if circuit.state == CIRCUIT_HALF_OPEN:
+                circuit.trial_in_flight = False
+
+    def state(self, url: str) -> str:
+        """Состояние выключателя для хоста URL"""
+        with self._lock:
+            return self._host(url).state
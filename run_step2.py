@@ -5,6 +5,7 @@
 import json
 import os
 from text_cleaner import TextCleaner
+from near_duplicates import NearDuplicateIndex, filter_near_duplicates
 
 def main():
     print("=" * 60)
@@ -26,6 +27,12 @@ def main():
     
     print(f"✅ Загружено {len(articles)} статей")
     
+    # Удаление почти дубликатов (перепечатки, обновленные версии новостей,
+    # однотипные объявления) - они искажают статистику словаря
+    duplicate_index = NearDuplicateIndex(path=None, threshold=0.8)
+    articles = list(filter_near_duplicates(articles, duplicate_index))
+    print(f"🔁 Удалено почти дубликатов: {duplicate_index.duplicates}, осталось {len(articles)} статей")
+    
     # Создание очистителя текста
     cleaner = TextCleaner(remove_stopwords=True, language='russian')
     
@@ -0,0 +1,285 @@
+"""
+Координация обхода диапазона ID несколькими процессами (в том числе на
+разных машинах с общей файловой системой).
+
+Диапазон делится на шарды; процесс-обработчик берет свободный шард в аренду
+(lease) на lease_seconds и продлевает ее в фоновом потоке, пока работает.
+Если обработчик завершился аварийно, аренда истекает и шард берет другой
+обработчик. Результат шарда - отдельный JSONL файл, который становится
+видимым (переименовывается из временного) только после завершения шарда,
+поэтому незавершенный шард при повторной обработке начинается заново.
+
+Состояние хранится в SQLite: выдача аренды выполняется в транзакции
+BEGIN IMMEDIATE, поэтому два обработчика не могут получить один шард.
+На нескольких машинах файл базы должен лежать на файловой системе с
+работающими блокировками (на NFS они часто не работают), а часы машин -
+быть синхронизированы с точностью много меньше lease_seconds
+"""
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+import logging
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from article_sink import ArticleSink, iter_articles
+
+logger = logging.getLogger(__name__)
+
+# Состояния шарда
+SHARD_PENDING = 'pending'
+SHARD_LEASED = 'leased'
+SHARD_DONE = 'done'
+
+
+class Shard(NamedTuple):
+    shard_id: int
+    start_id: int
+    end_id: int
+    attempts: int
+
+
+class ShardCoordinator:
+    """
+    SQLite-хранилище шардов и аренд
+
+    Args:
+        db_path: Путь к файлу базы данных (общий для всех обработчиков)
+        lease_seconds: Срок аренды; продлевается каждые lease_seconds / 3
+        worker_id: Идентификатор обработчика (по умолчанию - хост, PID и случайный суффикс)
+    """
+
+    def __init__(self, db_path: str = "crawl_shards.db", lease_seconds: float = 60.0,
+                 worker_id: Optional[str] = None):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._lock = threading.Lock()
+        # isolation_level=None: транзакции открываются явно (BEGIN IMMEDIATE)
+        self._conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS shards (
+                shard_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                start_id INTEGER NOT NULL,
+                end_id INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                owner TEXT,
+                lease_until REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                output TEXT,
+                UNIQUE (start_id, end_id)
+            )
+        """)
+
+    def plan(self, start_id: int, end_id: int, shard_size: int = 10_000) -> int:
+        """
+        Разбиение диапазона на шарды по shard_size ID
+
+        Повторный вызов с теми же параметрами (например, каждым обработчиком
+        при запуске) ничего не меняет. Returns: количество шардов диапазона
+        """
+        bounds = [(first, min(first + shard_size - 1, end_id))
+                  for first in range(start_id, end_id + 1, shard_size)]
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            self._conn.executemany('INSERT OR IGNORE INTO shards (start_id, end_id) VALUES (?, ?)', bounds)
+            self._conn.execute('COMMIT')
+        return len(bounds)
+
+    def claim(self) -> Optional[Shard]:
+        """Аренда свободного шарда или шарда с истекшей арендой (None - шардов не осталось)"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._conn.execute("""
+                    SELECT shard_id, start_id, end_id, attempts, status, owner FROM shards
+                    WHERE status = ? OR (status = ? AND lease_until < ?)
+                    ORDER BY start_id LIMIT 1
+                """, (SHARD_PENDING, SHARD_LEASED, now)).fetchone()
+                if row is None:
+                    self._conn.execute('COMMIT')
+                    return None
+                shard_id, start_id, end_id, attempts, status, owner = row
+                self._conn.execute("""
+                    UPDATE shards SET status = ?, owner = ?, lease_until = ?, attempts = attempts + 1
+                    WHERE shard_id = ?
+                """, (SHARD_LEASED, self.worker_id, now + self.lease_seconds, shard_id))
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        if status == SHARD_LEASED:
+            logger.warning(f"Аренда шарда {start_id}-{end_id} обработчика {owner} истекла, "
+                           f"шард передан {self.worker_id}")
+        return Shard(shard_id, start_id, end_id, attempts + 1)
+
+    def next_shard(self) -> Optional[Shard]:
+        """
+        Аренда следующего шарда с ожиданием: пока шарды других обработчиков
+        не завершены, их аренда может истечь (обработчик упал), и такой шард
+        нужно забрать. None - все шарды завершены
+        """
+        while True:
+            shard = self.claim()
+            if shard is not None:
+                return shard
+            with self._lock:
+                row = self._conn.execute('SELECT MIN(lease_until) FROM shards WHERE status = ?',
+                                         (SHARD_LEASED,)).fetchone()
+            if row[0] is None:
+                return None
+            time.sleep(min(max(row[0] - time.time(), 0.0) + 0.1, self.lease_seconds / 3))
+
+    def _update_owned(self, shard: Shard, assignments: str, params: tuple) -> bool:
+        """Изменение шарда, если он все еще арендован этим обработчиком"""
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE shards SET {assignments} WHERE shard_id = ? AND owner = ? AND status = ?",
+                (*params, shard.shard_id, self.worker_id, SHARD_LEASED))
+        return cursor.rowcount == 1
+
+    def renew(self, shard: Shard) -> bool:
+        """Продление аренды (False - аренда потеряна: истекла и шард передан другому)"""
+        return self._update_owned(shard, 'lease_until = ?', (time.time() + self.lease_seconds,))
+
+    def complete(self, shard: Shard, output: str) -> bool:
+        """Отметка о завершении шарда с путем к его результату"""
+        return self._update_owned(shard, 'status = ?, output = ?, lease_until = NULL', (SHARD_DONE, output))
+
+    def release(self, shard: Shard) -> bool:
+        """Возврат шарда в очередь (например, после ошибки обработчика)"""
+        return self._update_owned(shard, 'status = ?, owner = NULL, lease_until = NULL', (SHARD_PENDING,))
+
+    def outputs(self) -> List[str]:
+        """Результаты завершенных шардов в порядке ID"""
+        with self._lock:
+            rows = self._conn.execute('SELECT output FROM shards WHERE status = ? ORDER BY start_id',
+                                      (SHARD_DONE,)).fetchall()
+        return [row[0] for row in rows]
+
+    def progress(self) -> Dict[str, int]:
+        """Количество шардов по состояниям"""
+        with self._lock:
+            rows = self._conn.execute('SELECT status, COUNT(*) FROM shards GROUP BY status').fetchall()
+        return dict(rows)
+
+    def lease(self, shard: Shard) -> 'Lease':
+        """Фоновое продление аренды шарда на время обработки (контекстный менеджер)"""
+        return Lease(self, shard)
+
+    def close(self):
+        """Закрытие базы данных"""
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class Lease:
+    """
+    Продление аренды шарда в фоновом потоке
+
+    lost устанавливается, если продлить аренду не удалось: обработчик
+    должен прекратить работу над шардом и не публиковать его результат.
+    """
+
+    def __init__(self, coordinator: ShardCoordinator, shard: Shard):
+        self.coordinator = coordinator
+        self.shard = shard
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._renew_loop, daemon=True)
+
+    def _renew_loop(self):
+        interval = self.coordinator.lease_seconds / 3
+        while not self._stop.wait(interval):
+            try:
+                renewed = self.coordinator.renew(self.shard)
+            except sqlite3.Error as e:
+                # Временная недоступность базы: следующая попытка через interval
+                logger.warning(f"Не удалось продлить аренду шарда {self.shard.start_id}-{self.shard.end_id}: {e}")
+                continue
+            if not renewed:
+                logger.error(f"Аренда шарда {self.shard.start_id}-{self.shard.end_id} потеряна")
+                self.lost.set()
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+
+
+def shard_output_path(output_dir: str, shard: Shard) -> str:
+    """Файл результата шарда"""
+    return os.path.join(output_dir, f"shard-{shard.start_id}-{shard.end_id}.jsonl")
+
+
+def check_output_path(output_path: str, overwrite: bool = False):
+    """Отказ перезаписывать существующий корпус без явного overwrite=True"""
+    if not overwrite and os.path.exists(output_path):
+        raise FileExistsError(f"Файл {output_path} уже существует; чтобы заменить его, "
+                              f"передайте overwrite=True")
+
+
+def merge_shards(coordinator: ShardCoordinator, output_path: str, near_duplicates=None,
+                 overwrite: bool = False) -> int:
+    """
+    Объединение результатов завершенных шардов в один корпус
+
+    Статьи с одинаковым URL (шард, обработанный дважды, или перекрывающиеся
+    диапазоны) попадают в корпус один раз; если передан near_duplicates
+    (NearDuplicateIndex), отбрасываются и почти дубликаты. Корпус пишется
+    во временный файл и заменяет output_path только после объединения.
+
+    Args:
+        overwrite: Заменить существующий output_path (иначе - FileExistsError)
+
+    Returns:
+        Количество статей в корпусе
+    """
+    check_output_path(output_path, overwrite)
+    tmp_path = output_path + '.tmp'
+    if os.path.exists(tmp_path):
+        # Остаток прерванного объединения
+        os.remove(tmp_path)
+    seen_urls = set()
+    written = duplicates = 0
+    with ArticleSink(tmp_path) as sink:
+        for article in _iter_outputs(coordinator.outputs()):
+            url = article.get('url')
+            if url in seen_urls:
+                duplicates += 1
+                continue
+            seen_urls.add(url)
+            if near_duplicates is not None:
+                article = near_duplicates.admit(article)
+                if article is None:
+                    duplicates += 1
+                    continue
+            sink.write(article)
+            written += 1
+    os.replace(tmp_path, output_path)
+    if near_duplicates is not None:
+        near_duplicates.save()
+    logger.info(f"Корпус {output_path}: {written} статей, отброшено дубликатов: {duplicates}")
+    return written
+
+
+def _iter_outputs(paths: List[str]) -> Iterator[Dict]:
+    for path in paths:
+        if not os.path.exists(path):
+            logger.error(f"Результат шарда {path} не найден")
+            continue
+        yield from iter_articles(path)
@@ -0,0 +1,177 @@
+"""
+Быстрое извлечение полей статьи из структурированных данных страницы.
+
+Новостные сайты размещают в странице блоки application/ld+json
+(NewsArticle с headline, datePublished, articleSection, author, keywords
+и часто articleBody) и мета-теги og:/article:. Они находятся регулярными
+выражениями по байтам страницы без построения DOM-дерева; полный разбор
+HTML нужен, только если каких-то обязательных полей в них нет
+"""
+import html
+import json
+import re
+import threading
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from html_backends import CHARSET_RE
+
+logger = logging.getLogger(__name__)
+
+JSON_LD_RE = re.compile(
+    rb'<script[^>]+type\s*=\s*["\']application/ld\+json["\'][^>]*>(.*?)</script>',
+    re.IGNORECASE | re.DOTALL
+)
+META_RE = re.compile(rb'<meta\s[^>]*>', re.IGNORECASE)
+META_ATTR_RE = re.compile(rb'(property|name|content)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')', re.IGNORECASE)
+
+ARTICLE_TYPES = {'NewsArticle', 'Article', 'ReportageNewsArticle', 'AnalysisNewsArticle',
+                 'OpinionNewsArticle', 'BlogPosting'}
+
+# Поля, без которых статья со структурированными данными не считается полной
+REQUIRED_FIELDS = ('title', 'text', 'date')
+
+
+def normalize_date(value: Optional[str]) -> Optional[str]:
+    """Дата в формате, который дает DOM-извлечение (isoformat)"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.strip().replace('Z', '+00:00')).isoformat()
+    except ValueError:
+        return None
+
+
+def names(value) -> List[str]:
+    """Имена из поля author/keywords JSON-LD (строка, объект или список)"""
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, dict):
+        return [value['name']] if isinstance(value.get('name'), str) else []
+    if isinstance(value, list):
+        return [name for item in value for name in names(item)]
+    return []
+
+
+def _iter_json_ld_objects(data):
+    """Все объекты JSON-LD, включая вложенные в @graph и списки"""
+    if isinstance(data, list):
+        for item in data:
+            yield from _iter_json_ld_objects(item)
+    elif isinstance(data, dict):
+        yield data
+        if '@graph' in data:
+            yield from _iter_json_ld_objects(data['@graph'])
+
+
+def _is_article(obj: Dict) -> bool:
+    types = obj.get('@type')
+    types = types if isinstance(types, list) else [types]
+    return any(t in ARTICLE_TYPES for t in types)
+
+
+def fields_from_json_ld(data, fields: Optional[Dict] = None, require_type: bool = True) -> Dict:
+    """
+    Поля статьи из разобранного JSON в словаре schema.org (headline,
+    articleBody, datePublished, ...); уже найденные поля не перезаписываются
+
+    require_type=False - учитывать и объекты без @type статьи (ответы API)
+    """
+    fields = {} if fields is None else fields
+    for obj in _iter_json_ld_objects(data):
+        if require_type and not _is_article(obj):
+            continue
+        if isinstance(obj.get('headline'), str) and obj['headline'].strip():
+            fields.setdefault('title', html.unescape(obj['headline']).strip())
+        if isinstance(obj.get('articleBody'), str) and obj['articleBody'].strip():
+            fields.setdefault('text', html.unescape(obj['articleBody']).strip())
+        date = normalize_date(obj.get('datePublished'))
+        if date:
+            fields.setdefault('date', date)
+        section = obj.get('articleSection')
+        if isinstance(section, list):
+            section = section[0] if section else None
+        if isinstance(section, str) and section.strip():
+            fields.setdefault('category', section.strip())
+        authors = names(obj.get('author'))
+        if authors:
+            fields.setdefault('author', ', '.join(authors))
+        keywords = obj.get('keywords')
+        if isinstance(keywords, str):
+            keywords = keywords.split(',')
+        tags = [tag.strip() for tag in names(keywords) if tag.strip()]
+        if tags:
+            fields.setdefault('tags', tags)
+    return fields
+
+
+def scan_structured_data(content: bytes) -> Dict:
+    """
+    Поля статьи из JSON-LD и мета-тегов (без построения DOM)
+
+    Returns:
+        Словарь с найденными полями из title, text, date, category, tags, author
+    """
+    match = CHARSET_RE.search(content[:2048])
+    encoding = match.group(1).decode('ascii') if match else 'utf-8'
+
+    def decode(raw: bytes) -> str:
+        try:
+            return raw.decode(encoding, 'replace')
+        except LookupError:
+            return raw.decode('utf-8', 'replace')
+
+    fields = {}
+
+    for block in JSON_LD_RE.findall(content):
+        try:
+            data = json.loads(decode(block).strip())
+        except ValueError:
+            continue
+        fields_from_json_ld(data, fields)
+
+    meta = {}
+    for tag in META_RE.findall(content):
+        attrs = {name.lower().decode('ascii'): decode(double or single)
+                 for name, double, single in META_ATTR_RE.findall(tag)}
+        key = attrs.get('property') or attrs.get('name')
+        if key and 'content' in attrs:
+            meta.setdefault(key.lower(), html.unescape(attrs['content']).strip())
+
+    if meta.get('og:title'):
+        fields.setdefault('title', meta['og:title'])
+    date = normalize_date(meta.get('article:published_time'))
+    if date:
+        fields.setdefault('date', date)
+    if meta.get('article:section'):
+        fields.setdefault('category', meta['article:section'])
+    author = meta.get('author') or meta.get('article:author')
+    if author:
+        fields.setdefault('author', author)
+    if meta.get('keywords'):
+        fields.setdefault('tags', [tag.strip() for tag in meta['keywords'].split(',')])
+
+    return fields
+
+
+class FastPathStats:
+    """Счетчик страниц, обработанных без построения DOM"""
+
+    def __init__(self):
+        self.pages = 0
+        self.fast_path = 0
+        self._lock = threading.Lock()
+
+    def record(self, fast: bool):
+        with self._lock:
+            self.pages += 1
+            if fast:
+                self.fast_path += 1
+
+    @property
+    def fraction(self) -> float:
+        return self.fast_path / self.pages if self.pages else 0.0
+
+    def __str__(self) -> str:
+        return f"{self.fast_path} из {self.pages} страниц ({self.fraction:.1%})"
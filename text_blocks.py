@@ -0,0 +1,86 @@
+"""
+Сбор абзацев текста статьи из блока с содержимым.
+
+Исходный способ (TEXT_MODE_LEGACY) берет текст всех элементов p и div
+внутри блока. Если div оборачивает несколько абзацев, их текст попадает
+в статью дважды: в составе div и сам по себе. Режим TEXT_MODE_LEAF берет
+только листовые блоки (p или div без вложенных p/div) и пропускает абзацы
+с уже встречавшимся текстом (повторы врезок, подписей и т.п.).
+
+Текст, лежащий в div рядом с вложенными абзацами (а не внутри них),
+в режиме TEXT_MODE_LEAF не попадает в статью
+"""
+import threading
+import logging
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TEXT_MODE_LEGACY = 'legacy'
+TEXT_MODE_LEAF = 'leaf'
+TEXT_MODES = (TEXT_MODE_LEGACY, TEXT_MODE_LEAF)
+
+BLOCK_TAGS = ['p', 'div']
+
+
+def _joined_size(parts: List[str]) -> int:
+    """Размер текста статьи в байтах UTF-8 (абзацы соединяются пробелом)"""
+    return sum(len(part.encode('utf-8')) for part in parts) + max(len(parts) - 1, 0)
+
+
+def collect_text_blocks(text_elem, mode: str = TEXT_MODE_LEGACY,
+                        min_length: int = 20) -> Tuple[Optional[List[str]], int]:
+    """
+    Абзацы текста из блока с содержимым
+
+    Args:
+        text_elem: Элемент с текстом статьи (BeautifulSoup или адаптер lxml)
+        mode: TEXT_MODE_LEGACY или TEXT_MODE_LEAF
+        min_length: Более короткие фрагменты отбрасываются
+
+    Returns:
+        (абзацы или None, размер текста в байтах при извлечении исходным способом)
+    """
+    legacy_parts = []
+    parts = []
+    seen = set()
+    for block in text_elem.find_all(BLOCK_TAGS, recursive=True):
+        text = block.get_text().strip()
+        if not text or len(text) <= min_length:
+            continue
+        legacy_parts.append(text)
+        if mode == TEXT_MODE_LEGACY:
+            continue
+        if block.find_all(BLOCK_TAGS) or text in seen:
+            continue
+        seen.add(text)
+        parts.append(text)
+
+    if mode == TEXT_MODE_LEGACY:
+        parts = legacy_parts
+    return parts or None, _joined_size(legacy_parts)
+
+
+class TextDedupStats:
+    """Сколько байт текста сэкономлено на странице по сравнению с исходным способом"""
+
+    def __init__(self):
+        self.pages = 0
+        self.legacy_bytes = 0
+        self.text_bytes = 0
+        self._lock = threading.Lock()
+
+    def record(self, legacy_bytes: int, parts: List[str]):
+        with self._lock:
+            self.pages += 1
+            self.legacy_bytes += legacy_bytes
+            self.text_bytes += _joined_size(parts)
+
+    @property
+    def saved_per_page(self) -> float:
+        return (self.legacy_bytes - self.text_bytes) / self.pages if self.pages else 0.0
+
+    def __str__(self) -> str:
+        share = 1 - self.text_bytes / self.legacy_bytes if self.legacy_bytes else 0.0
+        return (f"сэкономлено {self.saved_per_page:.0f} байт на страницу "
+                f"({share:.1%} текста, страниц {self.pages})")
@@ -1,9 +1,11 @@
 import re
 import html
 import unicodedata
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 import logging
 
+from crawl_logging import ProgressLogger
+
 logger = logging.getLogger(__name__)
 
 class TextCleaner:
@@ -30,6 +32,9 @@ class TextCleaner:
             'quotes': re.compile(r'["""''«»]'),
             'dashes': re.compile(r'[–—]'),
         }
+        
+        # Скомпилированные планы удаления по набору включенных шагов (см. _removal_plan)
+        self._removal_plans: Dict[tuple, List[Tuple[re.Pattern, Tuple[str, ...], Tuple[str, ...]]]] = {}
     
     def _load_stopwords(self) -> set:
         """Загрузка стоп-слов"""
@@ -161,6 +166,42 @@ class TextCleaner:
         
         return text.lower()
     
+    def _removal_plan(self, remove_html: bool, remove_urls: bool, remove_phones: bool,
+                      remove_dates: bool, remove_numbers: bool) -> List[Tuple[re.Pattern, Tuple[str, ...], Tuple[str, ...]]]:
+        """
+        Скомпилированные проходы удаления для включенных шагов clean_text
+        
+        Шаги идут отдельными проходами в исходном порядке: совпадения соседних
+        шагов могут пересекаться (дата, начатая раньше телефона, забирает его
+        цифры; email - начало следующего за ним URL), и общее выражение с
+        альтернативами дало бы другой результат. Объединены только HTML теги и
+        сущности: сущность не содержит '<', поэтому их совпадения не пересекаются.
+        Выражение начинается с проверки первого символа совпадения - без нее re
+        пробует шаблон с каждой позиции текста
+        
+        Returns:
+            Список (выражение, имена шаблонов, подстроки, без которых совпадений
+            быть не может - пустой кортеж, если проверять нечего)
+        """
+        key = (remove_html, remove_urls, remove_phones, remove_dates, remove_numbers)
+        if key not in self._removal_plans:
+            steps = (
+                (remove_html, ('html_tags', 'html_entities'), r'[<&]', ('<', '&')),
+                (remove_urls, ('urls',), r'h', ('://',)),
+                (remove_urls, ('emails',), r'[A-Za-z0-9._%+-]', ('@',)),
+                (remove_phones, ('phone_numbers',), r'[+\s\-(489]', ()),
+                (remove_dates, ('dates',), r'\d', ('.', '/')),
+                (remove_dates, ('times',), r'\d', (':',)),
+                (remove_numbers, ('numbers',), r'\d', ())
+            )
+            plan = []
+            for enabled, names, first_chars, markers in steps:
+                if enabled:
+                    alternatives = '|'.join(self.patterns[name].pattern for name in names)
+                    plan.append((re.compile(f"(?={first_chars})(?:{alternatives})"), names, markers))
+            self._removal_plans[key] = plan
+        return self._removal_plans[key]
+    
     def clean_text(self, text: str, 
                    remove_html: bool = True,
                    remove_urls: bool = True,
@@ -188,36 +229,42 @@ class TextCleaner:
         
         Returns:
             Очищенный текст
+        
+        Шаги те же, что у clean_html, remove_urls_and_emails, ...,
+        normalize_punctuation, но выполняются за меньшее число проходов:
+        HTML теги и сущности - одним выражением, шаги, для которых в тексте
+        нет нужных символов, пропускаются (_removal_plan), кавычки удаляются
+        вместе со специальными символами, пробелы - split/join
         """
         if not text:
             return ""
         
-        # HTML очистка
+        # Декодирование HTML сущностей (до удаления тегов, как в clean_html)
         if remove_html:
-            text = self.clean_html(text)
-        
-        # Удаление URL и email
-        if remove_urls:
-            text = self.remove_urls_and_emails(text)
-        
-        # Удаление телефонных номеров
-        if remove_phones:
-            text = self.remove_phone_numbers(text)
-        
-        # Удаление дат и времени
-        if remove_dates:
-            text = self.remove_dates_and_times(text)
+            text = html.unescape(text)
         
-        # Удаление чисел
-        if remove_numbers:
-            text = self.remove_number_tokens(text)
-        
-        # Очистка специальных символов
-        text = self.clean_special_characters(text)
+        # HTML, URL, email, телефоны, даты, время и числа - в порядке шагов
+        for pattern, names, markers in self._removal_plan(remove_html, remove_urls, remove_phones,
+                                                          remove_dates, remove_numbers):
+            if markers and not any(marker in text for marker in markers):
+                continue
+            removed = pattern.sub('', text)
+            # Удаление открыло новое совпадение (например, удаленный тег склеил сущность
+            # из двух частей) - шаги группы повторяются по отдельности
+            if len(names) > 1 and pattern.search(removed) is not None:
+                for name in names:
+                    text = self.patterns[name].sub('', text)
+            else:
+                text = removed
+        
+        # Очистка специальных символов (кавычки, замененные на '"', все равно
+        # удаляются как специальные символы, поэтому отдельно не заменяются)
+        text = self.patterns['dashes'].sub('-', unicodedata.normalize('NFKC', text))
+        text = self.patterns['special_chars'].sub('', text)
         
-        # Нормализация пробелов
+        # Нормализация пробелов (str.split делит по тем же символам, что и \s)
         if normalize_whitespace:
-            text = self.normalize_whitespace(text)
+            text = ' '.join(text.split())
         
         # Нормализация пунктуации
         if normalize_punctuation:
@@ -279,15 +326,15 @@ class TextCleaner:
             Список очищенных статей
         """
         cleaned_articles = []
+        progress = ProgressLogger(logger, "Очистка", total=len(articles))
         
         for i, article in enumerate(articles):
             try:
                 cleaned_article = self.clean_article(article, clean_title, clean_text, **kwargs)
                 cleaned_articles.append(cleaned_article)
                 
-                if (i + 1) % 100 == 0:
-                    logger.info(f"Очищено {i + 1}/{len(articles)} статей")
-                    
+                progress.update(articles=1)
+                
             except Exception as e:
                 logger.error(f"Ошибка при очистке статьи {i}: {e}")
                 continue
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Проверка совпадения TextCleaner.clean_text с пошаговой очисткой (отдельный
+проход на каждый шаг, как до плана удалений TextCleaner._removal_plan) на корпусе
+и пограничных текстах и замер времени очистки на статью по корпусу
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from typing import Callable, List
+
+from text_cleaner import TextCleaner
+
+# Наборы параметров clean_text для проверки: по умолчанию, как в run_step2.py и крайние
+OPTION_SETS = {
+    'default': {},
+    'step2': {'remove_stopwords': True},
+    'numbers': {'remove_numbers': True},
+    'lowercase': {'to_lowercase': True, 'remove_numbers': True},
+    'minimal': {'remove_html': False, 'remove_urls': False, 'remove_phones': False,
+                'remove_dates': False, 'normalize_whitespace': False, 'normalize_punctuation': False,
+                'remove_stopwords': False}
+}
+
+# Тексты, на которых совпадения соседних шагов пересекаются или удаление
+# одного совпадения открывает другое (проверяются вместе с корпусом)
+EDGE_CASES = [
+    '1.2.849 123 45 67',
+    'Дата 1.2.849 123 45 67 и всё',
+    'тел. 8 (495) 123-45-67, 12:30, 01.02.2024',
+    'Обсков Р.Ю., 9067105442@list.ru, +79067105442',
+    'ИНН 4951234567861, код 61',
+    'user@site.comhttp://example.com/page',
+    'http://example.com<br>текст',
+    'a &am<b>p; b &lt;i&gt;x&lt;/i&gt;',
+    'Время 12:30:45, 1/2/2024 и 3.4.25'
+]
+
+
+def sequential_clean(cleaner: TextCleaner, text: str, remove_html: bool = True, remove_urls: bool = True,
+                     remove_phones: bool = True, remove_dates: bool = True, remove_numbers: bool = False,
+                     normalize_whitespace: bool = True, normalize_punctuation: bool = True,
+                     to_lowercase: bool = False, remove_stopwords: bool = None) -> str:
+    """Эталон: шаги очистки отдельными проходами, в порядке clean_text"""
+    if not text:
+        return ""
+    if remove_html:
+        text = cleaner.clean_html(text)
+    if remove_urls:
+        text = cleaner.remove_urls_and_emails(text)
+    if remove_phones:
+        text = cleaner.remove_phone_numbers(text)
+    if remove_dates:
+        text = cleaner.remove_dates_and_times(text)
+    if remove_numbers:
+        text = cleaner.remove_number_tokens(text)
+    text = cleaner.clean_special_characters(text)
+    if normalize_whitespace:
+        text = cleaner.normalize_whitespace(text)
+    if normalize_punctuation:
+        text = cleaner.normalize_punctuation(text)
+    if to_lowercase:
+        text = cleaner.to_lowercase(text)
+    if remove_stopwords if remove_stopwords is not None else cleaner.should_remove_stopwords:
+        text = cleaner.remove_stopwords(text)
+    return text
+
+
+def load_texts(filename: str) -> List[str]:
+    """Заголовки и тексты статей корпуса"""
+    texts = []
+    with open(filename, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                article = json.loads(line)
+                texts.extend(article.get(field) or '' for field in ('title', 'text'))
+    return texts
+
+
+def time_per_article(clean: Callable[[str], str], texts: List[str], repeats: int) -> float:
+    """Медиана по повторам времени очистки одной статьи (заголовок + текст), мс"""
+    runs = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for text in texts:
+            clean(text)
+        runs.append((time.perf_counter() - started) * 1000 / (len(texts) / 2))
+    return statistics.median(runs)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Сравнение clean_text с пошаговой очисткой текста")
+    arg_parser.add_argument('--corpus', default='kommersant_articles.jsonl', help="Корпус статей (JSONL)")
+    arg_parser.add_argument('--repeats', type=int, default=5, help="Повторов замера")
+    args = arg_parser.parse_args()
+
+    texts = load_texts(args.corpus)
+    cleaner = TextCleaner(remove_stopwords=True, language='russian')
+
+    failed = False
+    print(f"Статей: {len(texts) // 2}")
+    print(f"{'Параметры':<12} {'Пошагово, мс':>13} {'clean_text, мс':>16} {'Ускорение':>10}")
+    for name, options in OPTION_SETS.items():
+        mismatches = [text for text in texts + EDGE_CASES
+                      if cleaner.clean_text(text, **options) != sequential_clean(cleaner, text, **options)]
+        if mismatches:
+            print(f"❌ {name}: результаты различаются на {len(mismatches)} из {len(texts) + len(EDGE_CASES)} текстов")
+            failed = True
+            continue
+        sequential = time_per_article(lambda text: sequential_clean(cleaner, text, **options), texts, args.repeats)
+        fused = time_per_article(lambda text: cleaner.clean_text(text, **options), texts, args.repeats)
+        print(f"{name:<12} {sequential:>13.3f} {fused:>16.3f} {sequential / fused:>9.2f}x")
+
+    if failed:
+        sys.exit(1)
+    print("✅ Результаты совпадают для всех наборов параметров")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,25 +6,132 @@ from bs4 import BeautifulSoup
 import json
 import time
 import re
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from urllib.parse import urljoin, urlparse
 import logging
-from typing import List, Dict, Optional
+import threading
+from typing import Iterable, List, Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 import os
 
+from requests.adapters import HTTPAdapter
+
+from http_fetcher import HttpFetcher
+from html_archive import HtmlArchive
+from http_cache import HttpCache
+from article_sink import ArticleSink
+from rate_limiter import AdaptiveRateLimiter
+from retry_policy import RetryPolicy, CircuitBreaker
+from url_frontier import UrlFrontier, canonicalize_url
+from crawl_scheduler import CrawlScheduler
+from feed_discovery import FeedDiscovery
+from extraction_profile import ExtractionProfile, collect_tags
+from structured_data import scan_structured_data, FastPathStats, REQUIRED_FIELDS
+from page_variants import (PageVariant, VariantStats, parse_variants, extract_json_fields,
+                           fetch_variant, VARIANT_JSON, FULL_PAGE)
+from element_strainer import ElementStrainer
+from near_duplicates import NearDuplicateIndex
+from crawl_metrics import CrawlMetrics, STATUS_NEAR_DUPLICATE
+from crawl_logging import ProgressLogger, setup_logging
+from crawl_frontier import (STATUS_OK, STATUS_NOT_FOUND, STATUS_TOO_SHORT, STATUS_NO_TITLE,
+                            STATUS_ERROR, STATUS_NOT_MODIFIED)
+from text_blocks import collect_text_blocks, TextDedupStats, TEXT_MODES, TEXT_MODE_LEGACY
+from html_backends import get_backend
+
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Селекторы полей, которые можно не задавать в site_configs
+DEFAULT_SELECTORS = {
+    'tags': [
+        '.tags a',
+        '.article__tags a',
+        '.article__keywords a',
+        'meta[name="keywords"]'
+    ],
+    'author': [
+        '.author',
+        '.article__author',
+        'meta[name="author"]',
+        'meta[property="article:author"]'
+    ]
+}
+
 class UniversalNewsParser:
     """Универсальный парсер новостных сайтов"""
     
-    def __init__(self, delay=1.0):
+    def __init__(self, delay=1.0, html_backend: str = 'html.parser', site_configs: Optional[Dict] = None,
+                 archive: Optional[HtmlArchive] = None, cache: Optional[HttpCache] = None,
+                 sink: Optional[ArticleSink] = None, rate_limiter: Optional[AdaptiveRateLimiter] = None,
+                 retry_policy: Optional[RetryPolicy] = None, circuit_breaker: Optional[CircuitBreaker] = None,
+                 url_frontier: Optional[UrlFrontier] = None, feed_state_path: Optional[str] = "feed_state.json",
+                 structured_data: bool = False, text_mode: str = TEXT_MODE_LEGACY,
+                 partial_parse: bool = False, near_duplicates: Optional[NearDuplicateIndex] = None,
+                 metrics: Optional[CrawlMetrics] = None):
         self.delay = delay
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
+        # archive - необязательный архив всех загруженных ответов для повторного извлечения,
+        # cache - кэш валидаторов HTTP: неизменившиеся статьи не загружаются и не разбираются
+        # Темп запросов подстраивается под сервер, начиная с одного запроса в delay секунд
+        # (delay=0 - без ограничения); действует и на страницы категорий.
+        # Без явно переданного rate_limiter у каждого сайта свой ограничитель (см. fetcher_for)
+        self._shared_rate_limiter = rate_limiter is not None
+        if rate_limiter is None and delay > 0:
+            rate_limiter = AdaptiveRateLimiter.from_delay(delay)
+        self.rate_limiter = rate_limiter
+        # Временные ошибки (сеть, 429, 5xx) повторяются с задержкой, 404 - нет;
+        # при большой доле ошибок запросы к хосту приостанавливаются.
+        # Отключить повторы: RetryPolicy(max_attempts=1)
+        self.fetcher = HttpFetcher(self.session, timeout=10, archive=archive, cache=cache,
+                                   rate_limiter=rate_limiter,
+                                   retry_policy=retry_policy or RetryPolicy(),
+                                   circuit_breaker=circuit_breaker or CircuitBreaker(),
+                                   metrics=metrics)
+        # metrics - время фаз загрузки и извлечения, HTTP статусы и исходы страниц
+        # (периодически выгружаются в файл, сводка - в лог в конце parse_site)
+        self.metrics = metrics
+        # sink - потоковая запись статей: если задан, статьи пишутся на диск сразу
+        # после извлечения и не накапливаются в возвращаемом списке
+        self.sink = sink
+        # url_frontier - фильтр уже обработанных статей, сохраняемый между запусками
+        # (без него ссылки дедуплицируются только в пределах одного запуска)
+        self.url_frontier = url_frontier
+        # near_duplicates - индекс MinHash LSH: почти дубликаты уже собранных статей
+        # отбрасываются (или помечаются полем duplicate_of, см. NearDuplicateIndex)
+        self.near_duplicates = near_duplicates
+        # Время прошлых обходов по sitemap/лентам (parse_site(discovery='feeds'))
+        self.feed_discovery = FeedDiscovery(self.fetcher, state_path=feed_state_path)
+        # Бэкенд разбора HTML: 'html.parser', 'lxml' или 'auto' (lxml, если установлен).
+        # lxml быстрее, но по-своему достраивает некорректную разметку, поэтому включается явно
+        self.html_backend = get_backend(html_backend)
+        # Профили извлечения по сайтам: порядок селекторов подстраивается под
+        # статистику срабатываний (см. selector_report)
+        self._profiles: Dict[str, ExtractionProfile] = {}
+        # Быстрый путь (включается явно): поля из JSON-LD и мета-тегов без построения DOM.
+        # Текст берется из articleBody, а не из блоков страницы, поэтому может отличаться
+        self.structured_data = structured_data
+        self.fast_path_stats = FastPathStats()
+        # Сбор абзацев текста: 'legacy' - все p и div блока (вложенные абзацы
+        # повторяются), 'leaf' - только листовые блоки без повторов
+        if text_mode not in TEXT_MODES:
+            raise ValueError(f"Неизвестный режим сбора текста: {text_mode}")
+        self.text_mode = text_mode
+        self.text_stats = TextDedupStats()
+        # Частичный разбор: в DOM попадают только блоки, на которые указывают селекторы сайта.
+        # Ускоряет html.parser; с lxml примерно в 3 раза медленнее полного (partial_parse_benchmark.py)
+        self.partial_parse = partial_parse
+        self._strainers: Dict[str, Optional[ElementStrainer]] = {}
+        # Загрузчики сайтов со своими ограничителями темпа
+        self._fetchers: Dict[str, HttpFetcher] = {}
+        self._fetchers_lock = threading.Lock()
+        # Облегченные варианты страниц статей ('page_variants' в site_configs, см.
+        # page_variants.py) и байты и время разбора по вариантам для каждого сайта
+        self._variants: Dict[str, List[PageVariant]] = {}
+        self.variant_stats: Dict[str, VariantStats] = {}
         
         # Конфигурация для разных сайтов
         self.site_configs = {
@@ -54,6 +161,12 @@ class UniversalNewsParser:
                     '.doc_header_section',
                     'meta[property="article:section"]'
                 ],
+                # Облегченные версии статей, которые пробуются раньше полной
+                # страницы, например [{'name': 'print', 'url': '{url}?print=true'}]
+                'page_variants': [],
+                # Источники ссылок для parse_site(discovery='feeds')
+                'sitemaps': ['/sitemap.xml'],
+                'feeds': ['/RSS/news.xml'],
                 'categories': {
                     'politics': '/politics/',
                     'economy': '/economy/',
@@ -66,75 +179,313 @@ class UniversalNewsParser:
                 }
             }
         }
+        if site_configs is not None:
+            self.site_configs = site_configs
+    
+    def extraction_config(self) -> Dict:
+        """Параметры конструктора, влияющие на извлечение (для процессов-обработчиков)"""
+        return {'html_backend': self.html_backend.name, 'site_configs': self.site_configs,
+                'structured_data': self.structured_data, 'text_mode': self.text_mode,
+                'partial_parse': self.partial_parse}
     
-    def parse_site(self, site_name: str, max_articles_per_category: int = 50) -> List[Dict]:
-        """Парсинг конкретного сайта"""
+    def site_for_url(self, url: str) -> Optional[str]:
+        """Определение сайта из site_configs по домену URL"""
+        host = urlparse(url).netloc.lower()
+        if host.startswith('www.'):
+            host = host[4:]
+        for site_name, config in self.site_configs.items():
+            site_host = urlparse(config['base_url']).netloc.lower()
+            if site_host.startswith('www.'):
+                site_host = site_host[4:]
+            if host == site_host:
+                return site_name
+        return None
+    
+    def parse_site(self, site_name: str, max_articles_per_category: int = 50,
+                   concurrency: int = 8, max_pages: int = 5, discovery: str = 'listing',
+                   scheduler: Optional[CrawlScheduler] = None) -> List[Dict]:
+        """
+        Парсинг конкретного сайта
+        
+        Страницы категорий, их пагинация и статьи загружаются одним планировщиком
+        с общим ограничением concurrency: статьи первой страницы категории
+        загружаются, пока загружается вторая страница, а категории обходятся
+        параллельно. Пагинация категории останавливается, как только страница
+        не дала новых ссылок или набрано max_articles_per_category ссылок.
+        
+        Статьи возвращаются в том же порядке, что и при последовательном обходе
+        (по категориям, внутри категории - в порядке ссылок). Статья, найденная
+        в нескольких категориях, загружается один раз (с первой категорией), а
+        статьи, обработанные в прошлых запусках (url_frontier), не загружаются.
+        Если парсер создан с sink, статьи пишутся в него по мере извлечения,
+        а возвращается пустой список. В url_frontier статья отмечается
+        обработанной только после записи на диск: сброса sink в конце обхода
+        или save_articles для возвращенного списка.
+        
+        В режиме discovery='feeds' ссылки берутся не со страниц категорий, а из
+        sitemap и RSS лент, объявленных в site_configs ('sitemaps', 'feeds'),
+        причем только измененные после прошлого запуска.
+        
+        Темп запросов к сайту ограничивает его собственный ограничитель
+        (задержка 'delay' из site_configs или delay парсера), число
+        одновременных запросов - 'concurrency' из site_configs или параметр
+        concurrency. С scheduler задачи выполняются в общем пуле потоков
+        вместе с задачами других сайтов (см. parse_all_sites).
+        
+        Args:
+            site_name: Ключ сайта в site_configs
+            max_articles_per_category: Максимум статей из одной категории (в режиме
+                'feeds' - общий лимит max_articles_per_category * число категорий)
+            concurrency: Общее число одновременных запросов
+            max_pages: Максимум страниц пагинации на категорию
+            discovery: Источник ссылок: 'listing' (страницы категорий) или 'feeds'
+            scheduler: Общий планировщик обхода нескольких сайтов (None - свой пул потоков)
+        """
         if site_name not in self.site_configs:
             logger.error(f"Неизвестный сайт: {site_name}")
             return []
         
         config = self.site_configs[site_name]
-        logger.info(f"Начинаем парсинг сайта: {site_name}")
+        concurrency = config.get('concurrency', concurrency)
+        logger.info(f"Начинаем парсинг сайта: {site_name} (одновременных запросов: {concurrency})")
         
+        original_adapters = None
+        if scheduler is None:
+            # Пул соединений сессии должен вмещать все потоки; прежние адаптеры
+            # сессии восстанавливаются после обхода
+            original_adapters = self.session.adapters.copy()
+            adapter = HTTPAdapter(pool_connections=10, pool_maxsize=max(10, concurrency))
+            self.session.mount('http://', adapter)
+            self.session.mount('https://', adapter)
+            pool = ThreadPoolExecutor(max_workers=concurrency)
+        else:
+            pool = scheduler.site(site_name, concurrency)
+        
+        frontier = self.url_frontier or UrlFrontier(bloom_path=None, capacity=100_000)
+        try:
+            if discovery == 'feeds':
+                found, written = self._crawl_feeds(site_name, config, frontier,
+                                                   max_articles_per_category * len(config['categories']),
+                                                   pool, concurrency)
+            else:
+                found, written = self._crawl_listings(site_name, config, frontier, max_articles_per_category,
+                                                      pool, max_pages)
+        finally:
+            if original_adapters is not None:
+                self.session.adapters = original_adapters
+                adapter.close()
+        
+        # Почти дубликаты отбираются в порядке обнаружения, а не завершения загрузок
         all_articles = []
+        dropped = []
+        for key in sorted(found):
+            article = self._unique(found[key])
+            if article is not None:
+                all_articles.append(article)
+            else:
+                dropped.append(found[key]['url'])
+        self._confirm_written(dropped)
+        if self.sink is not None:
+            self.sink.flush()
+            self._confirm_written(written)
+        logger.info(f"Успешно спарсено {len(all_articles) + len(written)} статей с сайта {site_name}")
+        if self.fast_path_stats.pages:
+            logger.info(f"Быстрый путь (JSON-LD/мета-теги): {self.fast_path_stats}")
+        if self.text_stats.pages:
+            logger.info(f"Дедупликация абзацев: {self.text_stats}")
+        if self.variants_for(config):
+            logger.info(f"Варианты страниц {site_name}: {self.variant_stats_for(site_name)}")
+        if self.fetcher.cache is not None:
+            logger.info(f"HTTP кэш: {self.fetcher.cache.stats()}")
+        rate_limiter = self.fetcher_for(config).rate_limiter
+        if rate_limiter is not None:
+            logger.info(f"Темп запросов к {site_name}: {rate_limiter.stats()}")
+        if self.near_duplicates is not None:
+            self.near_duplicates.save()
+            logger.info(f"Почти дубликаты: {self.near_duplicates.stats()}")
+        if self.url_frontier is not None:
+            self.url_frontier.save()
+            logger.info(f"Фронтир ссылок: {self.url_frontier.stats()}")
+        if self.metrics is not None:
+            self.metrics.flush()
+            logger.info(self.metrics.summary())
+        return all_articles
+    
+    def _crawl_listings(self, site_name: str, config: Dict, frontier: UrlFrontier,
+                        max_articles_per_category: int, pool,
+                        max_pages: int) -> Tuple[Dict[Tuple[int, int], Dict], List[str]]:
+        """
+        Обход сайта по страницам категорий (см. parse_site)
         
-        for category_name, category_path in config['categories'].items():
-            logger.info(f"Парсим категорию: {category_name}")
-            category_url = config['base_url'] + category_path
+        Returns:
+            Статьи по ключу (номер категории, номер ссылки) и URL статей, записанных в sink
+        """
+        categories = list(config['categories'].items())
+        # Ссылки категорий в порядке обнаружения (и множества для проверки новизны)
+        links: List[List[str]] = [[] for _ in categories]
+        seen = [set() for _ in categories]
+        found: Dict[Tuple[int, int], Dict] = {}
+        written: List[str] = []
+        progress = ProgressLogger(logger, f"Парсинг {site_name}")
+        
+        def listing_url(category_index: int, page: int) -> str:
+            category_url = config['base_url'] + categories[category_index][1]
+            return category_url if page == 1 else f"{category_url}?page={page}"
+        
+        with pool:
+            tasks = {}
             
-            # Получение ссылок на статьи
-            article_links = self._get_article_links(category_url, config, max_pages=5)
-            logger.info(f"Найдено {len(article_links)} ссылок в категории {category_name}")
+            def submit_listing(category_index: int, page: int):
+                future = pool.submit(self._get_listing_links, listing_url(category_index, page), config)
+                tasks[future] = ('listing', category_index, page)
             
-            # Ограничение количества статей
-            if len(article_links) > max_articles_per_category:
-                article_links = article_links[:max_articles_per_category]
+            for category_index, (category_name, _) in enumerate(categories):
+                logger.info(f"Парсим категорию: {category_name}")
+                submit_listing(category_index, 1)
             
-            # Парсинг статей
-            for i, link in enumerate(article_links, 1):
-                logger.info(f"Парсим статью {i}/{len(article_links)} из {category_name}")
-                article = self._parse_article(link, config, site_name)
-                if article:
-                    article['category'] = category_name
-                    all_articles.append(article)
-                
-                time.sleep(self.delay)
-        
-        logger.info(f"Успешно спарсено {len(all_articles)} статей с сайта {site_name}")
-        return all_articles
+            while tasks:
+                done, _ = wait(tasks, return_when=FIRST_COMPLETED)
+                for future in done:
+                    kind, category_index, position = tasks.pop(future)
+                    category_name = categories[category_index][0]
+                    
+                    if kind == 'article':
+                        article = future.result()
+                        progress.update(pages=1, articles=int(bool(article)))
+                        if not article:
+                            self._commit_cache([links[category_index][position]])
+                            continue
+                        article['category'] = category_name
+                        if self.sink is not None:
+                            article = self._unique(article)
+                            if article is not None:
+                                self.sink.write(article)
+                                written.append(links[category_index][position])
+                            else:
+                                self._confirm_written([links[category_index][position]])
+                        else:
+                            found[(category_index, position)] = article
+                        continue
+                    
+                    page_links = future.result()
+                    new_links = [link for link in page_links or [] if link not in seen[category_index]]
+                    for link in new_links:
+                        if len(links[category_index]) >= max_articles_per_category:
+                            break
+                        seen[category_index].add(link)
+                        # Дубликаты из других категорий и статьи прошлых запусков пропускаются
+                        if frontier.admit(link) is None:
+                            continue
+                        links[category_index].append(link)
+                        link_index = len(links[category_index]) - 1
+                        article_future = pool.submit(self._parse_article, link, config, site_name)
+                        tasks[article_future] = ('article', category_index, link_index)
+                    
+                    # page_links is None - ошибка загрузки страницы, переходим к следующей
+                    if page_links is not None and not new_links:
+                        logger.info(f"Страница {position} категории {category_name} не дала новых ссылок, "
+                                    f"пагинация остановлена")
+                    elif len(links[category_index]) < max_articles_per_category and position < max_pages:
+                        submit_listing(category_index, position + 1)
+        
+        for category_index, (category_name, _) in enumerate(categories):
+            logger.info(f"Найдено {len(links[category_index])} ссылок в категории {category_name}")
+        
+        return found, written
     
-    def _get_article_links(self, category_url: str, config: Dict, max_pages: int = 5) -> List[str]:
-        """Получение ссылок на статьи из категории"""
-        article_links = []
+    def _crawl_feeds(self, site_name: str, config: Dict, frontier: UrlFrontier, max_articles: int,
+                     pool, concurrency: int) -> Tuple[Dict[Tuple[int, int], Dict], List[str]]:
+        """
+        Обход сайта по sitemap и лентам из site_configs (см. parse_site)
         
-        for page in range(1, max_pages + 1):
-            try:
-                if page == 1:
-                    url = category_url
-                else:
-                    url = f"{category_url}?page={page}"
-                
-                response = self.session.get(url, timeout=10)
-                response.raise_for_status()
-                
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # Поиск ссылок на статьи
-                links = soup.find_all('a', href=True)
-                for link in links:
-                    href = link.get('href')
-                    if href and self._is_article_link(href, config):
-                        full_url = urljoin(config['base_url'], href)
-                        if full_url not in article_links:
-                            article_links.append(full_url)
-                
-                time.sleep(self.delay)
-                
-            except Exception as e:
-                logger.error(f"Ошибка при обработке страницы {page}: {e}")
-                continue
-        
-        return article_links
+        Ссылки передаются на загрузку по мере разбора файлов; в работе
+        одновременно не больше concurrency * 2 статей.
+        """
+        started_at = datetime.now(timezone.utc)
+        since = self.feed_discovery.last_run(site_name)
+        logger.info(f"Обнаружение статей по sitemap/лентам, изменения с {since or 'начала'}")
+        
+        found: Dict[Tuple[int, int], Dict] = {}
+        written: List[str] = []
+        scheduled = 0
+        progress = ProgressLogger(logger, f"Парсинг {site_name}")
+        
+        with pool:
+            tasks = {}
+            
+            def collect(done):
+                for future in done:
+                    index, entry = tasks.pop(future)
+                    article = future.result()
+                    progress.update(pages=1, articles=int(bool(article)))
+                    if not article:
+                        self._commit_cache([entry.url])
+                        continue
+                    if entry.category and not article.get('category'):
+                        article['category'] = entry.category
+                    if self.sink is not None:
+                        article = self._unique(article)
+                        if article is not None:
+                            self.sink.write(article)
+                            written.append(entry.url)
+                        else:
+                            self._confirm_written([entry.url])
+                    else:
+                        found[(0, index)] = article
+            
+            failures: List[str] = []
+            complete = True
+            for entry in self.feed_discovery.discover(config, since, failures):
+                if scheduled >= max_articles:
+                    complete = False
+                    break
+                link = frontier.admit(entry.url)
+                if link is None:
+                    continue
+                tasks[pool.submit(self._parse_article, link, config, site_name)] = (scheduled, entry._replace(url=link))
+                scheduled += 1
+                if len(tasks) >= concurrency * 2:
+                    done, _ = wait(tasks, return_when=FIRST_COMPLETED)
+                    collect(done)
+            collect(wait(tasks).done)
+        
+        # Время запуска запоминается только после полного прохода: иначе найденные,
+        # но не поставленные в работу записи следующий запуск отсек бы по lastmod
+        if complete and not failures:
+            self.feed_discovery.mark_run(site_name, started_at)
+        else:
+            logger.info(f"Проход по sitemap/лентам {site_name} неполный, время запуска не сохранено")
+        return found, written
+    
+    def _get_listing_links(self, url: str, config: Dict) -> Optional[List[str]]:
+        """
+        Ссылки на статьи с одной страницы категории (без повторов, в порядке появления)
+        
+        Returns:
+            Список ссылок или None, если страницу не удалось загрузить
+        """
+        try:
+            result = self.fetcher_for(config).fetch(url, use_cache=False)
+            result.raise_for_status()
+            
+            soup = self.html_backend.parse(result.content)
+            
+            # Поиск ссылок на статьи (в каноническом виде, без повторов)
+            keep_params = config.get('keep_query_params', ())
+            page_links = []
+            page_seen = set()
+            for link in soup.find_all('a', href=True):
+                href = link.get('href')
+                if href and self._is_article_link(href, config):
+                    full_url = canonicalize_url(urljoin(config['base_url'], href), keep_params)
+                    if full_url not in page_seen:
+                        page_seen.add(full_url)
+                        page_links.append(full_url)
+            return page_links
+            
+        except Exception as e:
+            logger.error(f"Ошибка при обработке страницы {url}: {e}")
+            return None
     
     def _is_article_link(self, href: str, config: Dict) -> bool:
         """Проверка, является ли ссылка ссылкой на статью"""
@@ -146,74 +497,278 @@ class UniversalNewsParser:
     def _parse_article(self, url: str, config: Dict, site_name: str) -> Optional[Dict]:
         """Парсинг отдельной статьи"""
         try:
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Извлечение заголовка
-            title = self._extract_title(soup, config)
-            if not title:
+            variant = self._fetch_variant(url, config, site_name)
+            if variant is not None:
+                article, status = variant
+                if status == STATUS_NOT_MODIFIED:
+                    logger.debug(f"Страница не изменилась с прошлой загрузки: {url}")
+                    self._record_outcome(STATUS_NOT_MODIFIED)
+                return article
+            result = self.fetcher_for(config).fetch(url)
+            if result.status in (404, 410):
+                logger.warning(f"Страница не найдена: {url}")
+                self._record_outcome(STATUS_NOT_FOUND)
                 return None
-            
-            # Извлечение текста статьи
-            text = self._extract_text(soup, config)
-            if not text or len(text.strip()) < 100:
+            result.raise_for_status()
+            if result.unchanged:
+                logger.debug(f"Страница не изменилась с прошлой загрузки: {url}")
+                self._record_outcome(STATUS_NOT_MODIFIED)
                 return None
-            
-            # Извлечение даты
-            date = self._extract_date(soup, config, url)
-            
-            # Извлечение тегов
-            tags = self._extract_tags(soup)
-            
-            # Извлечение автора
-            author = self._extract_author(soup)
-            
-            article_data = {
-                'title': title.strip(),
-                'text': text.strip(),
-                'date': date,
-                'url': url,
-                'tags': tags,
-                'author': author,
-                'source': site_name,
-                'parsed_at': datetime.now().isoformat()
-            }
-            
-            return article_data
+            started = time.perf_counter()
+            article = self.extract_article(result.content, url, config, site_name)
+            self.variant_stats_for(site_name).record(FULL_PAGE, len(result.content),
+                                                     time.perf_counter() - started, article is not None)
+            return article
             
         except Exception as e:
             logger.error(f"Ошибка при парсинге статьи {url}: {e}")
+            self._record_outcome(STATUS_ERROR)
             return None
     
+    def _confirm_written(self, urls: Iterable[str]):
+        """
+        Статьи записаны на диск (или отброшены как почти дубликаты): отметка
+        в url_frontier и сохранение валидаторов HTTP кэша
+        """
+        urls = list(urls)
+        if self.url_frontier is not None:
+            for url in urls:
+                self.url_frontier.mark_crawled(url)
+        self._commit_cache(urls)
+    
+    def _commit_cache(self, urls: Iterable[str]):
+        """
+        Сохранение валидаторов HTTP кэша для страниц статей и их вариантов:
+        вызывается, когда результат обработки страниц записан на диск, иначе
+        следующий запуск получил бы 304 для статей, которые так и не сохранены
+        """
+        if self.fetcher.cache is None:
+            return
+        pages = []
+        for url in urls:
+            pages.append(url)
+            site_name = self.site_for_url(url)
+            if site_name is not None:
+                pages.extend(variant.url_for(url) for variant in self.variants_for(self.site_configs[site_name]))
+        self.fetcher.cache.commit(pages)
+    
+    def _record_outcome(self, status: str):
+        if self.metrics is not None:
+            self.metrics.outcome(status)
+    
+    def _fetch_variant(self, url: str, config: Dict,
+                       site_name: str) -> Optional[Tuple[Optional[Dict], str]]:
+        """Статья из облегченного варианта страницы (None - нужна полная страница)"""
+        variants = self.variants_for(config)
+        if not variants:
+            return None
+        
+        def extract(variant: PageVariant, content: bytes) -> Tuple[Optional[Dict], str]:
+            started = time.perf_counter()
+            if variant.kind == VARIANT_JSON:
+                fields = extract_json_fields(content, variant)
+                fields['tags'] = list(set(fields.get('tags', [])))
+                article, status = self._article_from_fields(fields, url, site_name)
+                parse_seconds = 0.0
+            else:
+                article, status, parse_seconds = self._extract_fields(content, url, config, site_name)
+            # Неудачный вариант не учитывается в исходах: их дает полная страница
+            if article is not None:
+                self._observe_extraction(started, parse_seconds, status)
+            return article, status
+        
+        return fetch_variant(self.fetcher_for(config), variants, url, extract, self.variant_stats_for(site_name))
+    
+    def _observe_extraction(self, started: float, parse_seconds: float, status: str):
+        """Учет времени разбора и извлечения и исхода страницы в метриках"""
+        if self.metrics is not None:
+            if parse_seconds:
+                self.metrics.observe('parse', parse_seconds)
+            self.metrics.observe('extract', time.perf_counter() - started - parse_seconds)
+            self.metrics.outcome(status)
+    
+    def extract_article(self, content: bytes, url: str, config: Optional[Dict] = None,
+                        site_name: Optional[str] = None) -> Optional[Dict]:
+        """
+        Извлечение данных статьи из HTML страницы (без обращения к сети)
+        
+        Если сайт не указан, он определяется по домену URL. Поля, найденные
+        в JSON-LD и мета-тегах, берутся без построения DOM; селекторы
+        применяются только к недостающим.
+        """
+        if config is None:
+            site_name = site_name or self.site_for_url(url)
+            if site_name not in self.site_configs:
+                logger.warning(f"Не найдена конфигурация сайта для {url}")
+                return None
+            config = self.site_configs[site_name]
+        
+        started = time.perf_counter()
+        article, status, parse_seconds = self._extract_fields(content, url, config, site_name)
+        self._observe_extraction(started, parse_seconds, status)
+        return article
+    
+    def _extract_fields(self, content: bytes, url: str, config: Dict,
+                        site_name: Optional[str]) -> Tuple[Optional[Dict], str, float]:
+        """Извлечение полей статьи: (статья или None, исход, время построения DOM)"""
+        fields = scan_structured_data(content) if self.structured_data else {}
+        fast = all(fields.get(name) for name in REQUIRED_FIELDS)
+        self.fast_path_stats.record(fast)
+        parse_seconds = 0.0
+        
+        if fast:
+            fields['tags'] = list(set(fields.get('tags', [])))
+            article, status = self._article_from_fields(fields, url, site_name)
+            return article, status, parse_seconds
+        
+        # При частичном разборе страница разбирается полностью, если
+        # в блоках из селекторов не нашлось заголовка или текста
+        strainer = self.strainer_for(config) if self.partial_parse else None
+        for strainer in ((strainer, None) if strainer is not None else (None,)):
+            parse_started = time.perf_counter()
+            soup = self.html_backend.parse(content, strainer)
+            parse_seconds += time.perf_counter() - parse_started
+            
+            # Извлечение заголовка
+            title = fields.get('title') or self._extract_title(soup, config)
+            
+            # Извлечение текста статьи
+            text = fields.get('text') or (self._extract_text(soup, config, partial=strainer is not None)
+                                          if title else None)
+            if title and text:
+                break
+        
+        if not title:
+            return None, STATUS_NO_TITLE, parse_seconds
+        if not text:
+            return None, STATUS_TOO_SHORT, parse_seconds
+        
+        # Извлечение даты
+        date = fields.get('date') or self._extract_date(soup, config, url)
+        
+        # Извлечение тегов
+        tags = list(set(fields['tags'])) if fields.get('tags') else self._extract_tags(soup, config)
+        
+        # Извлечение автора
+        author = fields.get('author') or self._extract_author(soup, config)
+        
+        article, status = self._article_from_fields({'title': title, 'text': text, 'date': date,
+                                                     'tags': tags, 'author': author}, url, site_name)
+        return article, status, parse_seconds
+    
+    def _article_from_fields(self, fields: Dict, url: str,
+                             site_name: Optional[str]) -> Tuple[Optional[Dict], str]:
+        """Статья из найденных полей с проверкой заголовка и объема текста"""
+        title, text = fields.get('title'), fields.get('text')
+        if not title:
+            return None, STATUS_NO_TITLE
+        if not text or len(text.strip()) < 100:
+            return None, STATUS_TOO_SHORT
+        
+        return {
+            'title': title.strip(),
+            'text': text.strip(),
+            'date': fields.get('date'),
+            'url': url,
+            'tags': fields.get('tags') or [],
+            'author': fields.get('author'),
+            'source': site_name,
+            'parsed_at': datetime.now().isoformat()
+        }, STATUS_OK
+    
+    def _unique(self, article: Dict) -> Optional[Dict]:
+        """Статья после проверки на почти дубликаты (None - дубликат отброшен)"""
+        if self.near_duplicates is None:
+            return article
+        admitted = self.near_duplicates.admit(article)
+        if admitted is None and self.metrics is not None:
+            self.metrics.reclassify(STATUS_OK, STATUS_NEAR_DUPLICATE)
+        return admitted
+    
+    def profile_for(self, config: Dict) -> ExtractionProfile:
+        """Профиль извлечения сайта (создается при первом обращении)"""
+        key = config['base_url']
+        profile = self._profiles.get(key)
+        if profile is None:
+            profile = ExtractionProfile.from_site_config(config, DEFAULT_SELECTORS)
+            self._profiles[key] = profile
+        return profile
+    
+    def fetcher_for(self, config: Dict) -> HttpFetcher:
+        """
+        Загрузчик сайта: общие сессия, кэш, повторы и выключатель, но свой
+        ограничитель темпа, чтобы замедление одного сайта не тормозило другие
+        (если ограничитель передан парсеру явно - общий для всех сайтов)
+        """
+        if self._shared_rate_limiter:
+            return self.fetcher
+        key = config['base_url']
+        with self._fetchers_lock:
+            fetcher = self._fetchers.get(key)
+            if fetcher is None:
+                delay = config.get('delay', self.delay)
+                fetcher = HttpFetcher(self.session, timeout=self.fetcher.timeout, archive=self.fetcher.archive,
+                                      cache=self.fetcher.cache,
+                                      rate_limiter=AdaptiveRateLimiter.from_delay(delay) if delay > 0 else None,
+                                      retry_policy=self.fetcher.retry_policy,
+                                      circuit_breaker=self.fetcher.circuit_breaker, metrics=self.metrics)
+                self._fetchers[key] = fetcher
+            return fetcher
+    
+    def variants_for(self, config: Dict) -> List[PageVariant]:
+        """Облегченные варианты страниц статей сайта"""
+        key = config['base_url']
+        if key not in self._variants:
+            self._variants[key] = parse_variants(config.get('page_variants'))
+        return self._variants[key]
+    
+    def variant_stats_for(self, site_name: str) -> VariantStats:
+        """Статистика вариантов страниц сайта (создается при первом обращении)"""
+        with self._fetchers_lock:
+            return self.variant_stats.setdefault(site_name, VariantStats())
+    
+    def strainer_for(self, config: Dict) -> Optional[ElementStrainer]:
+        """Отбор элементов для частичного разбора (None - сайт разбирается полностью)"""
+        key = config['base_url']
+        if key not in self._strainers:
+            self._strainers[key] = ElementStrainer.for_selectors(self.profile_for(config).selectors())
+        return self._strainers[key]
+    
+    def selector_report(self, site_name: str = 'kommersant.ru') -> str:
+        """Отчет о срабатывании селекторов сайта (какие можно удалить)"""
+        return self.profile_for(self.site_configs[site_name]).format_report()
+    
     def _extract_title(self, soup: BeautifulSoup, config: Dict) -> Optional[str]:
         """Извлечение заголовка статьи"""
-        for selector in config['title_selectors']:
-            title_elem = soup.select_one(selector)
-            if title_elem and title_elem.get_text().strip():
-                return title_elem.get_text().strip()
-        return None
+        def accept(elem):
+            return elem.get_text().strip() or None
+        
+        return self.profile_for(config).first('title', soup, accept)
     
-    def _extract_text(self, soup: BeautifulSoup, config: Dict) -> Optional[str]:
-        """Извлечение основного текста статьи"""
+    def _extract_text(self, soup: BeautifulSoup, config: Dict, partial: bool = False) -> Optional[str]:
+        """
+        Извлечение основного текста статьи
+        
+        partial - страница разобрана частично: поиск абзацев по всему документу
+        не выполняется
+        """
         # Удаление ненужных элементов
         for element in soup(['script', 'style', 'nav', 'header', 'footer', 'aside', 'advertisement', 'ad']):
             element.decompose()
         
-        text_parts = []
+        def accept(text_elem):
+            # Извлечение параграфов (короче 20 символов отбрасываются)
+            text_parts, legacy_bytes = collect_text_blocks(text_elem, self.text_mode)
+            return (text_parts, legacy_bytes) if text_parts else None
         
-        for selector in config['text_selectors']:
-            text_elem = soup.select_one(selector)
-            if text_elem:
-                paragraphs = text_elem.find_all(['p', 'div'], recursive=True)
-                for p in paragraphs:
-                    text = p.get_text().strip()
-                    if text and len(text) > 20:
-                        text_parts.append(text)
-                break
+        found = self.profile_for(config).first('text', soup, accept)
+        text_parts = []
+        if found:
+            text_parts, legacy_bytes = found
+            if self.text_mode != TEXT_MODE_LEGACY:
+                self.text_stats.record(legacy_bytes, text_parts)
         
-        if not text_parts:
+        if not text_parts and not partial:
             # Fallback: поиск по всему документу
             paragraphs = soup.find_all('p')
             for p in paragraphs:
@@ -225,16 +780,18 @@ class UniversalNewsParser:
     
     def _extract_date(self, soup: BeautifulSoup, config: Dict, url: str) -> Optional[str]:
         """Извлечение даты публикации"""
-        for selector in config['date_selectors']:
-            elem = soup.select_one(selector)
-            if elem:
-                date_str = elem.get('content') or elem.get('datetime') or elem.get_text()
-                if date_str:
-                    try:
-                        parsed_date = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-                        return parsed_date.isoformat()
-                    except:
-                        continue
+        def accept(elem):
+            date_str = elem.get('content') or elem.get('datetime') or elem.get_text()
+            if not date_str:
+                return None
+            try:
+                return datetime.fromisoformat(date_str.replace('Z', '+00:00')).isoformat()
+            except ValueError:
+                return None
+        
+        date = self.profile_for(config).first('date', soup, accept)
+        if date:
+            return date
         
         # Извлечение даты из URL
         date_match = re.search(r'/(\d{4})/(\d{2})/(\d{2})/', url)
@@ -248,62 +805,65 @@ class UniversalNewsParser:
         
         return None
     
-    def _extract_tags(self, soup: BeautifulSoup) -> List[str]:
+    def _extract_tags(self, soup: BeautifulSoup, config: Dict) -> List[str]:
         """Извлечение тегов статьи"""
-        tags = []
-        
-        tag_selectors = [
-            '.tags a',
-            '.article__tags a',
-            '.article__keywords a',
-            'meta[name="keywords"]'
-        ]
-        
-        for selector in tag_selectors:
-            if selector.startswith('meta'):
-                elem = soup.select_one(selector)
-                if elem:
-                    content = elem.get('content', '')
-                    if content:
-                        tags.extend([tag.strip() for tag in content.split(',')])
-            else:
-                elems = soup.select(selector)
-                for elem in elems:
-                    tag = elem.get_text().strip()
-                    if tag:
-                        tags.append(tag)
-        
+        tags = self.profile_for(config)['tags'].each(soup, collect_tags)
         return list(set(tags))
     
-    def _extract_author(self, soup: BeautifulSoup) -> Optional[str]:
+    def _extract_author(self, soup: BeautifulSoup, config: Dict) -> Optional[str]:
         """Извлечение автора статьи"""
-        author_selectors = [
-            '.author',
-            '.article__author',
-            'meta[name="author"]',
-            'meta[property="article:author"]'
-        ]
-        
-        for selector in author_selectors:
-            elem = soup.select_one(selector)
-            if elem:
-                author = elem.get('content') or elem.get_text()
-                if author and author.strip():
-                    return author.strip()
+        def accept(elem):
+            author = elem.get('content') or elem.get_text()
+            return author.strip() if author and author.strip() else None
         
-        return None
+        return self.profile_for(config).first('author', soup, accept)
     
-    def parse_all_sites(self, max_articles_per_category: int = 30) -> List[Dict]:
-        """Парсинг всех доступных сайтов (только Коммерсант)"""
+    def parse_all_sites(self, max_articles_per_category: int = 30, sites: Optional[List[str]] = None,
+                        max_workers: int = 16, concurrency: int = 4,
+                        discovery: str = 'listing') -> List[Dict]:
+        """
+        Одновременный парсинг всех сайтов из site_configs
+        
+        Сайты обходятся параллельно через общий CrawlScheduler: потоки
+        выдаются сайтам по очереди, у каждого сайта свой предел одновременных
+        запросов ('concurrency' в site_configs или concurrency) и свой темп
+        ('delay' в site_configs или delay парсера). Статьи возвращаются по
+        сайтам в порядке site_configs.
+        
+        Args:
+            max_articles_per_category: Максимум статей из одной категории
+            sites: Ключи сайтов (по умолчанию - все из site_configs)
+            max_workers: Общее число одновременных запросов по всем сайтам
+            concurrency: Одновременных запросов к сайту по умолчанию
+            discovery: Источник ссылок: 'listing' или 'feeds' (см. parse_site)
+        """
+        sites = sites or list(self.site_configs)
         all_articles = []
         
+        # Пул соединений сессии должен вмещать все потоки всех сайтов; прежние
+        # адаптеры сессии восстанавливаются после обхода
+        original_adapters = self.session.adapters.copy()
+        adapter = HTTPAdapter(pool_connections=max(10, len(sites)), pool_maxsize=max(10, max_workers))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
         try:
-            articles = self.parse_site('kommersant.ru', max_articles_per_category)
-            all_articles.extend(articles)
-            logger.info(f"Всего статей собрано: {len(all_articles)}")
-        except Exception as e:
-            logger.error(f"Ошибка при парсинге сайта kommersant.ru: {e}")
+            with CrawlScheduler(max_workers) as scheduler, ThreadPoolExecutor(max_workers=len(sites)) as sites_pool:
+                futures = {site_name: sites_pool.submit(self.parse_site, site_name, max_articles_per_category,
+                                                        concurrency, discovery=discovery, scheduler=scheduler)
+                           for site_name in sites}
+                for site_name, future in futures.items():
+                    try:
+                        articles = future.result()
+                        all_articles.extend(articles)
+                    except Exception as e:
+                        logger.error(f"Ошибка при парсинге сайта {site_name}: {e}")
+                logger.info(f"Задачи по сайтам: {scheduler.stats()}")
+        finally:
+            self.session.adapters = original_adapters
+            adapter.close()
         
+        logger.info(f"Всего статей собрано: {len(all_articles)}")
         return all_articles
     
     def save_articles(self, articles: List[Dict], filename: str = "news_articles.jsonl"):
@@ -315,13 +875,21 @@ class UniversalNewsParser:
         with open(filepath, 'w', encoding='utf-8') as f:
             for article in articles:
                 f.write(json.dumps(article, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
         
+        # Фронтир ссылок и валидаторы кэша обновляются только для статей, уже записанных на диск
+        self._confirm_written(article['url'] for article in articles)
+        if self.url_frontier is not None:
+            self.url_frontier.save()
         logger.info(f"Сохранено {len(articles)} статей в файл {filepath}")
         return filepath
 
 def main():
     """Основная функция для запуска парсера"""
-    parser = UniversalNewsParser(delay=1.0)
+    # Запись лога в фоновом потоке; построчный лог статей - setup_logging(logging.DEBUG)
+    setup_logging()
+    parser = UniversalNewsParser(delay=1.0, metrics=CrawlMetrics())
     
     # Парсинг всех сайтов
     logger.info("Начинаем парсинг новостных сайтов")
@@ -7,6 +7,8 @@ from typing import Dict, List, Optional, Any, Union
 from dataclasses import dataclass
 import logging
 
+from crawl_logging import ProgressLogger
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -390,15 +392,15 @@ class UniversalPreprocessor:
     def batch_preprocess(self, articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Пакетная предобработка статей"""
         processed_articles = []
+        progress = ProgressLogger(logger, "Предобработка", total=len(articles))
         
         for i, article in enumerate(articles):
             try:
                 processed_article = self.preprocess_article(article)
                 processed_articles.append(processed_article)
                 
-                if (i + 1) % 100 == 0:
-                    logger.info(f"Предобработано {i + 1}/{len(articles)} статей")
-                    
+                progress.update(articles=1)
+                
             except Exception as e:
                 logger.error(f"Ошибка при предобработке статьи {i}: {e}")
                 continue
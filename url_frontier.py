@@ -0,0 +1,197 @@
+"""
+Дедупликация ссылок на статьи: канонизация URL, множество ссылок текущего
+запуска и фильтр Блума обработанных статей, сохраняемый между запусками.
+
+Канонизация убирает различия, не влияющие на содержимое страницы:
+регистр схемы и хоста, порт по умолчанию, фрагмент, параметры запроса
+(кроме явно разрешенных), завершающий слэш. Адреса статей вида
+/doc/<id>/... приводятся к /doc/<id>
+"""
+import hashlib
+import math
+import os
+import re
+import struct
+import threading
+import logging
+from typing import Iterable, Optional, Set
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+logger = logging.getLogger(__name__)
+
+DOC_ID_RE = re.compile(r'^/doc/(\d+)(?:[/?#.].*)?$')
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+BLOOM_MAGIC = b'BLM1'
+BLOOM_HEADER = struct.Struct('<QQQ')  # число бит, число хэшей, число добавленных элементов
+
+
+def canonicalize_url(url: str, keep_params: Iterable[str] = ()) -> str:
+    """
+    Канонический вид URL
+
+    Args:
+        url: Абсолютный URL
+        keep_params: Параметры запроса, влияющие на содержимое (остальные отбрасываются)
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    path = re.sub(r'/{2,}', '/', parts.path or '/')
+    doc_match = DOC_ID_RE.match(path)
+    if doc_match:
+        path = f"/doc/{doc_match.group(1)}"
+    elif len(path) > 1:
+        path = path.rstrip('/')
+
+    keep_params = set(keep_params)
+    query = urlencode(sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                             if name in keep_params))
+    return urlunsplit((scheme, host, path, query, ''))
+
+
+class BloomFilter:
+    """
+    Фильтр Блума на bytearray с сохранением в файл
+
+    Ложноположительные ответы возможны с вероятностью около error_rate
+    (при заполнении до capacity), ложноотрицательные - нет.
+
+    Args:
+        capacity: Ожидаемое число элементов
+        error_rate: Допустимая доля ложноположительных ответов
+        path: Файл для сохранения (если существует - фильтр загружается из него)
+    """
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.001, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self._load(path)
+            return
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1, h2 = struct.unpack('<QQ', digest)
+        h2 |= 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def add(self, item: str) -> bool:
+        """Добавление элемента; False, если он (вероятно) уже был"""
+        positions = list(self._positions(item))
+        with self._lock:
+            added = False
+            for pos in positions:
+                mask = 1 << (pos & 7)
+                if not self._bits[pos >> 3] & mask:
+                    self._bits[pos >> 3] |= mask
+                    added = True
+            if added:
+                self.count += 1
+        return added
+
+    def _load(self, path: str):
+        with open(path, 'rb') as f:
+            if f.read(len(BLOOM_MAGIC)) != BLOOM_MAGIC:
+                raise ValueError(f"{path} не является файлом фильтра Блума")
+            self.num_bits, self.num_hashes, self.count = BLOOM_HEADER.unpack(f.read(BLOOM_HEADER.size))
+            self._bits = bytearray(f.read())
+        if len(self._bits) != (self.num_bits + 7) // 8:
+            raise ValueError(f"Файл фильтра Блума {path} поврежден")
+
+    def save(self, path: Optional[str] = None):
+        """Сохранение фильтра (через временный файл, чтобы сбой не испортил прежнюю версию)"""
+        path = path or self.path
+        if not path:
+            return
+        tmp_path = path + '.tmp'
+        with self._lock:
+            with open(tmp_path, 'wb') as f:
+                f.write(BLOOM_MAGIC)
+                f.write(BLOOM_HEADER.pack(self.num_bits, self.num_hashes, self.count))
+                f.write(self._bits)
+        os.replace(tmp_path, path)
+
+
+class UrlFrontier:
+    """
+    Отбор ссылок для загрузки
+
+    Ссылка допускается, если ее канонический вид еще не встречался в этом
+    запуске и статья не была обработана в прошлых запусках (фильтр Блума).
+    Статьи отмечаются обработанными через mark_crawled только после записи
+    на диск, поэтому страницы с ошибками и статьи, не сохраненные из-за
+    сбоя, будут загружены снова.
+
+    Args:
+        bloom_path: Файл фильтра Блума (None - только в памяти, без сохранения)
+        capacity: Ожидаемое число статей за все запуски
+        error_rate: Доля новых статей, которые могут быть ошибочно пропущены
+        keep_params: Параметры запроса, сохраняемые при канонизации
+    """
+
+    def __init__(self, bloom_path: Optional[str] = "url_frontier.bloom", capacity: int = 1_000_000,
+                 error_rate: float = 0.001, keep_params: Iterable[str] = ()):
+        self.keep_params = tuple(keep_params)
+        self.crawled = BloomFilter(capacity, error_rate, bloom_path)
+        self._seen: Set[str] = set()
+        self._lock = threading.Lock()
+        self.skipped_duplicates = 0
+        self.skipped_crawled = 0
+
+    def canonicalize(self, url: str) -> str:
+        return canonicalize_url(url, self.keep_params)
+
+    def admit(self, url: str) -> Optional[str]:
+        """
+        Регистрация найденной ссылки
+
+        Returns:
+            Канонический URL, если его нужно загрузить, иначе None
+        """
+        canonical = self.canonicalize(url)
+        with self._lock:
+            if canonical in self._seen:
+                self.skipped_duplicates += 1
+                return None
+            self._seen.add(canonical)
+            if canonical in self.crawled:
+                self.skipped_crawled += 1
+                return None
+        return canonical
+
+    def mark_crawled(self, url: str):
+        """Отметка статьи как обработанной (не будет загружаться в следующих запусках)"""
+        self.crawled.add(self.canonicalize(url))
+
+    def save(self):
+        """Сохранение фильтра Блума"""
+        self.crawled.save()
+
+    def stats(self) -> dict:
+        return {
+            'seen': len(self._seen),
+            'skipped_duplicates': self.skipped_duplicates,
+            'skipped_crawled': self.skipped_crawled,
+            'crawled_total': self.crawled.count
+        }
+
+    def close(self):
+        self.save()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()